@@ -0,0 +1,138 @@
+"""
+Memory footprint of inline units: legacy dicts vs slot-based units
+
+Run from the repository root:
+    python benchmarks/inline_units.py [number of units]
+"""
+
+# ©️ Codrago, 2024-2025
+# This file is a part of Heroku Userbot
+# 🌐 https://github.com/coddrago/Heroku
+# You can redistribute it and/or modify it under the terms of the GNU AGPLv3
+# 🔑 https://www.gnu.org/licenses/agpl-3.0.html
+
+import asyncio
+import gc
+import sys
+import time
+import tracemalloc
+import typing
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import heroku.main  # noqa: E402, F401  # resolves circular imports of `heroku.inline`
+from heroku.inline.units import FormUnit, GalleryUnit, ListUnit  # noqa: E402
+
+TTL = round(time.time()) + 10 * 60
+BUTTONS = [[{"text": "Button", "data": "data"}]]
+
+
+def make_dict(i: int) -> dict:
+    """Unit, as it was stored before slot-based units"""
+    common = {
+        "caller": None,
+        "chat": None,
+        "message_id": None,
+        "top_msg_id": None,
+        "uid": str(i),
+        "future": asyncio.Event(),
+        "ttl": TTL,
+    }
+
+    if i % 3 == 0:
+        return {"type": "form", "text": "text", "buttons": BUTTONS, **common}
+
+    if i % 3 == 1:
+        return {"type": "list", "current_index": 0, "strings": ["a"], **common}
+
+    return {
+        "type": "gallery",
+        "caption": "caption",
+        "photo_url": "url",
+        "next_handler": None,
+        "btn_call_data": "data",
+        "photos": ["url"],
+        "current_index": 0,
+        **common,
+    }
+
+
+def make_unit(i: int) -> typing.Union[FormUnit, ListUnit, GalleryUnit]:
+    if i % 3 == 0:
+        return FormUnit(
+            text="text",
+            buttons=BUTTONS,
+            uid=str(i),
+            future=asyncio.Event(),
+            ttl=TTL,
+        )
+
+    if i % 3 == 1:
+        return ListUnit(uid=str(i), strings=["a"], future=asyncio.Event(), ttl=TTL)
+
+    return GalleryUnit(
+        caption="caption",
+        uid=str(i),
+        photo_url="url",
+        btn_call_data="data",
+        photos=["url"],
+        future=asyncio.Event(),
+        ttl=TTL,
+    )
+
+
+def measure(
+    make: typing.Callable[[int], typing.Any],
+    count: int,
+) -> typing.Tuple[int, float]:
+    """
+    Build units in the state they spend most of their life in (message is sent,
+    future is resolved) and read a few hot fields of each of them
+    :param make: Unit factory
+    :param count: Number of units
+    :return: Traced memory in bytes and field access time in seconds
+    """
+    gc.collect()
+    tracemalloc.start()
+    units = {str(i): make(i) for i in range(count)}
+    for unit in units.values():
+        if isinstance(unit, dict):
+            del unit["future"]
+            unit.update(chat=1, message_id=2, inline_message_id="inline")
+        else:
+            unit.future = None
+            unit.chat, unit.message_id, unit.inline_message_id = 1, 2, "inline"
+
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    started = time.perf_counter()
+    for _ in range(20):
+        for unit in units.values():
+            if isinstance(unit, dict):
+                unit.get("force_me", False)
+                unit["chat"]
+                unit.get("always_allow", [])
+            else:
+                unit.force_me
+                unit.chat
+                unit.always_allow or []
+
+    return memory, time.perf_counter() - started
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    dicts, dicts_time = measure(make_dict, count)
+    units, units_time = measure(make_unit, count)
+    print(
+        f"{count} units: dicts {dicts / 2**20:.1f} MiB ({dicts // count} B/unit),"
+        f" slots {units / 2**20:.1f} MiB ({units // count} B/unit),"
+        f" {100 * (dicts - units) / dicts:.0f}% less"
+    )
+    print(f"Field access: dicts {dicts_time:.3f}s, slots {units_time:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,461 @@
+"""Storages, where the database is persisted"""
+
+# ©️ Codrago, 2024-2025
+# This file is a part of Heroku Userbot
+# 🌐 https://github.com/coddrago/Heroku
+# You can redistribute it and/or modify it under the terms of the GNU AGPLv3
+# 🔑 https://www.gnu.org/licenses/agpl-3.0.html
+
+import json
+import logging
+import os
+import re
+import sqlite3
+import typing
+import uuid
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Owner -> changed keys of the owner, or `None` if the whole owner changed
+Changes = typing.Dict[str, typing.Optional[typing.Set[str]]]
+
+
+def _text_key(key: typing.Union[str, int]) -> str:
+    """Convert key to string the same way `json` does for dict keys"""
+    return key if isinstance(key, str) else json.dumps(key)
+
+
+class Backend:
+    """Base class of database storages"""
+
+    # Whether owners are read on first access, rather than on startup
+    lazy: bool = False
+    # Changes are coalesced for this amount of seconds before being written
+    save_delay: float = 1
+
+    def read(self) -> dict:
+        """
+        Read the whole database
+        :return: Database contents
+        """
+        raise NotImplementedError
+
+    def owners(self) -> typing.List[str]:
+        """
+        List owners, which are stored in lazy storage
+        :return: List of owners
+        """
+        return []
+
+    def read_owner(self, owner: str) -> dict:
+        """
+        Read a single owner from lazy storage
+        :param owner: Owner to read
+        :return: Owner's keys
+        """
+        raise NotImplementedError
+
+    def read_owners(self, owners: typing.Iterable[str]) -> typing.Dict[str, dict]:
+        """
+        Read several owners from lazy storage
+        :param owners: Owners to read
+        :return: Keys of each owner
+        """
+        return {owner: self.read_owner(owner) for owner in owners}
+
+    def prepare(self, db: dict, changes: Changes) -> typing.Any:
+        """
+        Serialize changes of the database. Runs in event loop, so the
+        database is guaranteed not to change while it's being serialized
+        :param db: Database
+        :param changes: Changed owners and keys
+        :return: Payload for `write`
+        :raises TypeError | ValueError: If some value is not JSON-serializable
+        """
+        raise NotImplementedError
+
+    def write(self, payload: typing.Any):
+        """
+        Write prepared payload. Runs in a thread
+        :param payload: Value, returned by `prepare`
+        """
+        raise NotImplementedError
+
+    def subscribe(
+        self,
+        callback: typing.Callable[
+            [Changes, typing.Optional[typing.Dict[str, dict]]], None
+        ],
+    ):
+        """
+        Listen to changes, made by other processes, sharing the same storage
+        :param callback: Function, which will be called with changed owners
+            and keys and with the changed owners, already read from the
+            storage (or `None` if they couldn't be read). It may be called
+            from another thread
+        """
+
+
+class JSONBackend(Backend):
+    """Stores the whole database as a single JSON document in a file"""
+
+    def __init__(self, path: Path):
+        self._path = path
+        # Owner -> (version of the owner, serialized owner)
+        self._fragments: typing.Dict[str, typing.Tuple[int, str]] = {}
+
+    def read(self) -> dict:
+        try:
+            db = self._path.read_text()
+            if re.search(r'"(hikka\.)(\S+\":)', db):
+                logging.warning("Converting db after update")
+                db = re.sub(r'(hikka\.)(\S+\":)', lambda m: 'heroku.' + m.group(2), db)
+            return json.loads(db)
+        except json.decoder.JSONDecodeError:
+            logger.warning("Database read failed! Creating new one...")
+        except FileNotFoundError:
+            logger.debug("Database file not found, creating new one...")
+
+        return {}
+
+    def prepare(self, db: dict, changes: Changes) -> str:
+        """
+        Serialize changed owners and assemble the whole database from cached
+        per-owner fragments. Owner is serialized again if it's changed or its
+        version was bumped since the fragment was made. Values, mutated in place
+        (e.g. `db.get(owner, key).append(...)`), are not noticed until the owner
+        is `set` or the whole database is `save`d
+        :return: Database as JSON, identical to `json.dumps(db, indent=4)`
+        """
+        for owner in changes.keys() - db.keys():
+            self._fragments.pop(owner, None)
+
+        for owner in db:
+            version = db.get_version(owner)
+            if (
+                owner in changes
+                or (fragment := self._fragments.get(owner)) is None
+                or fragment[0] != version
+            ):
+                self._fragments[owner] = (
+                    version,
+                    json.dumps({owner: db[owner]}, indent=4)[2:-2],
+                )
+
+        if not db:
+            return "{}"
+
+        return "{\n" + ",\n".join(self._fragments[owner][1] for owner in db) + "\n}"
+
+    def write(self, payload: str):
+        tmp_path = self._path.with_name(f"{self._path.name}.tmp")
+        tmp_path.write_text(payload)
+        os.replace(tmp_path, self._path)
+
+
+class RedisBackend(JSONBackend):
+    """Stores the whole database as a single JSON document under Redis key"""
+
+    save_delay = 5
+
+    def __init__(self, redis: "redis.Redis", key: str):  # type: ignore  # noqa: F821
+        super().__init__(None)
+        self._redis = redis
+        self._key = key
+
+    def read(self) -> dict:
+        try:
+            return json.loads(self._redis.get(self._key).decode())
+        except Exception:
+            logger.exception("Error reading redis database")
+
+        return {}
+
+    def write(self, payload: str):
+        with self._redis.pipeline() as pipe:
+            pipe.set(self._key, payload)
+            pipe.execute()
+
+        logger.debug("Published db to Redis")
+
+
+class SQLiteBackend(Backend):
+    """
+    Stores each `(owner, key)` pair as a separate row of SQLite database
+    in WAL mode. Owners are read on first access, and only changed keys are written
+    """
+
+    lazy = True
+
+    def __init__(self, path: Path):
+        self._path = path
+        self._reader = self._connect()
+        self._writer = self._connect()
+        self._writer.execute(
+            "CREATE TABLE IF NOT EXISTS db (owner TEXT NOT NULL, key TEXT NOT NULL,"
+            " value TEXT NOT NULL, PRIMARY KEY (owner, key)) WITHOUT ROWID"
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        # Reader is used from event loop and writer from executor threads,
+        # so each of them is never used by two threads at once
+        conn = sqlite3.connect(
+            str(self._path),
+            check_same_thread=False,
+            isolation_level=None,
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def read(self) -> dict:
+        return {owner: self.read_owner(owner) for owner in self.owners()}
+
+    def owners(self) -> typing.List[str]:
+        return [
+            row[0] for row in self._reader.execute("SELECT DISTINCT owner FROM db")
+        ]
+
+    def read_owner(self, owner: str) -> dict:
+        return {
+            key: json.loads(value)
+            for key, value in self._reader.execute(
+                "SELECT key, value FROM db WHERE owner = ?",
+                (_text_key(owner),),
+            )
+        }
+
+    def prepare(
+        self,
+        db: dict,
+        changes: Changes,
+    ) -> typing.List[typing.Tuple[str, tuple]]:
+        """
+        Serialize changed keys
+        :return: List of SQL statements with their parameters
+        """
+        statements = []
+        for owner, keys in changes.items():
+            text_owner = _text_key(owner)
+            values = db[owner] if owner in db else {}
+            if keys is None or not values:
+                statements += [("DELETE FROM db WHERE owner = ?", (text_owner,))]
+                keys = values.keys()
+
+            for key in keys:
+                if key in values:
+                    statements += [
+                        (
+                            "INSERT OR REPLACE INTO db (owner, key, value)"
+                            " VALUES (?, ?, ?)",
+                            (text_owner, _text_key(key), json.dumps(values[key])),
+                        )
+                    ]
+                else:
+                    statements += [
+                        (
+                            "DELETE FROM db WHERE owner = ? AND key = ?",
+                            (text_owner, _text_key(key)),
+                        )
+                    ]
+
+        return statements
+
+    def write(self, payload: typing.List[typing.Tuple[str, tuple]]):
+        if not payload:
+            return
+
+        try:
+            self._writer.execute("BEGIN")
+            for statement, params in payload:
+                self._writer.execute(statement, params)
+            self._writer.execute("COMMIT")
+        except Exception:
+            self._writer.execute("ROLLBACK")
+            raise
+
+    def migrate(self, json_path: Path) -> int:
+        """
+        Import legacy JSON database, if SQLite one is empty. After successful
+        import JSON file is renamed, so it is not imported twice
+        :param json_path: Path to `config-<id>.json`
+        :return: Number of imported owners
+        """
+        if not json_path.exists() or self.owners():
+            return 0
+
+        db = JSONBackend(json_path).read()
+        self.write(self.prepare(db, dict.fromkeys(db)))
+        os.replace(json_path, json_path.with_name(f"{json_path.name}.migrated"))
+        logger.info("Migrated %s owners from %s to SQLite", len(db), json_path)
+        return len(db)
+
+
+class RedisHashBackend(Backend):
+    """
+    Stores each owner as a separate Redis hash with JSON-encoded fields.
+    Only changed fields are written, and other processes, sharing the same
+    database, are notified about the changes through pub/sub
+    """
+
+    lazy = True
+
+    def __init__(self, redis: "redis.Redis", key: str):  # type: ignore  # noqa: F821
+        self._redis = redis
+        self._key = key
+        self._owners_key = f"{key}:owners"
+        self._channel = f"{key}:changes"
+        # Used to ignore own notifications
+        self._id = uuid.uuid4().hex
+        self._callback: typing.Optional[
+            typing.Callable[[Changes, typing.Optional[typing.Dict[str, dict]]], None]
+        ] = None
+        self._listener = None
+
+    def _owner_key(self, owner: str) -> str:
+        return f"{self._key}:db:{owner}"
+
+    def read(self) -> dict:
+        return self.read_owners(self.owners())
+
+    def owners(self) -> typing.List[str]:
+        return [owner.decode() for owner in self._redis.smembers(self._owners_key)]
+
+    @staticmethod
+    def _decode(fields: typing.Dict[bytes, bytes]) -> dict:
+        return {key.decode(): json.loads(value) for key, value in fields.items()}
+
+    def read_owner(self, owner: str) -> dict:
+        return self._decode(self._redis.hgetall(self._owner_key(_text_key(owner))))
+
+    def read_owners(self, owners: typing.Iterable[str]) -> typing.Dict[str, dict]:
+        owners = list(owners)
+        with self._redis.pipeline(transaction=False) as pipe:
+            for owner in owners:
+                pipe.hgetall(self._owner_key(_text_key(owner)))
+
+            return {
+                owner: self._decode(fields)
+                for owner, fields in zip(owners, pipe.execute())
+            }
+
+    def prepare(
+        self,
+        db: dict,
+        changes: Changes,
+    ) -> typing.Tuple[typing.List[typing.Tuple[str, bool, dict, list]], str]:
+        """
+        Serialize changed fields
+        :return: List of `(owner, replace, fields to set, fields to delete)`
+            and notification for other processes
+        """
+        ops = []
+        for owner, keys in changes.items():
+            values = db[owner] if owner in db else {}
+            replace = keys is None or not values
+            if replace:
+                keys = values.keys()
+
+            ops += [
+                (
+                    _text_key(owner),
+                    replace,
+                    {
+                        _text_key(key): json.dumps(values[key])
+                        for key in keys
+                        if key in values
+                    },
+                    [_text_key(key) for key in keys if key not in values],
+                )
+            ]
+
+        message = json.dumps(
+            {
+                "sender": self._id,
+                "changes": {
+                    owner: None if replace else [*fields, *removed]
+                    for owner, replace, fields, removed in ops
+                },
+            }
+        )
+
+        return ops, message
+
+    def write(
+        self,
+        payload: typing.Tuple[typing.List[typing.Tuple[str, bool, dict, list]], str],
+    ):
+        ops, message = payload
+        if not ops:
+            return
+
+        with self._redis.pipeline() as pipe:
+            for owner, replace, fields, removed in ops:
+                owner_key = self._owner_key(owner)
+                if replace:
+                    pipe.delete(owner_key)
+
+                if fields:
+                    pipe.hset(owner_key, mapping=fields)
+                    pipe.sadd(self._owners_key, owner)
+                elif replace:
+                    pipe.srem(self._owners_key, owner)
+
+                if removed and not replace:
+                    pipe.hdel(owner_key, *removed)
+
+            pipe.publish(self._channel, message)
+            pipe.execute()
+
+        logger.debug("Published %s changed owners to Redis", len(ops))
+
+    def subscribe(
+        self,
+        callback: typing.Callable[
+            [Changes, typing.Optional[typing.Dict[str, dict]]], None
+        ],
+    ):
+        self._callback = callback
+        pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(**{self._channel: self._on_message})
+        self._listener = pubsub.run_in_thread(sleep_time=1, daemon=True)
+
+    def _on_message(self, message: dict):
+        try:
+            data = json.loads(message["data"])
+            if data["sender"] == self._id:
+                return
+
+            changes = {
+                owner: None if keys is None else set(keys)
+                for owner, keys in data["changes"].items()
+            }
+        except Exception:
+            logger.debug("Invalid database notification %s", message, exc_info=True)
+            return
+
+        # Changed owners are read here, in listener thread, so the event loop
+        # doesn't wait for Redis when it applies the changes
+        try:
+            values = self.read_owners(changes)
+        except Exception:
+            logger.warning("Can't read changed owners", exc_info=True)
+            values = None
+
+        self._callback(changes, values)
+
+    def migrate(self) -> int:
+        """
+        Import database, stored as a single JSON document by `RedisBackend`, if
+        there are no hashes yet. Legacy key is renamed after successful import
+        :return: Number of imported owners
+        """
+        if not self._redis.exists(self._key) or self.owners():
+            return 0
+
+        db = RedisBackend(self._redis, self._key).read()
+        self.write(self.prepare(db, dict.fromkeys(db)))
+        self._redis.rename(self._key, f"{self._key}:migrated")
+        logger.info("Migrated %s owners to Redis hashes", len(db))
+        return len(db)
@@ -0,0 +1,123 @@
+"""On-disk tier of Telegram entities cache, which survives restarts"""
+
+# ©️ Codrago, 2024-2025
+# This file is a part of Heroku Userbot
+# 🌐 https://github.com/coddrago/Heroku
+# You can redistribute it and/or modify it under the terms of the GNU AGPLv3
+# 🔑 https://www.gnu.org/licenses/agpl-3.0.html
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+import typing
+from pathlib import Path
+
+from herokutl.extensions import BinaryReader
+from herokutl.tl.tlobject import TLObject
+
+logger = logging.getLogger(__name__)
+
+
+class StoredRecord(typing.NamedTuple):
+    """Cache record, as it's stored on disk"""
+
+    cache: str
+    keys: typing.List[typing.Union[str, int]]
+    obj: TLObject
+    ts: float
+    exp: float
+
+
+class EntityStore:
+    """
+    SQLite file with serialized TL objects of cache records. All methods are
+    blocking, so they must be called in a thread
+    """
+
+    def __init__(self, path: Path):
+        self._path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            str(path),
+            check_same_thread=False,
+            isolation_level=None,
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS records (cache TEXT NOT NULL, key TEXT NOT"
+            " NULL, keys TEXT NOT NULL, data BLOB NOT NULL, ts REAL NOT NULL, exp REAL"
+            " NOT NULL, PRIMARY KEY (cache, key)) WITHOUT ROWID"
+        )
+
+    def load(self) -> typing.List[StoredRecord]:
+        """
+        Read records, which are not expired yet
+        :return: List of records
+        """
+        records = []
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT cache, keys, data, ts, exp FROM records WHERE exp > ?",
+                (time.time(),),
+            ).fetchall()
+
+        for cache, keys, data, ts, exp in rows:
+            try:
+                obj = BinaryReader(data).tgread_object()
+            except Exception:
+                # Layer of the stored object might be outdated
+                logger.debug("Can't deserialize stored %s record", cache, exc_info=True)
+                continue
+
+            records += [StoredRecord(cache, json.loads(keys), obj, ts, exp)]
+
+        return records
+
+    def save(self, records: typing.Iterable[StoredRecord]) -> int:
+        """
+        Write records and drop expired ones
+        :param records: Records to write
+        :return: Number of written records
+        """
+        rows = []
+        for record in records:
+            try:
+                rows += [
+                    (
+                        record.cache,
+                        json.dumps(record.keys[0]),
+                        json.dumps(record.keys),
+                        bytes(record.obj),
+                        record.ts,
+                        record.exp,
+                    )
+                ]
+            except Exception:
+                logger.debug("Can't serialize %s record", record.cache, exc_info=True)
+
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO records (cache, key, keys, data, ts, exp)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+                self._conn.execute("DELETE FROM records WHERE exp <= ?", (time.time(),))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+        return len(rows)
+
+    def clear(self) -> int:
+        """
+        Remove all records
+        :return: Number of removed records
+        """
+        with self._lock:
+            return self._conn.execute("DELETE FROM records").rowcount
@@ -0,0 +1,123 @@
+"""Blacklist of chats, where userbots are not welcome, shared by all clients"""
+
+# ©️ Codrago, 2024-2025
+# This file is a part of Heroku Userbot
+# 🌐 https://github.com/coddrago/Heroku
+# You can redistribute it and/or modify it under the terms of the GNU AGPLv3
+# 🔑 https://www.gnu.org/licenses/agpl-3.0.html
+
+import asyncio
+import logging
+import time
+import typing
+
+import requests
+
+from . import utils
+
+logger = logging.getLogger(__name__)
+
+EXTERNAL_BL_URL = "https://ubguard.codrago.life/blacklist.json"
+# Blacklist is refreshed at the start of each time bucket of this size. Bucket
+# is doubled each time the blacklist turns out to be unchanged, up to the limit
+REFRESH_INTERVAL = 60
+MAX_REFRESH_INTERVAL = 15 * 60
+REQUEST_TIMEOUT = 10
+
+
+class ExternalBlacklist:
+    """
+    Periodically refreshed blacklist. Conditional requests are used, so
+    unchanged blacklist is not downloaded again
+    """
+
+    def __init__(
+        self,
+        url: str = EXTERNAL_BL_URL,
+        interval: float = REFRESH_INTERVAL,
+        max_interval: float = MAX_REFRESH_INTERVAL,
+    ):
+        """
+        :param url: URL of JSON document with `blacklist` list of chat ids
+        :param interval: Refresh interval in seconds while blacklist changes
+        :param max_interval: Maximum refresh interval, which is reached, when
+            blacklist doesn't change for a long time
+        """
+        self.url = url
+        self._min_interval = interval
+        self._max_interval = max_interval
+        self.interval = interval
+        self.blacklist: typing.FrozenSet[int] = frozenset()
+        self._etag: typing.Optional[str] = None
+        self._last_modified: typing.Optional[str] = None
+        self._task: typing.Optional[asyncio.Task] = None
+
+    def __contains__(self, chat_id: typing.Any) -> bool:
+        return chat_id in self.blacklist
+
+    def __len__(self) -> int:
+        return len(self.blacklist)
+
+    def _fetch(self) -> typing.Optional[typing.FrozenSet[int]]:
+        headers = {}
+        if self._etag:
+            headers["If-None-Match"] = self._etag
+
+        if self._last_modified:
+            headers["If-Modified-Since"] = self._last_modified
+
+        response = requests.get(self.url, headers=headers, timeout=REQUEST_TIMEOUT)
+        if response.status_code == 304:
+            return None
+
+        response.raise_for_status()
+        blacklist = frozenset(response.json()["blacklist"])
+        self._etag = response.headers.get("ETag")
+        self._last_modified = response.headers.get("Last-Modified")
+        return blacklist
+
+    async def refresh(self) -> bool:
+        """
+        Refresh blacklist and adjust refresh interval
+        :return: Whether blacklist has changed
+        """
+        blacklist = await utils.run_sync(self._fetch)
+        if blacklist is None or blacklist == self.blacklist:
+            self.interval = min(self.interval * 2, self._max_interval)
+            return False
+
+        self.blacklist = blacklist
+        self.interval = self._min_interval
+        logger.debug("External blacklist updated, %s chats", len(blacklist))
+        return True
+
+    def start(self):
+        """Start refreshing in background, unless it's already started"""
+        if not self._task or self._task.done():
+            self._task = asyncio.ensure_future(self._refresh_loop())
+
+    async def _refresh_loop(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception:
+                logger.debug("Can't refresh external blacklist", exc_info=True)
+
+            await asyncio.sleep(self.interval - time.time() % self.interval)
+
+
+_shared: typing.Dict[str, ExternalBlacklist] = {}
+
+
+def get_external_blacklist(url: str = EXTERNAL_BL_URL) -> ExternalBlacklist:
+    """
+    Get blacklist, shared by all clients of the process, and make sure it's
+    being refreshed
+    :param url: URL of the blacklist
+    :return: :obj:`ExternalBlacklist`
+    """
+    if url not in _shared:
+        _shared[url] = ExternalBlacklist(url)
+
+    _shared[url].start()
+    return _shared[url]
@@ -60,6 +60,11 @@ def restart():
 
     logging.getLogger().setLevel(logging.CRITICAL)
 
+    # Databases coalesce writes, so push pending changes before process is replaced
+    from .database import flush_all
+
+    flush_all()
+
     print("🔄 Restarting...")
 
 
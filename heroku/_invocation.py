@@ -0,0 +1,96 @@
+"""Context of the running command, watcher, loop or inline handler"""
+
+# ©️ Codrago, 2024-2025
+# This file is a part of Heroku Userbot
+# 🌐 https://github.com/coddrago/Heroku
+# You can redistribute it and/or modify it under the terms of the GNU AGPLv3
+# 🔑 https://www.gnu.org/licenses/agpl-3.0.html
+
+import contextlib
+import contextvars
+import typing
+
+from herokutl.tl.types import Message
+
+
+class Invocation(typing.NamedTuple):
+    """
+    Describes, who is running the current code. It is inherited by tasks,
+    created from the invocation, so it can be read anywhere down the call
+    chain without inspecting the stack
+    """
+
+    client_id: typing.Optional[int] = None
+    module: typing.Optional["Module"] = None  # type: ignore  # noqa: F821
+    command: typing.Optional[typing.Callable] = None
+    message: typing.Optional[Message] = None
+    topic: typing.Optional[int] = None
+
+    @property
+    def is_external(self) -> bool:
+        """Whether the invocation comes from non-core module"""
+        # Only modules, registered by loader, have origin
+        origin = getattr(self.module, "__origin__", None)
+        return isinstance(origin, str) and not origin.startswith("<core")
+
+
+_EMPTY = Invocation()
+_current: contextvars.ContextVar[Invocation] = contextvars.ContextVar(
+    "heroku_invocation",
+    default=_EMPTY,
+)
+
+
+def get_invocation() -> Invocation:
+    """
+    Get context of the current invocation
+    :return: Invocation. Its fields are `None`, if there is no invocation
+    """
+    return _current.get()
+
+
+def get_topic(message: typing.Any) -> typing.Optional[int]:
+    """
+    Get forum topic, which the message belongs to
+    :param message: Message
+    :return: Topic id or `None`, if message is not in topic
+    """
+    if not isinstance(message, Message) or not getattr(
+        message.reply_to, "forum_topic", False
+    ):
+        return None
+
+    return message.reply_to.reply_to_top_id or message.reply_to.reply_to_msg_id
+
+
+@contextlib.contextmanager
+def invocation(**fields) -> typing.Iterator[Invocation]:
+    """
+    Run the block in context of invocation. Fields, which are not passed, are
+    inherited from the outer invocation. `module` and `topic` are derived from
+    `command` and `message`, unless passed explicitly
+    :param fields: Fields of :obj:`Invocation`
+    :return: New invocation
+    """
+    if "command" in fields and "module" not in fields:
+        fields["module"] = getattr(fields["command"], "__self__", None)
+
+    if "message" in fields and "topic" not in fields:
+        fields["topic"] = get_topic(fields["message"])
+
+    token = _current.set(_current.get()._replace(**fields))
+    try:
+        yield _current.get()
+    finally:
+        _current.reset(token)
+
+
+def bind_client(client_id: int):
+    """
+    Attribute the rest of the current task to the client. Used in places,
+    where only the client is known, so wrapping them in :func:`invocation`
+    is not worth it
+    :param client_id: Telegram id of the client
+    """
+    if _current.get().client_id != client_id:
+        _current.set(_current.get()._replace(client_id=client_id))
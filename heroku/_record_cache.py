@@ -0,0 +1,224 @@
+"""Bounded storage of Telegram cache records"""
+
+# ©️ Codrago, 2024-2025
+# This file is a part of Heroku Userbot
+# 🌐 https://github.com/coddrago/Heroku
+# You can redistribute it and/or modify it under the terms of the GNU AGPLv3
+# 🔑 https://www.gnu.org/licenses/agpl-3.0.html
+
+import asyncio
+import collections
+import logging
+import time
+import typing
+
+logger = logging.getLogger(__name__)
+
+Record = typing.TypeVar("Record")
+
+
+class RecordCache(typing.Generic[Record]):
+    """
+    LRU cache of `CacheRecord*` objects with limited size. Each record may be
+    reachable by several keys (e.g. id, `@username` and `username`), but it is
+    stored, counted and evicted as a single entry. Expired records are swept
+    in background
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        min_ttl: float = 60,
+        sweep_interval: float = 60,
+    ):
+        """
+        :param max_size: Maximum number of records. Least recently used ones
+            are evicted, when it's exceeded
+        :param min_ttl: Minimum time in seconds, record is kept for, even if it
+            was saved with zero expiration time
+        :param sweep_interval: Interval in seconds between expired records sweeps
+        """
+        self.max_size = max_size
+        self._min_ttl = min_ttl
+        self._sweep_interval = sweep_interval
+        # id(record) -> [record, keys of the record]
+        self._records: "collections.OrderedDict[int, list]" = (
+            collections.OrderedDict()
+        )
+        self._keys: typing.Dict[typing.Hashable, int] = {}
+        self._sweeper: typing.Optional[asyncio.Task] = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __contains__(self, key: typing.Hashable) -> bool:
+        return key in self._keys
+
+    def __getitem__(self, key: typing.Hashable) -> Record:
+        record_id = self._keys[key]
+        self._records.move_to_end(record_id)
+        return self._records[record_id][0]
+
+    def get(
+        self,
+        key: typing.Hashable,
+        default: typing.Optional[Record] = None,
+    ) -> typing.Optional[Record]:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def fresh(
+        self,
+        key: typing.Hashable,
+        exp: int,
+        strict: bool = False,
+    ) -> typing.Optional[Record]:
+        """
+        Get record, if it's not older than `exp`, and count hit or miss
+        :param key: Any key of the record
+        :param exp: Maximum age of the record in seconds. If falsy and not `strict`,
+            record of any age is returned
+        :param strict: Whether to ignore records, which are expired by their own
+            expiration time
+        :return: Record or `None`
+        """
+        record = self.get(key)
+        if record is not None:
+            if strict:
+                fresh = not record.expired and record.ts + exp > time.time()
+            else:
+                fresh = not exp or record.ts + exp > time.time()
+
+            if fresh:
+                self.hits += 1
+                return record
+
+        self.misses += 1
+        return None
+
+    def set(self, record: Record, *keys: typing.Hashable):
+        """
+        Save record under the given keys. Keys, which pointed to other records,
+        are moved to this one
+        :param record: Record to save
+        :param keys: Keys of the record
+        """
+        keys = [key for key in dict.fromkeys(keys) if key]
+        if not keys:
+            return
+
+        for key in keys:
+            self._unlink(key)
+
+        self._records[id(record)] = [record, keys]
+        self._keys.update(dict.fromkeys(keys, id(record)))
+
+        while len(self._records) > self.max_size:
+            _, (_, evicted_keys) = self._records.popitem(last=False)
+            for key in evicted_keys:
+                del self._keys[key]
+
+            self.evictions += 1
+
+        self._ensure_sweeper()
+
+    def pop(
+        self,
+        key: typing.Hashable,
+        default: typing.Optional[Record] = None,
+    ) -> typing.Optional[Record]:
+        """
+        Remove record with all its keys
+        :param key: Any key of the record
+        :return: Removed record or `default`
+        """
+        if key not in self._keys:
+            return default
+
+        record, keys = self._records.pop(self._keys[key])
+        for key in keys:
+            del self._keys[key]
+
+        return record
+
+    def clear(self) -> int:
+        """
+        Remove all records
+        :return: Number of removed records
+        """
+        count = len(self._records)
+        self._records.clear()
+        self._keys.clear()
+        return count
+
+    def records(self) -> typing.List[typing.Tuple[Record, typing.List[typing.Hashable]]]:
+        """
+        :return: Records with their keys from the least to the most recently used
+        """
+        return [(record, list(keys)) for record, keys in self._records.values()]
+
+    def sweep(self, now: typing.Optional[float] = None) -> int:
+        """
+        Remove expired records
+        :param now: Current time
+        :return: Number of removed records
+        """
+        now = now or time.time()
+        expired = [
+            record_id
+            for record_id, (record, _) in self._records.items()
+            if record.expired and record.ts + self._min_ttl < now
+        ]
+
+        for record_id in expired:
+            _, keys = self._records.pop(record_id)
+            for key in keys:
+                del self._keys[key]
+
+        self.expirations += len(expired)
+        return len(expired)
+
+    @property
+    def stats(self) -> typing.Dict[str, int]:
+        """Size of the cache and hit, miss, eviction and expiration counters"""
+        return {
+            "records": len(self._records),
+            "keys": len(self._keys),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+    def _unlink(self, key: typing.Hashable):
+        if (record_id := self._keys.pop(key, None)) is None:
+            return
+
+        keys = self._records[record_id][1]
+        keys.remove(key)
+        if not keys:
+            del self._records[record_id]
+
+    def _ensure_sweeper(self):
+        if self._sweeper and not self._sweeper.done():
+            return
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+
+        self._sweeper = loop.create_task(self._sweep_loop())
+
+    async def _sweep_loop(self):
+        # Sweeper stops, when cache becomes empty, and is restarted on next `set`
+        while self._records:
+            await asyncio.sleep(self._sweep_interval)
+            if count := self.sweep():
+                logger.debug("Swept %s expired cache records", count)
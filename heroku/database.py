@@ -11,12 +11,15 @@
 # 🔑 https://www.gnu.org/licenses/agpl-3.0.html
 
 import asyncio
+import atexit
 import collections
+import contextlib
 import json
 import logging
 import os
-import re
+import threading
 import time
+import weakref
 
 try:
     import redis
@@ -31,6 +34,13 @@ from herokutl.errors.rpcerrorlist import ChannelsTooMuchError
 from herokutl.tl.types import Message, User
 
 from . import main, utils
+from ._db_backends import (
+    Backend,
+    Changes,
+    JSONBackend,
+    RedisHashBackend,
+    SQLiteBackend,
+)
 from .pointers import (
     BaseSerializingMiddlewareDict,
     BaseSerializingMiddlewareList,
@@ -54,6 +64,44 @@ __all__ = [
 
 logger = logging.getLogger(__name__)
 
+# Snapshots of database are taken no more often than this amount of seconds
+SNAPSHOT_INTERVAL = 3
+SNAPSHOTS_LIMIT = 15
+# Snapshots are dropped, if their serialized values exceed this amount of bytes
+SNAPSHOTS_MEMORY = 8 * 1024 * 1024
+
+_instances: "weakref.WeakValueDictionary[int, Database]" = (
+    weakref.WeakValueDictionary()
+)
+
+
+def flush_all():
+    """Synchronously write pending changes of all databases. Used before exit/restart"""
+    for db in list(_instances.values()):
+        try:
+            db.flush_sync()
+        except Exception:
+            logger.exception("Can't flush database %s", db)
+
+
+atexit.register(flush_all)
+
+
+class Snapshot(typing.NamedTuple):
+    """
+    Frozen state of database owners. Owners, which didn't change between
+    snapshots, share the same serialized value
+    """
+
+    id: int
+    time: float
+    owners: typing.Dict[str, str]
+
+    @property
+    def size(self) -> int:
+        """Total size of serialized owners, including shared ones"""
+        return sum(map(len, self.owners.values()))
+
 
 class NoAssetsChannel(Exception):
     """Raised when trying to read/store asset with no asset channel present"""
@@ -63,43 +111,179 @@ class Database(dict):
     def __init__(self, client: CustomTelegramClient):
         super().__init__()
         self._client: CustomTelegramClient = client
-        self._next_revision_call: int = 0
-        self._revisions: typing.List[dict] = []
+        self._next_snapshot: float = 0
+        self._snapshots: typing.List[Snapshot] = []
+        self._snapshot_dirty: typing.Set[str] = set()
         self._assets: int = None
         self._me: User = None
         self._redis: redis.Redis = None
+        self._backend: Backend = None
         self._saving_task: asyncio.Future = None
+        self._prefetching: asyncio.Future = None
+        self._versions: typing.Dict[str, int] = collections.defaultdict(int)
+        self._dirty: Changes = {}
+        self._unloaded: typing.Set[str] = set()
+        self._flush_lock = asyncio.Lock()
+        self._write_lock = threading.Lock()
+        self._serial: int = 0
+        self._written_serial: int = 0
+        # Changes of payloads, which were prepared, but not written yet
+        self._unwritten: typing.Dict[int, Changes] = {}
+        self._unwritten_lock = threading.Lock()
+        _instances[id(self)] = self
 
     def __repr__(self):
         return object.__repr__(self)
 
-    def _redis_save_sync(self):
-        with self._redis.pipeline() as pipe:
-            pipe.set(
-                str(self._client.tg_id),
-                json.dumps(self, ensure_ascii=True),
-            )
-            pipe.execute()
+    # Lazy backends don't read owners on startup. These methods make sure,
+    # that owner is read before it's accessed and that the whole-database
+    # operations (iteration, `json.dumps`, `clear`) see every owner. Bulk
+    # changes bump versions of the owners, so cached derived values are rebuilt
+
+    def __missing__(self, owner: str) -> dict:
+        if owner not in self._unloaded:
+            raise KeyError(owner)
+
+        self._load(owner)
+        return super().__getitem__(owner)
+
+    def __contains__(self, owner: str) -> bool:
+        return super().__contains__(owner) or owner in self._unloaded
+
+    def __iter__(self) -> typing.Iterator[str]:
+        self._load_all()
+        return super().__iter__()
+
+    def __len__(self) -> int:
+        return super().__len__() + len(self._unloaded)
+
+    def __setitem__(self, owner: str, values: dict):
+        self._unloaded.discard(owner)
+        super().__setitem__(owner, values)
+        self._versions[owner] += 1
+
+    def __delitem__(self, owner: str):
+        self._load(owner)
+        super().__delitem__(owner)
+        self._versions[owner] += 1
+        self._dirty[owner] = None
+
+    def update(self, *args, **kwargs):
+        for owner, values in dict(*args, **kwargs).items():
+            self[owner] = values
+
+    def keys(self) -> typing.KeysView:
+        self._load_all()
+        return super().keys()
+
+    def values(self) -> typing.ValuesView:
+        self._load_all()
+        return super().values()
+
+    def items(self) -> typing.ItemsView:
+        self._load_all()
+        return super().items()
+
+    def copy(self) -> dict:
+        self._load_all()
+        return dict(super().items())
+
+    def pop(self, owner: str, *args) -> typing.Any:
+        self._load(owner)
+        if super().__contains__(owner):
+            self._versions[owner] += 1
+            self._dirty[owner] = None
+
+        return super().pop(owner, *args)
+
+    def clear(self):
+        for owner in [*super().keys(), *self._unloaded]:
+            self._versions[owner] += 1
+            self._dirty[owner] = None
+
+        self._unloaded.clear()
+        super().clear()
+
+    def _load(self, owner: str, values: typing.Optional[dict] = None):
+        if owner in self._unloaded:
+            self._unloaded.discard(owner)
+            if values is None:
+                values = self._backend.read_owner(owner)
+
+            if values:
+                super().__setitem__(owner, values)
+                if self._snapshots:
+                    # Owner couldn't change before it was read, so it's the
+                    # same in every existing snapshot
+                    frozen = json.dumps(values)
+                    for snapshot in self._snapshots:
+                        snapshot.owners.setdefault(owner, frozen)
+
+    async def _prefetch(self):
+        """
+        Read owners of lazy storage in a thread, so their first access doesn't
+        block the event loop. Owners, accessed before it's done, are read
+        synchronously as usual
+        """
+        owners = list(self._unloaded)
+        try:
+            remote = await utils.run_sync(self._backend.read_owners, owners)
+        except Exception:
+            logger.warning("Can't prefetch database", exc_info=True)
+            return
 
-    async def remote_force_save(self) -> bool:
-        """Force save database to remote endpoint without waiting"""
-        if not self._redis:
-            return False
+        for owner in owners:
+            # Owners, which were loaded or invalidated meanwhile, are skipped
+            self._load(owner, remote[owner])
 
-        await utils.run_sync(self._redis_save_sync)
-        logger.debug("Published db to Redis")
-        return True
+    def _load_all(self):
+        for owner in list(self._unloaded):
+            self._load(owner)
 
-    async def _redis_save(self) -> bool:
-        """Save database to redis"""
+    def invalidate(
+        self,
+        changes: Changes,
+        remote: typing.Optional[typing.Dict[str, dict]] = None,
+    ):
+        """
+        Replace local copies of owners, changed by another process, with the
+        remote ones. Keys with unsaved local changes are kept
+        :param changes: Changed owners and keys
+        :param remote: Changed owners, already read from the storage. If not
+            passed, they are read here, blocking the event loop
+        """
+        if remote is None:
+            remote = self._backend.read_owners(changes)
+
+        for owner, keys in changes.items():
+            self._versions[owner] += 1
+            self._snapshot_dirty.add(owner)
+            if owner not in self._dirty:
+                super().pop(owner, None)
+                self._unloaded.add(owner)
+                self._load(owner, remote[owner])
+                continue
+
+            if (local := self._dirty[owner]) is None:
+                # The whole owner will be overwritten with local copy anyway
+                continue
+
+            values = super().setdefault(owner, {})
+            if keys is None:
+                keys = remote[owner].keys() | values.keys()
+
+            for key in keys - local:
+                if key in remote[owner]:
+                    values[key] = remote[owner][key]
+                else:
+                    values.pop(key, None)
+
+    async def remote_force_save(self) -> bool:
+        """Force save database to remote endpoint without waiting"""
         if not self._redis:
             return False
 
-        await asyncio.sleep(5)
-        await utils.run_sync(self._redis_save_sync)
-        logger.debug("Published db to Redis")
-        self._saving_task = None
-        return True
+        return await self.flush()
 
     async def redis_init(self) -> bool:
         """Init redis database"""
@@ -110,14 +294,41 @@ class Database(dict):
         else:
             return False
 
+    def _init_backend(self) -> Backend:
+        if self._redis:
+            backend = RedisHashBackend(self._redis, str(self._client.tg_id))
+            backend.migrate()
+            return backend
+
+        if (
+            os.environ.get("DB_BACKEND") or main.get_config_key("db_backend")
+        ) == "sqlite":
+            backend = SQLiteBackend(main.BASE_PATH / f"config-{self._client.tg_id}.db")
+            backend.migrate(self._db_file)
+            return backend
+
+        return JSONBackend(self._db_file)
+
     async def init(self):
         """Asynchronous initialization unit"""
         if os.environ.get("REDIS_URL") or main.get_config_key("redis_uri"):
             await self.redis_init()
 
         self._db_file = main.BASE_PATH / f"config-{self._client.tg_id}.json"
+        self._backend = self._init_backend()
         self.read()
 
+        loop = asyncio.get_running_loop()
+        self._backend.subscribe(
+            lambda changes, remote: loop.call_soon_threadsafe(
+                self.invalidate,
+                changes,
+                remote,
+            )
+        )
+        if self._unloaded:
+            self._prefetching = asyncio.ensure_future(self._prefetch())
+
         try:
             self._assets, _ = await utils.asset_channel(
                 self._client,
@@ -138,34 +349,36 @@ class Database(dict):
 
     def read(self):
         """Read database and stores it in self"""
-        if self._redis:
-            try:
-                self.update(
-                    **json.loads(
-                        self._redis.get(
-                            str(self._client.tg_id),
-                        ).decode(),
-                    )
-                )
-            except Exception:
-                logger.exception("Error reading redis database")
-            return
+        if self._backend.lazy:
+            self._unloaded = set(self._backend.owners()) - set(super().keys())
+        else:
+            self.update(**self._backend.read())
 
-        try:
-            db = self._db_file.read_text()
-            if re.search(r'"(hikka\.)(\S+\":)', db):
-                logging.warning("Converting db after update")
-                db = re.sub(r'(hikka\.)(\S+\":)', lambda m: 'heroku.' + m.group(2), db)
-            self.update(**json.loads(db))
-        except json.decoder.JSONDecodeError:
-            logger.warning("Database read failed! Creating new one...")
-        except FileNotFoundError:
-            logger.debug("Database file not found, creating new one...")
+        self._snapshot_dirty.update(super().keys())
+        self.take_snapshot()
 
     def process_db_autofix(self, db: dict) -> bool:
+        if db is self:
+            # Only broken owners of the database itself are rolled back
+            if broken := [
+                owner
+                for owner, values in super().items()
+                if not utils.is_serializable(values)
+            ]:
+                if not self._snapshots:
+                    return False
+
+                self.restore_snapshot(owners=broken)
+
+            return True
+
         if not utils.is_serializable(db):
             return False
 
+        self._autofix_structure(db)
+        return True
+
+    def _autofix_structure(self, db: dict):
         for key, value in db.copy().items():
             if not isinstance(key, (str, int)):
                 logger.warning(
@@ -198,49 +411,242 @@ class Database(dict):
                     )
                     continue
 
-        return True
+    def take_snapshot(self) -> Snapshot:
+        """
+        Freeze current state of loaded owners. Only owners, which changed
+        since the previous snapshot, are serialized, others are shared with it
+        :return: New snapshot
+        """
+        previous = self._snapshots[-1] if self._snapshots else None
+        owners = dict(previous.owners) if previous else {}
+
+        for owner in self._snapshot_dirty:
+            if super().__contains__(owner):
+                owners[owner] = json.dumps(super().__getitem__(owner))
+            else:
+                owners.pop(owner, None)
+
+        self._snapshot_dirty.clear()
+        self._snapshots += [
+            Snapshot(previous.id + 1 if previous else 1, time.time(), owners)
+        ]
+        self._next_snapshot = time.time() + SNAPSHOT_INTERVAL
+
+        # Oldest snapshots are dropped first, but the latest one is always kept
+        while len(self._snapshots) > 1 and (
+            len(self._snapshots) > SNAPSHOTS_LIMIT
+            or self.snapshots_size > SNAPSHOTS_MEMORY
+        ):
+            self._snapshots.pop(0)
+
+        return self._snapshots[-1]
+
+    @property
+    def snapshots(self) -> typing.List[Snapshot]:
+        """Snapshots from the oldest to the latest"""
+        return list(self._snapshots)
+
+    @property
+    def snapshots_size(self) -> int:
+        """Memory, used by snapshots, with shared values counted once"""
+        return sum(
+            {
+                id(frozen): len(frozen)
+                for snapshot in self._snapshots
+                for frozen in snapshot.owners.values()
+            }.values()
+        )
 
-    def save(self) -> bool:
-        """Save database"""
-        if not self.process_db_autofix(self):
-            try:
-                rev = self._revisions.pop()
-                while not self.process_db_autofix(rev):
-                    rev = self._revisions.pop()
-            except IndexError:
+    def restore_snapshot(
+        self,
+        snapshot_id: typing.Optional[int] = None,
+        owners: typing.Optional[typing.Iterable[str]] = None,
+    ) -> Snapshot:
+        """
+        Roll the database back to the snapshot. Owners, which were not read
+        neither at the moment of snapshot, nor since then, are left intact
+        :param snapshot_id: ID of snapshot to restore, latest one by default
+        :param owners: Restore only these owners, all loaded ones by default
+        :return: Restored snapshot
+        :raises ValueError: If there is no such snapshot
+        """
+        try:
+            snapshot = next(
+                snapshot
+                for snapshot in reversed(self._snapshots)
+                if snapshot_id is None or snapshot.id == snapshot_id
+            )
+        except StopIteration:
+            raise ValueError(f"Snapshot {snapshot_id} not found") from None
+
+        if owners is None:
+            owners = snapshot.owners.keys() | super().keys()
+
+        for owner in owners:
+            self._unloaded.discard(owner)
+            if owner in snapshot.owners:
+                super().__setitem__(owner, json.loads(snapshot.owners[owner]))
+            else:
+                super().pop(owner, None)
+
+            self._versions[owner] += 1
+            self._dirty[owner] = None
+
+        logger.warning("Database was rolled back to snapshot %s", snapshot.id)
+        self._schedule_save()
+        return snapshot
+
+    def _prepare(self) -> typing.Tuple[int, typing.Any]:
+        """
+        Serialize changes, made since the last write, with the backend
+        :return: Serial number of the payload and the payload itself
+        """
+        dirty, self._dirty = self._dirty, {}
+
+        # Payloads are deltas, so an older one may be dropped by `_write` only
+        # if every newer payload carries its changes as well
+        with self._unwritten_lock:
+            unwritten = list(self._unwritten.values())
+
+        for changes in unwritten:
+            for owner, keys in changes.items():
+                if keys is None:
+                    dirty[owner] = None
+                elif (current := dirty.setdefault(owner, set())) is not None:
+                    current.update(keys)
+
+        changed = {
+            owner: dict.__getitem__(self, owner)
+            for owner in dirty
+            if dict.__contains__(self, owner)
+        }
+
+        self._autofix_structure(changed)
+
+        for owner in dirty:
+            if owner not in changed and super().__contains__(owner):
+                # Dropped by autofix
+                super().pop(owner)
+                dirty[owner] = None
+
+        try:
+            payload = self._backend.prepare(self, dirty)
+        except (TypeError, ValueError):
+            for owner, keys in dirty.items():
+                self._mark_dirty(owner, keys)
+
+            if not self.process_db_autofix(self):
                 raise RuntimeError(
-                    "Can't find revision to restore broken database from "
+                    "Can't find snapshot to restore broken database from "
                     "database is most likely broken and will lead to problems, "
                     "so its save is forbidden."
                 )
 
-            self.clear()
-            self.update(**rev)
-
             raise RuntimeError(
-                "Rewriting database to the last revision because new one destructed it"
+                "Rewriting broken owners with the last snapshot because new"
+                " values destructed them"
             )
 
-        if self._next_revision_call < time.time():
-            self._revisions += [dict(self)]
-            self._next_revision_call = time.time() + 3
+        self._snapshot_dirty.update(dirty)
+        if self._next_snapshot < time.time():
+            self.take_snapshot()
 
-        while len(self._revisions) > 15:
-            self._revisions.pop()
+        self._serial += 1
+        with self._unwritten_lock:
+            self._unwritten[self._serial] = dirty
 
-        if self._redis:
-            if not self._saving_task:
-                self._saving_task = asyncio.ensure_future(self._redis_save())
-            return True
+        return self._serial, payload
+
+    def _write(self, serial: int, payload: typing.Any) -> bool:
+        """Write prepared payload with the backend"""
+        with self._write_lock:
+            if serial < self._written_serial:
+                # Newer payload, which includes these changes, was already
+                # written from another thread
+                return True
 
+            try:
+                self._backend.write(payload)
+            except Exception:
+                logger.exception("Database save failed!")
+                return False
+
+            self._written_serial = serial
+            with self._unwritten_lock:
+                for written in [key for key in self._unwritten if key <= serial]:
+                    del self._unwritten[written]
+
+        return True
+
+    def _mark_dirty(self, owner: str, keys: typing.Optional[typing.Iterable[str]]):
+        if keys is None:
+            self._dirty[owner] = None
+        elif (current := self._dirty.setdefault(owner, set())) is not None:
+            current.update(keys)
+
+    def _schedule_save(self) -> bool:
         try:
-            self._db_file.write_text(json.dumps(self, indent=4))
-        except Exception:
-            logger.exception("Database save failed!")
-            return False
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return self.flush_sync()
+
+        if not self._saving_task:
+            self._saving_task = asyncio.ensure_future(self._delayed_save())
 
         return True
 
+    async def _delayed_save(self):
+        await asyncio.sleep(self._backend.save_delay)
+        self._saving_task = None
+        await self.flush()
+
+    def _cancel_pending_save(self):
+        if self._saving_task and self._saving_task is not asyncio.current_task():
+            self._saving_task.cancel()
+
+        self._saving_task = None
+
+    async def flush(self) -> bool:
+        """
+        Write pending changes now, without waiting for coalescing delay.
+        Serialization happens in the event loop, I/O - in a thread
+        :return: True if database was written successfully
+        """
+        self._cancel_pending_save()
+
+        async with self._flush_lock:
+            try:
+                serial, payload = self._prepare()
+            except RuntimeError:
+                logger.exception("Database save failed!")
+                return False
+
+            return await utils.run_sync(self._write, serial, payload)
+
+    def flush_sync(self) -> bool:
+        """
+        Write pending changes synchronously. Use it only when event loop
+        can't be awaited anymore (e.g. right before restart)
+        """
+        with contextlib.suppress(RuntimeError):
+            self._cancel_pending_save()
+
+        if not (self._dirty or self._unwritten) or not self._backend:
+            return True
+
+        return self._write(*self._prepare())
+
+    def save(self) -> bool:
+        """
+        Schedule save of the whole database. Use it after bulk changes made
+        bypassing `set` (e.g. `clear`, `update` or values mutated in place)
+        """
+        for owner in super().keys():
+            self._versions[owner] += 1
+            self._dirty[owner] = None
+
+        return self._schedule_save()
+
     async def store_asset(self, message: Message) -> int:
         """
         Save assets
@@ -307,8 +713,22 @@ class Database(dict):
                 "JSON-serializable value which will cause errors"
             )
 
+        self._load(owner)
         super().setdefault(owner, {})[key] = value
-        return self.save()
+        self._versions[owner] += 1
+        self._mark_dirty(owner, (key,))
+        return self._schedule_save()
+
+    def get_version(self, owner: str) -> int:
+        """
+        Get the write counter of `owner`. It is bumped on every `set` call and
+        on bulk changes of the owner (`clear`, `pop`, `update`, `save`), so
+        consumers can cache values derived from the owner's keys and rebuild
+        them only when the counter changes
+        :param owner: Database owner (usually module name)
+        :return: Current version of the owner
+        """
+        return self._versions[owner]
 
     def pointer(
         self,
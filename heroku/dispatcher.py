@@ -31,20 +31,21 @@
 import asyncio
 import collections
 import contextlib
-import copy
-import inspect
+import functools
 import logging
 import re
 import sys
+import time
 import traceback
 import typing
 
-import requests
 from herokutl import events
 from herokutl.errors import FloodWaitError, RPCError
 from herokutl.tl.types import Message
 
 from . import main, security, utils
+from ._external_blacklist import get_external_blacklist
+from ._invocation import invocation
 from .database import Database
 from .loader import Modules
 from .tl_cache import CustomTelegramClient
@@ -99,12 +100,376 @@ ALL_TAGS = [
     "aliases",
 ]
 
+LAYOUT_CHANGE = str.maketrans(ru_keys + en_keys, en_keys + ru_keys)
 
-def _decrement_ratelimit(delay, data, key, severity):
-    def inner():
-        data[key] = max(0, data[key] - severity)
 
-    asyncio.get_event_loop().call_later(delay, inner)
+class RoutingIndex:
+    """
+    Snapshot of routing-related settings of `heroku.main`, prepared for O(1) lookups.
+    It is rebuilt by dispatcher only when the owner's database version changes
+    """
+
+    def __init__(self, db: Database, version: int):
+        self.version = version
+
+        self.prefix = db.get(main.__name__, "command_prefix", ".")
+        self.prefixes = {
+            str(user): prefix
+            for user, prefix in db.get(main.__name__, "command_prefixes", {}).items()
+        }
+        self.translated = {
+            prefix: prefix.translate(LAYOUT_CHANGE)
+            for prefix in {self.prefix, *self.prefixes.values()}
+        }
+
+        self.blacklist_chats = frozenset(db.get(main.__name__, "blacklist_chats", []))
+        self.whitelist_chats = frozenset(db.get(main.__name__, "whitelist_chats", []))
+        self.whitelist_modules = frozenset(
+            db.get(main.__name__, "whitelist_modules", [])
+        )
+
+        self.no_nickname = db.get(main.__name__, "no_nickname", False)
+        self.nonickcmds = frozenset(db.get(main.__name__, "nonickcmds", []))
+        self.nonickusers = frozenset(db.get(main.__name__, "nonickusers", []))
+        self.nonickchats = frozenset(db.get(main.__name__, "nonickchats", []))
+        self.grep = db.get(main.__name__, "grep", False)
+        self.disabled_watchers = {
+            modname: frozenset(rules)
+            for modname, rules in db.get(main.__name__, "disabled_watchers", {}).items()
+        }
+
+    def get_prefix(self, initiator: int, me: int) -> str:
+        return (
+            self.prefix
+            if initiator == me
+            else self.prefixes.get(str(initiator), self.prefix)
+        )
+
+    def translate_prefix(self, prefix: str) -> str:
+        try:
+            return self.translated[prefix]
+        except KeyError:
+            return prefix.translate(LAYOUT_CHANGE)
+
+    def chat_blocked(self, chat_id: int) -> bool:
+        return chat_id in self.blacklist_chats or bool(
+            self.whitelist_chats and chat_id not in self.whitelist_chats
+        )
+
+    def module_blocked(self, chat_id: int, module: str) -> bool:
+        key = f"{chat_id}.{module}"
+        return key in self.blacklist_chats or bool(
+            self.whitelist_modules and key not in self.whitelist_modules
+        )
+
+
+class MessageFacts:
+    """
+    Facts about the event, which are used by tag filters. Each fact is computed
+    at most once per event and shared between all watchers
+    """
+
+    def __init__(self, dispatcher: "CommandDispatcher", event: typing.Any):
+        self._dispatcher = dispatcher
+        self.event = event
+        self.message = (
+            event if isinstance(event, Message) else getattr(event, "message", event)
+        )
+        self._is_command = None
+
+    async def is_command(self) -> bool:
+        if self._is_command is None:
+            self._is_command = bool(
+                await self._dispatcher._handle_command(self.event, watcher=True)
+            )
+
+        return self._is_command
+
+    @functools.cached_property
+    def is_message(self) -> bool:
+        return isinstance(self.message, Message)
+
+    @functools.cached_property
+    def out(self) -> typing.Optional[bool]:
+        return getattr(self.message, "out", None)
+
+    @functools.cached_property
+    def media(self) -> bool:
+        return bool(getattr(self.message, "media", False))
+
+    @functools.cached_property
+    def mime_type(self) -> str:
+        return utils.mime_type(self.message)
+
+    @functools.cached_property
+    def sticker(self) -> bool:
+        return bool(getattr(self.message, "sticker", False))
+
+    @functools.cached_property
+    def document(self) -> bool:
+        return bool(getattr(self.message, "document", False))
+
+    @functools.cached_property
+    def via_bot_id(self) -> bool:
+        return bool(getattr(self.message, "via_bot_id", False))
+
+    @functools.cached_property
+    def is_channel(self) -> bool:
+        return bool(getattr(self.message, "is_channel", False))
+
+    @functools.cached_property
+    def is_group(self) -> bool:
+        return bool(getattr(self.message, "is_group", False))
+
+    @functools.cached_property
+    def private(self) -> bool:
+        return bool(getattr(self.message, "private", False))
+
+    @functools.cached_property
+    def fwd_from(self) -> bool:
+        return bool(getattr(self.message, "fwd_from", False))
+
+    @functools.cached_property
+    def reply(self) -> bool:
+        return bool(getattr(self.message, "reply_to_msg_id", False))
+
+    @functools.cached_property
+    def mentioned(self) -> bool:
+        return bool(getattr(self.message, "mentioned", False))
+
+    @functools.cached_property
+    def chat_id(self) -> int:
+        return utils.get_chat_id(self.message)
+
+
+def _chat_id_tag(facts: MessageFacts, func: callable) -> bool:
+    chat_id = func.chat_id
+    if str(chat_id).startswith("-100"):
+        chat_id = int(str(chat_id)[4:])
+
+    return facts.chat_id == chat_id
+
+
+TAG_PREDICATES: typing.Dict[str, typing.Callable[[MessageFacts, callable], bool]] = {
+    "out": lambda f, _: f.out is None or f.out,
+    "in": lambda f, _: f.out is not None and not f.out,
+    "only_messages": lambda f, _: f.is_message,
+    "editable": lambda f, _: (
+        not f.out and not f.fwd_from and not f.sticker and not f.via_bot_id
+    ),
+    "no_media": lambda f, _: not f.is_message or not f.media,
+    "only_media": lambda f, _: f.is_message and f.media,
+    "only_photos": lambda f, _: f.mime_type.startswith("image/"),
+    "only_videos": lambda f, _: f.mime_type.startswith("video/"),
+    "only_audios": lambda f, _: f.mime_type.startswith("audio/"),
+    "only_stickers": lambda f, _: f.sticker,
+    "only_docs": lambda f, _: f.document,
+    "only_inline": lambda f, _: f.via_bot_id,
+    "only_channels": lambda f, _: f.is_channel and not f.is_group,
+    "no_channels": lambda f, _: not f.is_channel,
+    "no_groups": lambda f, _: not f.is_group or f.private or f.is_channel,
+    "only_groups": lambda f, _: f.is_group or not f.private and not f.is_channel,
+    "no_pm": lambda f, _: not f.private,
+    "only_pm": lambda f, _: f.private,
+    "no_inline": lambda f, _: not f.via_bot_id,
+    "no_stickers": lambda f, _: not f.sticker,
+    "no_docs": lambda f, _: not f.document,
+    "no_audios": lambda f, _: not f.mime_type.startswith("audio/"),
+    "no_videos": lambda f, _: not f.mime_type.startswith("video/"),
+    "no_photos": lambda f, _: not f.mime_type.startswith("image/"),
+    "no_forwards": lambda f, _: not f.fwd_from,
+    "no_reply": lambda f, _: not f.reply,
+    "only_forwards": lambda f, _: f.fwd_from,
+    "only_reply": lambda f, _: f.reply,
+    "mention": lambda f, _: f.mentioned,
+    "no_mention": lambda f, _: not f.mentioned,
+    "startswith": lambda f, func: (
+        f.is_message and f.message.raw_text.startswith(func.startswith)
+    ),
+    "endswith": lambda f, func: (
+        f.is_message and f.message.raw_text.endswith(func.endswith)
+    ),
+    "contains": lambda f, func: f.is_message and func.contains in f.message.raw_text,
+    "filter": lambda f, func: callable(func.filter) and func.filter(f.message),
+    "from_id": lambda f, func: getattr(f.message, "sender_id", None) == func.from_id,
+    "chat_id": _chat_id_tag,
+    "regex": lambda f, func: (
+        f.is_message and re.search(func.regex, f.message.raw_text)
+    ),
+}
+
+
+class TagFilter:
+    """Tags of a single function, compiled into an ordered list of predicates"""
+
+    def __init__(self, func: callable):
+        self.no_commands = bool(getattr(func, "no_commands", False))
+        self.only_commands = bool(getattr(func, "only_commands", False))
+        self.checks = tuple(
+            (tag, TAG_PREDICATES[tag])
+            for tag in ALL_TAGS
+            if tag in TAG_PREDICATES and getattr(func, tag, False)
+        )
+
+    async def __call__(
+        self,
+        facts: MessageFacts,
+        func: callable,
+    ) -> typing.Optional[str]:
+        """
+        Run compiled checks against the event
+        :param facts: Facts of the event
+        :param func: The function, which tags are checked
+        :return: The reason for the tag to fail
+        """
+        if self.no_commands and await facts.is_command():
+            return "no_commands"
+
+        if self.only_commands and not await facts.is_command():
+            return "only_commands"
+
+        return next(
+            (tag for tag, predicate in self.checks if not predicate(facts, func)),
+            None,
+        )
+
+
+def compile_tags(func: callable) -> TagFilter:
+    """
+    Get compiled tag filter of the function, compiling it on first use
+    :param func: Function (or bound method) with tags
+    :return: Compiled tag filter
+    """
+    target = getattr(func, "__func__", func)
+    if not (tag_filter := getattr(target, "_heroku_tag_filter", None)):
+        tag_filter = target._heroku_tag_filter = TagFilter(func)
+
+    return tag_filter
+
+
+class RawHandlerTable:
+    """
+    Raw handlers, bucketed by the update class they subscribed to.
+    Buckets are resolved on the first update of each class and reset
+    whenever a handler is added or removed
+    """
+
+    def __init__(self):
+        self._handlers: typing.List[callable] = []
+        self._buckets: typing.Dict[type, typing.Tuple[callable, ...]] = {}
+        self._handled = collections.Counter()
+        self._dropped = collections.Counter()
+
+    def __iter__(self) -> typing.Iterator[callable]:
+        return iter(self._handlers.copy())
+
+    def __len__(self) -> int:
+        return len(self._handlers)
+
+    def add(self, handler: callable):
+        """Subscribe handler to its `updates`"""
+        self._handlers.append(handler)
+        self._buckets.clear()
+
+    def remove(self, handler: callable):
+        """Unsubscribe handler from all of its `updates`"""
+        self._handlers.remove(handler)
+        self._buckets.clear()
+
+    def get(self, update_type: type) -> typing.Tuple[callable, ...]:
+        """
+        Get handlers, subscribed to the update class
+        :param update_type: Class of the update
+        :return: Tuple of handlers in registration order
+        """
+        try:
+            return self._buckets[update_type]
+        except KeyError:
+            bucket = self._buckets[update_type] = tuple(
+                handler
+                for handler in self._handlers
+                if issubclass(update_type, tuple(handler.updates))
+            )
+            return bucket
+
+    def count(self, update_type: type, handled: bool):
+        (self._handled if handled else self._dropped)[update_type.__name__] += 1
+
+    @property
+    def stats(self) -> typing.Dict[str, typing.Dict[str, int]]:
+        """Per-type counts of updates, which reached handlers or were dropped"""
+        return {
+            name: {"handled": self._handled[name], "dropped": self._dropped[name]}
+            for name in sorted({*self._handled, *self._dropped})
+        }
+
+
+class RateLimiter:
+    """
+    Leaky bucket per key. Each hit adds its severity to the level of the key,
+    and the level drains at `drain_rate` points per second. Levels are drained
+    lazily on access, and fully drained keys are evicted periodically, so no timers
+    are scheduled and idle keys don't stay in memory
+    """
+
+    # A hit of severity `s` used to be forgiven after `capacity * s` seconds,
+    # which caps the sustained rate at 0.5 points per second for any capacity
+    DRAIN_RATE = 0.5
+    EVICTION_INTERVAL = 60
+
+    def __init__(self, capacity: int, drain_rate: float = DRAIN_RATE):
+        self.capacity = capacity
+        self._drain_rate = drain_rate
+        self._levels: typing.Dict[typing.Hashable, typing.Tuple[float, float]] = {}
+        self._next_eviction = time.monotonic() + self.EVICTION_INTERVAL
+
+    def __len__(self) -> int:
+        return len(self._levels)
+
+    def level(self, key: typing.Hashable, now: typing.Optional[float] = None) -> float:
+        """
+        Get current level of the key
+        :param key: Key to check (user or chat id)
+        :param now: Current `time.monotonic()` value
+        :return: Current level
+        """
+        try:
+            level, updated = self._levels[key]
+        except KeyError:
+            return 0
+
+        return max(0, level - ((now or time.monotonic()) - updated) * self._drain_rate)
+
+    def hit(
+        self,
+        key: typing.Hashable,
+        severity: int,
+        now: typing.Optional[float] = None,
+    ) -> bool:
+        """
+        Add severity to the level of the key
+        :param key: Key to hit (user or chat id)
+        :param severity: Points to add
+        :param now: Current `time.monotonic()` value
+        :return: True if level is still within capacity, False otherwise
+        """
+        now = now or time.monotonic()
+        if now >= self._next_eviction:
+            self.evict(now)
+
+        level = self.level(key, now) + severity
+        self._levels[key] = (level, now)
+        return level <= self.capacity
+
+    def evict(self, now: typing.Optional[float] = None):
+        """Remove keys, which are fully drained"""
+        now = now or time.monotonic()
+        self._levels = {
+            key: (level, updated)
+            for key, (level, updated) in self._levels.items()
+            if level - (now - updated) * self._drain_rate > 0
+        }
+        self._next_eviction = now + self.EVICTION_INTERVAL
 
 
 class CommandDispatcher:
@@ -119,10 +484,10 @@ class CommandDispatcher:
         self.client = client
         self._db = db
 
-        self._ratelimit_storage_user = collections.defaultdict(int)
-        self._ratelimit_storage_chat = collections.defaultdict(int)
         self._ratelimit_max_user = db.get(__name__, "ratelimit_max_user", 30)
         self._ratelimit_max_chat = db.get(__name__, "ratelimit_max_chat", 100)
+        self._ratelimit_user = RateLimiter(self._ratelimit_max_user)
+        self._ratelimit_chat = RateLimiter(self._ratelimit_max_chat)
 
         self.security = security.SecurityManager(client, db)
 
@@ -142,54 +507,43 @@ class CommandDispatcher:
             or []
         )
 
-        self.raw_handlers = []
-        self._external_bl: typing.List[int] = []
+        self.raw_handlers = RawHandlerTable()
+        self._external_bl = get_external_blacklist()
+        self._routing: typing.Optional[RoutingIndex] = None
+
+    @property
+    def routing(self) -> RoutingIndex:
+        """Routing index, rebuilt lazily after routing settings change"""
+        version = self._db.get_version(main.__name__)
+        if self._routing is None or self._routing.version != version:
+            self._routing = RoutingIndex(self._db, version)
 
-        asyncio.ensure_future(self._external_bl_reload_loop())
+        return self._routing
 
     async def _handle_ratelimit(self, message: Message, func: callable) -> bool:
         if await self.security.check(message, security.OWNER):
             return True
 
         func = getattr(func, "__func__", func)
+        now = time.monotonic()
         ret = True
-        chat = self._ratelimit_storage_chat[message.chat_id]
+        chat = self._ratelimit_chat.level(message.chat_id, now)
 
         if message.sender_id:
-            user = self._ratelimit_storage_user[message.sender_id]
-            severity = (5 if getattr(func, "ratelimit", False) else 2) * (
+            user = self._ratelimit_user.level(message.sender_id, now)
+            severity = (5 if getattr(func, "ratelimit", False) else 2) * int(
                 (user + chat) // 30 + 1
             )
-            user += severity
-            self._ratelimit_storage_user[message.sender_id] = user
-            if user > self._ratelimit_max_user:
+            if not self._ratelimit_user.hit(message.sender_id, severity, now):
                 ret = False
-            else:
-                self._ratelimit_storage_chat[message.chat_id] = chat
-
-            _decrement_ratelimit(
-                self._ratelimit_max_user * severity,
-                self._ratelimit_storage_user,
-                message.sender_id,
-                severity,
-            )
         else:
-            severity = (5 if getattr(func, "ratelimit", False) else 2) * (
+            severity = (5 if getattr(func, "ratelimit", False) else 2) * int(
                 chat // 15 + 1
             )
 
-        chat += severity
-
-        if chat > self._ratelimit_max_chat:
+        if not self._ratelimit_chat.hit(message.chat_id, severity, now):
             ret = False
 
-        _decrement_ratelimit(
-            self._ratelimit_max_chat * severity,
-            self._ratelimit_storage_chat,
-            message.chat_id,
-            severity,
-        )
-
         return ret
 
     def _handle_grep(self, message: Message) -> Message:
@@ -287,27 +641,28 @@ class CommandDispatcher:
 
         initiator = getattr(event, "sender_id", 0)
 
-        main_prefix = self._db.get(main.__name__, "command_prefix", ".")
-        if initiator == self._client.tg_id:
-            prefix = main_prefix
-        else:
-            prefix = self._db.get(main.__name__, "command_prefixes", {})
-            prefix = prefix.get(str(initiator), main_prefix)
-            
-        change = str.maketrans(ru_keys + en_keys, en_keys + ru_keys)
-        message = utils.censor(event.message)
-
         if not event.message.message:
             return False
 
+        routing = self.routing
+        prefix = routing.get_prefix(initiator, self._client.tg_id)
+        translated_prefix = routing.translate_prefix(prefix)
+
+        if not event.message.message.startswith(
+            prefix
+        ) and not event.message.message.startswith(translated_prefix):
+            return False
+
+        message = utils.censor(event.message)
+
         if (
             message.out
             and len(message.message) > len(prefix) * 2
             and (
                 message.message.startswith(prefix * 2)
                 and any(s != prefix for s in message.message)
-                or message.message.startswith(str.translate(prefix * 2, change))
-                and any(s != str.translate(prefix, change) for s in message.message)
+                or message.message.startswith(translated_prefix * 2)
+                and any(s != translated_prefix for s in message.message)
             )
         ):
             # Allow escaping commands using .'s
@@ -323,11 +678,11 @@ class CommandDispatcher:
             return False
 
         if (
-            event.message.message.startswith(str.translate(prefix, change))
-            and str.translate(prefix, change) != prefix
+            event.message.message.startswith(translated_prefix)
+            and translated_prefix != prefix
         ):
-            message.message = str.translate(message.message, change)
-            message.text = str.translate(message.text, change)
+            message.message = message.message.translate(LAYOUT_CHANGE)
+            message.text = message.text.translate(LAYOUT_CHANGE)
         elif not event.message.message.startswith(prefix):
             return False
 
@@ -340,10 +695,6 @@ class CommandDispatcher:
         ):
             return False
 
-        blacklist_chats = self._db.get(main.__name__, "blacklist_chats", [])
-        whitelist_chats = self._db.get(main.__name__, "whitelist_chats", [])
-        whitelist_modules = self._db.get(main.__name__, "whitelist_modules", [])
-
         # ⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️
         # It's not recommended to remove the security check below (external_bl)
         # If you attempt to bypass this protection, you will be banned from the chat
@@ -352,16 +703,13 @@ class CommandDispatcher:
         # ⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️
 
         if (
-            (chat_id := utils.get_chat_id(message)) in self._external_bl
-            or chat_id in blacklist_chats
-            or (whitelist_chats and chat_id not in whitelist_chats)
-        ):
+            chat_id := utils.get_chat_id(message)
+        ) in self._external_bl or routing.chat_blocked(chat_id):
             return False
 
         if not message.message or len(message.message) == len(prefix):
             return False  # Message is just the prefix
 
-
         command = message.message[len(prefix):].strip().split(maxsplit=1)[0]
         tag = command.split("@", maxsplit=1)
 
@@ -384,12 +732,11 @@ class CommandDispatcher:
             pass
         elif (
             not event.is_private
-            and not self._db.get(main.__name__, "no_nickname", False)
-            and command not in self._db.get(main.__name__, "nonickcmds", [])
-            and initiator not in self._db.get(main.__name__, "nonickusers", [])
+            and not routing.no_nickname
+            and command not in routing.nonickcmds
+            and initiator not in routing.nonickusers
+            and utils.get_chat_id(event) not in routing.nonickchats
             and not self.security.check_tsec(initiator, command)
-            and utils.get_chat_id(event)
-            not in self._db.get(main.__name__, "nonickchats", [])
         ):
             return False
 
@@ -407,45 +754,32 @@ class CommandDispatcher:
             return False
 
         if message.is_channel and message.edit_date and not message.is_group:
-            async for event in self._client.iter_admin_log(
-                chat_id,
-                limit=10,
-                edit=True,
-            ):
-                if event.action.prev_message.id == message.id:
-                    if event.user_id != self._client.tg_id:
-                        logger.debug("Ignoring edit in channel")
-                        return False
-
-                    break
-            
             return False
 
         message.message = prefix + txt + message.message[len(prefix + command) :]
 
-        if (
-            f"{str(chat_id)}.{func.__self__.__module__}" in blacklist_chats
-            or whitelist_modules
-            and f"{chat_id}.{func.__self__.__module__}" not in whitelist_modules
-        ):
+        if routing.module_blocked(chat_id, func.__self__.__module__):
             return False
 
         if await self._handle_tags(event, func):
             return False
 
-        if self._db.get(main.__name__, "grep", False) and not watcher:
+        if routing.grep and not watcher:
             message = self._handle_grep(message)
 
         return message, prefix, txt, func
 
     async def handle_raw(self, event: events.Raw):
         """Handle raw events."""
-        for handler in self.raw_handlers:
-            if isinstance(event, tuple(handler.updates)):
-                try:
+        handlers = self.raw_handlers.get(type(event))
+        self.raw_handlers.count(type(event), bool(handlers))
+
+        for handler in handlers:
+            try:
+                with invocation(client_id=self.client.tg_id, command=handler):
                     await handler(event)
-                except Exception as e:
-                    logger.exception("Error in raw handler %s: %s", handler.id, e)
+            except Exception as e:
+                logger.exception("Error in raw handler %s: %s", handler.id, e)
 
     async def handle_command(
         self,
@@ -469,7 +803,7 @@ class CommandDispatcher:
     async def command_exc(self, _, message: Message):
         """Handle command exceptions."""
         exc = sys.exc_info()[1]
-        logger.exception("Command failed", extra={"stack": inspect.stack()})
+        logger.exception("Command failed")
         if isinstance(exc, RPCError):
             if isinstance(exc, FloodWaitError):
                 hours = exc.seconds // 3600
@@ -523,116 +857,30 @@ class CommandDispatcher:
             await (message.edit if message.out else message.reply)(txt)
 
     async def watcher_exc(self, *_):
-        logger.exception("Error running watcher", extra={"stack": inspect.stack()})
+        logger.exception("Error running watcher")
 
     async def _handle_tags(
         self,
         event: typing.Union[events.NewMessage, events.MessageDeleted],
         func: callable,
+        facts: typing.Optional[MessageFacts] = None,
     ) -> bool:
-        return bool(await self._handle_tags_ext(event, func))
+        return bool(await self._handle_tags_ext(event, func, facts))
 
     async def _handle_tags_ext(
         self,
         event: typing.Union[events.NewMessage, events.MessageDeleted],
         func: callable,
+        facts: typing.Optional[MessageFacts] = None,
     ) -> str:
         """
         Handle tags.
         :param event: The event to handle.
         :param func: The function to handle.
+        :param facts: Facts of the event, shared between several calls
         :return: The reason for the tag to fail.
         """
-        m = event if isinstance(event, Message) else getattr(event, "message", event)
-
-        reverse_mapping = {
-            "out": lambda: getattr(m, "out", True),
-            "in": lambda: not getattr(m, "out", True),
-            "only_messages": lambda: isinstance(m, Message),
-            "editable": (
-                lambda: not getattr(m, "out", False)
-                and not getattr(m, "fwd_from", False)
-                and not getattr(m, "sticker", False)
-                and not getattr(m, "via_bot_id", False)
-            ),
-            "no_media": lambda: (
-                not isinstance(m, Message) or not getattr(m, "media", False)
-            ),
-            "only_media": lambda: isinstance(m, Message) and getattr(m, "media", False),
-            "only_photos": lambda: utils.mime_type(m).startswith("image/"),
-            "only_videos": lambda: utils.mime_type(m).startswith("video/"),
-            "only_audios": lambda: utils.mime_type(m).startswith("audio/"),
-            "only_stickers": lambda: getattr(m, "sticker", False),
-            "only_docs": lambda: getattr(m, "document", False),
-            "only_inline": lambda: getattr(m, "via_bot_id", False),
-            "only_channels": lambda: (
-                getattr(m, "is_channel", False) and not getattr(m, "is_group", False)
-            ),
-            "no_channels": lambda: not getattr(m, "is_channel", False),
-            "no_groups": (
-                lambda: not getattr(m, "is_group", False)
-                or getattr(m, "private", False)
-                or getattr(m, "is_channel", False)
-            ),
-            "only_groups": (
-                lambda: getattr(m, "is_group", False)
-                or not getattr(m, "private", False)
-                and not getattr(m, "is_channel", False)
-            ),
-            "no_pm": lambda: not getattr(m, "private", False),
-            "only_pm": lambda: getattr(m, "private", False),
-            "no_inline": lambda: not getattr(m, "via_bot_id", False),
-            "no_stickers": lambda: not getattr(m, "sticker", False),
-            "no_docs": lambda: not getattr(m, "document", False),
-            "no_audios": lambda: not utils.mime_type(m).startswith("audio/"),
-            "no_videos": lambda: not utils.mime_type(m).startswith("video/"),
-            "no_photos": lambda: not utils.mime_type(m).startswith("image/"),
-            "no_forwards": lambda: not getattr(m, "fwd_from", False),
-            "no_reply": lambda: not getattr(m, "reply_to_msg_id", False),
-            "only_forwards": lambda: getattr(m, "fwd_from", False),
-            "only_reply": lambda: getattr(m, "reply_to_msg_id", False),
-            "mention": lambda: getattr(m, "mentioned", False),
-            "no_mention": lambda: not getattr(m, "mentioned", False),
-            "startswith": lambda: (
-                isinstance(m, Message) and m.raw_text.startswith(func.startswith)
-            ),
-            "endswith": lambda: (
-                isinstance(m, Message) and m.raw_text.endswith(func.endswith)
-            ),
-            "contains": lambda: isinstance(m, Message) and func.contains in m.raw_text,
-            "filter": lambda: callable(func.filter) and func.filter(m),
-            "from_id": lambda: getattr(m, "sender_id", None) == func.from_id,
-            "chat_id": lambda: utils.get_chat_id(m)
-            == (
-                func.chat_id
-                if not str(func.chat_id).startswith("-100")
-                else int(str(func.chat_id)[4:])
-            ),
-            "regex": lambda: (
-                isinstance(m, Message) and re.search(func.regex, m.raw_text)
-            ),
-        }
-
-        return (
-            "no_commands"
-            if getattr(func, "no_commands", False)
-            and await self._handle_command(event, watcher=True)
-            else (
-                "only_commands"
-                if getattr(func, "only_commands", False)
-                and not await self._handle_command(event, watcher=True)
-                else next(
-                    (
-                        tag
-                        for tag in ALL_TAGS
-                        if getattr(func, tag, False)
-                        and tag in reverse_mapping
-                        and not reverse_mapping[tag]()
-                    ),
-                    None,
-                )
-            )
-        )
+        return await compile_tags(func)(facts or MessageFacts(self, event), func)
 
     async def handle_incoming(
         self,
@@ -640,10 +888,7 @@ class CommandDispatcher:
     ):
         """Handle all incoming messages"""
         message = utils.censor(getattr(event, "message", event))
-
-        blacklist_chats = self._db.get(main.__name__, "blacklist_chats", [])
-        whitelist_chats = self._db.get(main.__name__, "whitelist_chats", [])
-        whitelist_modules = self._db.get(main.__name__, "whitelist_modules", [])
+        routing = self.routing
 
         # ⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️
         # It's not recommended to remove the security check below (external_bl)
@@ -653,19 +898,18 @@ class CommandDispatcher:
         # ⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️
 
         if (
-            (chat_id := utils.get_chat_id(message)) in self._external_bl
-            or chat_id in blacklist_chats
-            or (whitelist_chats and chat_id not in whitelist_chats)
-        ):
+            chat_id := utils.get_chat_id(message)
+        ) in self._external_bl or routing.chat_blocked(chat_id):
             logger.debug("Message is blacklisted")
             return
 
-        for func in self._modules.watchers:
-            bl = self._db.get(main.__name__, "disabled_watchers", {})
-            modname = str(func.__self__.__class__.strings["name"])
+        bl = routing.disabled_watchers
+        facts = MessageFacts(self, event)
 
+        for func in self._modules.watchers:
             if (
-                modname in bl
+                bl
+                and (modname := str(func.__self__.__class__.strings["name"])) in bl
                 and isinstance(message, Message)
                 and (
                     "*" in bl[modname]
@@ -679,11 +923,8 @@ class CommandDispatcher:
                     or "in" in bl[modname]
                     and message.out
                 )
-                or f"{str(chat_id)}.{func.__self__.__module__}" in blacklist_chats
-                or whitelist_modules
-                and f"{str(chat_id)}.{func.__self__.__module__}"
-                not in whitelist_modules
-                or await self._handle_tags(event, func)
+                or routing.module_blocked(chat_id, func.__self__.__module__)
+                or await self._handle_tags(event, func, facts)
             ):
                 continue
 
@@ -713,22 +954,8 @@ class CommandDispatcher:
         exception_handler: callable,
         *args,
     ):
-        # Will be used to determine, which client caused logging messages
-        # parsed via inspect.stack()
-        _heroku_client_id_logging_tag = copy.copy(self.client.tg_id)  # noqa: F841
-        try:
-            await func(message)
-        except Exception as e:
-            await exception_handler(e, message, *args)
-
-    async def _external_bl_reload_loop(self):
-        while True:
-            with contextlib.suppress(Exception):
-                self._external_bl = (
-                    await utils.run_sync(
-                        requests.get,
-                        "https://ubguard.codrago.life/blacklist.json",
-                    )
-                ).json()["blacklist"]
-
-            await asyncio.sleep(60)
+        with invocation(client_id=self.client.tg_id, command=func, message=message):
+            try:
+                await func(message)
+            except Exception as e:
+                await exception_handler(e, message, *args)
@@ -19,29 +19,41 @@ import time
 import typing
 
 from aiogram import Bot, Dispatcher
-from aiogram.enums import ParseMode
-from aiogram.exceptions import TelegramConflictError, TelegramUnauthorizedError
+from aiogram.enums import ChatMemberStatus, ParseMode
+from aiogram.exceptions import (
+    TelegramBadRequest,
+    TelegramConflictError,
+    TelegramForbiddenError,
+    TelegramUnauthorizedError,
+)
 from aiogram.client.default import DefaultBotProperties
+from aiogram.types import Message as AiogramMessage
 from herokutl.errors.rpcerrorlist import InputUserDeactivatedError, YouBlockedUserError
 from herokutl.tl.functions.contacts import UnblockRequest
 from herokutl.tl.types import Message
 from herokutl.utils import get_display_name
 
-from .. import utils
+from .. import main, utils
 from ..database import Database
 from ..tl_cache import CustomTelegramClient
 from ..translations import Translator
 from .bot_pm import BotPM
-from .events import Events
+from .events import CallbackRouter, Events
 from .form import Form
 from .gallery import Gallery
 from .list import List
 from .query_gallery import QueryGallery
 from .token_obtainment import TokenObtainment
+from .units import Unit, UnitStore
 from .utils import Utils
 
 logger = logging.getLogger(__name__)
 
+# For how long it's remembered, whether the bot can send messages to the chat
+DIRECT_CHAT_TTL = 10 * 60
+# Bot API errors, which mean that the bot can't send messages to the chat
+DIRECT_CHAT_DENIED = ("not enough rights", "have no rights", "chat not found")
+
 
 class InlineManager(
     Utils,
@@ -75,13 +87,21 @@ class InlineManager(
         self._allmodules = allmodules
         self.translator: Translator = allmodules.translator
 
-        self._units: typing.Dict[str, dict] = {}
+        self._markup_ttl = 60 * 60 * 24
+        self._units: UnitStore = UnitStore(self._markup_ttl, self._on_unit_drop)
         self._custom_map: typing.Dict[str, callable] = {}
+        # Callback data / switch query -> (unit id, button of the unit)
+        self._button_index: typing.Dict[str, typing.Tuple[str, dict]] = {}
+        self._query_index: typing.Dict[str, typing.Tuple[str, dict]] = {}
+        self._callback_router: typing.Optional[CallbackRouter] = None
+        self._callback_router_version: typing.Optional[int] = None
         self.fsm: typing.Dict[str, str] = {}
         self._web_auth_tokens: typing.List[str] = []
         self._error_events: typing.Dict[str, asyncio.Event] = {}
+        # Bot API chat id -> (whether the bot can send units there, check time)
+        self._direct_chats: typing.Dict[int, typing.Tuple[bool, float]] = {}
+        self._direct_checks: typing.Dict[int, asyncio.Future] = {}
 
-        self._markup_ttl = 60 * 60 * 24
         self.init_complete = False
 
         self._token = db.get("heroku.inline", "bot_token", False)
@@ -98,12 +118,21 @@ class InlineManager(
     async def _cleaner(self):
         """Cleans outdated inline units"""
         while True:
-            for unit_id, unit in self._units.copy().items():
-                if (unit.get("ttl") or (time.time() + self._markup_ttl)) < time.time():
-                    del self._units[unit_id]
-
+            self._units.expire()
             await asyncio.sleep(5)
 
+    def _on_unit_drop(self, unit_id: str, unit: Unit):
+        """Unloads unit, which is expired or evicted"""
+        if callable(unit.on_unload):
+            unit.on_unload()
+
+        self._forget_unit(unit_id)
+
+    @property
+    def units_stats(self) -> typing.Dict[str, typing.Dict[str, int]]:
+        """Live, created, expired and evicted units by unit type"""
+        return self._units.stats
+
     async def register_manager(
         self,
         after_break: bool = False,
@@ -226,7 +255,132 @@ class InlineManager(
         self._web_auth_tokens.remove(token)
         return True
 
-    async def _invoke_unit(self, unit_id: str, message: Message) -> Message:
+    async def _get_direct_chat(self, message: Message) -> typing.Optional[int]:
+        """
+        Get chat, where unit can be sent by the bot itself instead of inline query
+        :param message: Message, which the unit is sent in response to
+        :return: Bot API chat id or `None`, if inline query must be used
+        """
+        if not isinstance(message, Message) or not self._db.get(
+            main.__name__,
+            "direct_units",
+            True,
+        ):
+            return None
+
+        if message.chat_id == self.bot_id:
+            # Userbot's chat with the bot is the bot's chat with the owner
+            return self._me
+
+        if message.is_private:
+            return None
+
+        chat_id = message.chat_id
+        can_send, checked = self._direct_chats.get(chat_id, (False, 0))
+        if checked + DIRECT_CHAT_TTL < time.time():
+            if (check := self._direct_checks.get(chat_id)) is None:
+                # Concurrent units in the same chat share one check
+                check = asyncio.ensure_future(self._check_direct_chat(chat_id))
+                self._direct_checks[chat_id] = check
+                check.add_done_callback(
+                    lambda _: self._direct_checks.pop(chat_id, None)
+                )
+
+            can_send = await asyncio.shield(check)
+
+        return chat_id if can_send else None
+
+    async def _check_direct_chat(self, chat_id: int) -> bool:
+        """
+        Check if the bot can send messages to the chat and remember the result
+        :param chat_id: Bot API chat id
+        :return: Whether the bot can send messages to the chat
+        """
+        try:
+            member = await self.bot.get_chat_member(chat_id, self.bot_id)
+        except Exception:
+            logger.debug("Can't check bot in %s", chat_id, exc_info=True)
+            can_send = False
+        else:
+            can_send = member.status in {
+                ChatMemberStatus.CREATOR,
+                ChatMemberStatus.ADMINISTRATOR,
+                ChatMemberStatus.MEMBER,
+            } or (
+                member.status == ChatMemberStatus.RESTRICTED
+                and member.is_member
+                and member.can_send_messages
+            )
+
+        self._direct_chats[chat_id] = (can_send, time.time())
+        return can_send
+
+    async def _send_unit(
+        self,
+        unit_id: str,
+        chat_id: int,
+        message: Message,
+    ) -> AiogramMessage:
+        """
+        Send unit by the bot itself
+        :param unit_id: Unit id
+        :param chat_id: Bot API chat id from :meth:`_get_direct_chat`
+        :param message: Message, which the unit is sent in response to
+        :return: Sent message
+        """
+        unit = self._units[unit_id]
+        kwargs = {"chat_id": chat_id}
+        # Message ids are shared between users only in supergroups
+        if str(chat_id).startswith("-100"):
+            if unit.top_msg_id:
+                kwargs["message_thread_id"] = unit.top_msg_id
+
+            if message.reply_to_msg_id and message.reply_to_msg_id != unit.top_msg_id:
+                kwargs["reply_to_message_id"] = message.reply_to_msg_id
+                kwargs["allow_sending_without_reply"] = True
+
+        return await {
+            "form": self._send_form,
+            "list": self._send_list,
+            "gallery": self._send_gallery,
+        }[unit.type](unit, **kwargs)
+
+    async def _invoke_unit(
+        self,
+        unit_id: str,
+        message: Message,
+    ) -> typing.Union[Message, AiogramMessage]:
+        """
+        Send unit to the chat of the message and wait, until it's delivered. Unit
+        is sent by the bot, when it's possible, and via inline query otherwise
+        :param unit_id: Unit id
+        :param message: Message or chat id, which the unit is sent in response to
+        :return: Sent message
+        """
+        unit = self._units[unit_id]
+        if (chat_id := await self._get_direct_chat(message)) is not None:
+            try:
+                m = await self._send_unit(unit_id, chat_id, message)
+            except Exception as e:
+                logger.debug(
+                    "Can't send unit %s by bot, falling back to inline query",
+                    unit_id,
+                    exc_info=True,
+                )
+                if isinstance(e, TelegramForbiddenError) or (
+                    isinstance(e, TelegramBadRequest)
+                    and any(error in e.message.lower() for error in DIRECT_CHAT_DENIED)
+                ):
+                    # Other errors are not related to the chat, so they don't
+                    # prevent the next units from being sent by the bot
+                    self._direct_chats[chat_id] = (False, time.time())
+            else:
+                unit.future = None
+                unit.bot_chat_id = chat_id
+                unit.chat = utils.get_chat_id(message)
+                unit.message_id = m.message_id
+                return m
+
         event = asyncio.Event()
         self._error_events[unit_id] = event
 
@@ -263,9 +417,16 @@ class InlineManager(
         if not q:
             raise Exception("No query results")
 
-        return await q[0].click(
+        m = await q[0].click(
             utils.get_chat_id(message) if isinstance(message, Message) else message,
             reply_to=(
                 message.reply_to_msg_id if isinstance(message, Message) else None
             ),
         )
+
+        await unit.future.wait()
+        unit.future = None
+
+        unit.chat = utils.get_chat_id(m)
+        unit.message_id = m.id
+        return m
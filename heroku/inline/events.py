@@ -29,11 +29,69 @@ from aiogram.types import (
 from aiogram.types import Message as AiogramMessage
 
 from .. import utils
+from .._invocation import invocation
 from .types import BotInlineCall, InlineCall, InlineQuery, InlineUnit
 
 logger = logging.getLogger(__name__)
 
 
+class CallbackRouter:
+    """
+    Routes callback queries only to callback handlers, which declared matching
+    data `prefix` or `pattern`. Handlers without them receive every query
+    """
+
+    def __init__(self, handlers: typing.Iterable[typing.Callable]):
+        # Handlers are kept with their registration order to call them in it
+        self._catch_all: typing.List[typing.Tuple[int, typing.Callable]] = []
+        self._prefixes: typing.Dict[
+            str, typing.List[typing.Tuple[int, typing.Callable]]
+        ] = {}
+        self._patterns: typing.List[
+            typing.Tuple[typing.Pattern, int, typing.Callable]
+        ] = []
+
+        for order, func in enumerate(handlers):
+            prefixes = getattr(func, "prefix", None)
+            pattern = getattr(func, "pattern", None)
+
+            if not prefixes and not pattern:
+                self._catch_all += [(order, func)]
+                continue
+
+            if isinstance(prefixes, str):
+                prefixes = (prefixes,)
+
+            for prefix in prefixes or ():
+                self._prefixes.setdefault(prefix, []).append((order, func))
+
+            if pattern:
+                self._patterns += [(re.compile(pattern), order, func)]
+
+        self._lengths = sorted({len(prefix) for prefix in self._prefixes})
+
+    def route(self, data: str) -> typing.List[typing.Callable]:
+        """
+        Get handlers, which must be called for the query
+        :param data: Callback data
+        :return: Handlers in order of their registration
+        """
+        matched = dict(self._catch_all)
+        for length in self._lengths:
+            if length > len(data):
+                break
+
+            matched.update(self._prefixes.get(data[:length], ()))
+
+        matched.update(
+            (order, func)
+            for pattern, order, func in self._patterns
+            if pattern.match(data)
+        )
+
+        return [matched[order] for order in sorted(matched)]
+
+
 class Events(InlineUnit):
     async def _message_handler(self, message: AiogramMessage):
         """Processes incoming messages"""
@@ -49,7 +107,8 @@ class Events(InlineUnit):
                 continue
 
             try:
-                await mod.aiogram_watcher(message)
+                with invocation(client_id=self._client.tg_id, module=mod):
+                    await mod.aiogram_watcher(message)
             except Exception:
                 logger.exception("Error on running aiogram watcher!")
 
@@ -67,9 +126,13 @@ class Events(InlineUnit):
             instance = InlineQuery(inline_query=inline_query)
 
             try:
-                if not (
-                    result := await self._allmodules.inline_handlers[cmd](instance)
+                with invocation(
+                    client_id=self._client.tg_id,
+                    command=self._allmodules.inline_handlers[cmd],
                 ):
+                    result = await self._allmodules.inline_handlers[cmd](instance)
+
+                if not result:
                     return
             except Exception:
                 logger.exception("Error on running inline watcher!")
@@ -225,16 +288,23 @@ class Events(InlineUnit):
             self._web_auth_tokens += [re.search(r"authorize_web_(.{8})", call.data)[1]]
             return
 
-        for func in self._allmodules.callback_handlers.values():
+        if self._callback_router_version != self._allmodules.routing_version:
+            self._callback_router = CallbackRouter(
+                self._allmodules.callback_handlers.values()
+            )
+            self._callback_router_version = self._allmodules.routing_version
+
+        for func in self._callback_router.route(call.data):
             if await self.check_inline_security(func=func, user=call.from_user.id):
                 try:
-                    await func(
-                        (
-                            BotInlineCall
-                            if getattr(getattr(call, "message", None), "chat", None)
-                            else InlineCall
-                        )(call, self, None)
-                    )
+                    with invocation(client_id=self._client.tg_id, command=func):
+                        await func(
+                            (
+                                BotInlineCall
+                                if getattr(getattr(call, "message", None), "chat", None)
+                                else InlineCall
+                            )(call, self, None)
+                        )
                 except Exception:
                     logger.exception("Error on running callback watcher!")
                     await call.answer(
@@ -243,67 +313,58 @@ class Events(InlineUnit):
                     )
                     continue
 
-        for unit_id, unit in self._units.copy().items():
-            for button in utils.array_sum(unit.get("buttons", [])):
-                if not isinstance(button, dict):
-                    logger.warning(
-                        "Can't process update, because of corrupted button: %s",
-                        button,
+        if found := self._find_button(self._button_index, call.data):
+            unit_id, button = found
+            unit = self._units[unit_id]
+            if (
+                button.get("disable_security", False)
+                or unit.disable_security
+                or (unit.force_me and call.from_user.id == self._me)
+                or not unit.force_me
+                and (
+                    await self.check_inline_security(
+                        func=(
+                            unit.perms_map
+                            or (lambda: self._client.dispatcher.security._default)
+                        )(),  # we call it so we can get reloaded rights in runtime
+                        user=call.from_user.id,
                     )
-                    continue
+                    if unit.message is not None
+                    else False
+                )
+            ):
+                pass
+            elif call.from_user.id not in (
+                self._client.dispatcher.security._owner
+                + (unit.always_allow or [])
+                + button.get("always_allow", [])
+            ):
+                await call.answer(self.translator.getkey("inline.button403"))
+                return
 
-                if button.get("_callback_data") == call.data:
-                    if (
-                        button.get("disable_security", False)
-                        or unit.get("disable_security", False)
-                        or (
-                            unit.get("force_me", False)
-                            and call.from_user.id == self._me
-                        )
-                        or not unit.get("force_me", False)
-                        and (
-                            await self.check_inline_security(
-                                func=unit.get(
-                                    "perms_map",
-                                    lambda: self._client.dispatcher.security._default,
-                                )(),  # we call it so we can get reloaded rights in runtime
-                                user=call.from_user.id,
-                            )
-                            if "message" in unit
-                            else False
-                        )
-                    ):
-                        pass
-                    elif call.from_user.id not in (
-                        self._client.dispatcher.security._owner
-                        + unit.get("always_allow", [])
-                        + button.get("always_allow", [])
-                    ):
-                        await call.answer(self.translator.getkey("inline.button403"))
-                        return
-
-                    try:
-                        result = await button["callback"](
-                            (
-                                BotInlineCall
-                                if getattr(getattr(call, "message", None), "chat", None)
-                                else InlineCall
-                            )(call, self, unit_id),
-                            *button.get("args", []),
-                            **button.get("kwargs", {}),
-                        )
-                    except Exception:
-                        logger.exception("Error on running callback watcher!")
-                        await call.answer(
-                            (
-                                "Error occurred while processing request. More info in"
-                                " logs"
-                            ),
-                            show_alert=True,
-                        )
-                        return
+            try:
+                with invocation(
+                    client_id=self._client.tg_id,
+                    command=button["callback"],
+                ):
+                    result = await button["callback"](
+                        (
+                            BotInlineCall
+                            if getattr(getattr(call, "message", None), "chat", None)
+                            else InlineCall
+                        )(call, self, unit_id),
+                        *button.get("args", []),
+                        **button.get("kwargs", {}),
+                    )
+            except Exception:
+                logger.exception("Error on running callback watcher!")
+                await call.answer(
+                    "Error occurred while processing request. More info in logs",
+                    show_alert=True,
+                )
+                return
 
-                    return result
+            return result
 
         if call.data in self._custom_map:
             if (
@@ -334,15 +395,19 @@ class Events(InlineUnit):
                 await call.answer(self.translator.getkey("inline.button403"))
                 return
 
-            await self._custom_map[call.data]["handler"](
-                (
-                    BotInlineCall
-                    if getattr(getattr(call, "message", None), "chat", None)
-                    else InlineCall
-                )(call, self, None),
-                *self._custom_map[call.data].get("args", []),
-                **self._custom_map[call.data].get("kwargs", {}),
-            )
+            with invocation(
+                client_id=self._client.tg_id,
+                command=self._custom_map[call.data]["handler"],
+            ):
+                await self._custom_map[call.data]["handler"](
+                    (
+                        BotInlineCall
+                        if getattr(getattr(call, "message", None), "chat", None)
+                        else InlineCall
+                    )(call, self, None),
+                    *self._custom_map[call.data].get("args", []),
+                    **self._custom_map[call.data].get("kwargs", {}),
+                )
             return
 
     async def _chosen_inline_handler(
@@ -354,41 +419,38 @@ class Events(InlineUnit):
         if not query:
             return
 
-        for unit_id, unit in self._units.items():
-            if (
-                unit_id == query
-                and "future" in unit
-                and isinstance(unit["future"], Event)
+        if (unit := self._units.get(query)) and isinstance(unit.future, Event):
+            unit.inline_message_id = chosen_inline_query.inline_message_id
+            unit.future.set()
+            return
+
+        if (
+            found := self._find_button(self._query_index, query.split()[0])
+        ) and "input" in found[1]:
+            unit_id, button = found
+            if chosen_inline_query.from_user.id not in (
+                [self._me]
+                + self._client.dispatcher.security._owner
+                + (self._units[unit_id].always_allow or [])
             ):
-                unit["inline_message_id"] = chosen_inline_query.inline_message_id
-                unit["future"].set()
                 return
 
-        for unit_id, unit in self._units.copy().items():
-            for button in utils.array_sum(unit.get("buttons", [])):
-                if (
-                    "_switch_query" in button
-                    and "input" in button
-                    and button["_switch_query"] == query.split()[0]
-                    and chosen_inline_query.from_user.id
-                    in [self._me]
-                    + self._client.dispatcher.security._owner
-                    + unit.get("always_allow", [])
+            query = query.split(maxsplit=1)[1] if len(query.split()) > 1 else ""
+
+            try:
+                with invocation(
+                    client_id=self._client.tg_id,
+                    command=button["handler"],
                 ):
-                    query = query.split(maxsplit=1)[1] if len(query.split()) > 1 else ""
-
-                    try:
-                        return await button["handler"](
-                            InlineCall(chosen_inline_query, self, unit_id),
-                            query,
-                            *button.get("args", []),
-                            **button.get("kwargs", {}),
-                        )
-                    except Exception:
-                        logger.exception(
-                            "Exception while running chosen query watcher!"
-                        )
-                        return
+                    return await button["handler"](
+                        InlineCall(chosen_inline_query, self, unit_id),
+                        query,
+                        *button.get("args", []),
+                        **button.get("kwargs", {}),
+                    )
+            except Exception:
+                logger.exception("Exception while running chosen query watcher!")
+                return
 
     async def _query_help(self, inline_query: InlineQuery):
         _help = []
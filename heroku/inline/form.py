@@ -33,13 +33,16 @@ from aiogram.types import (
     InlineQueryResultVideo,
     InputTextMessageContent,
 )
+from aiogram.types import Message as AiogramMessage
 from herokutl.errors.rpcerrorlist import ChatSendInlineForbiddenError
 from herokutl.extensions.html import CUSTOM_EMOJIS
 from herokutl.tl.types import Message
 
 from .. import main, utils
+from .._invocation import bind_client
 from ..types import HerokuReplyMarkup
 from .types import InlineMessage, InlineUnit
+from .units import FormUnit
 
 logger = logging.getLogger(__name__)
 
@@ -115,7 +118,7 @@ class Form(InlineUnit):
         :return: If form is sent, returns :obj:`InlineMessage`, otherwise returns `False`
         """
         with contextlib.suppress(AttributeError):
-            _heroku_client_id_logging_tag = copy.copy(self._client.tg_id)  # noqa: F841
+            bind_client(self._client.tg_id)
 
         if reply_markup is None:
             reply_markup = []
@@ -313,30 +316,28 @@ class Form(InlineUnit):
             )
             ttl = 10 * 60
 
-        self._units[unit_id] = {
-            "type": "form",
-            "text": text,
-            "buttons": reply_markup,
-            "caller": message,
-            "chat": None,
-            "message_id": None,
-            "top_msg_id": utils.get_topic(message),
-            "uid": unit_id,
-            "on_unload": on_unload,
-            "future": Event(),
-            **({"photo": photo} if photo else {}),
-            **({"video": video} if video else {}),
-            **({"gif": gif} if gif else {}),
-            **({"location": location} if location else {}),
-            **({"audio": audio} if audio else {}),
-            **({"location": location} if location else {}),
-            **({"perms_map": perms_map} if perms_map else {}),
-            **({"message": message} if isinstance(message, Message) else {}),
-            **({"force_me": force_me} if force_me else {}),
-            **({"disable_security": disable_security} if disable_security else {}),
-            **({"ttl": round(time.time()) + ttl} if ttl else {}),
-            **({"always_allow": always_allow} if always_allow else {}),
-        }
+        unit = self._units[unit_id] = FormUnit(
+            text=text,
+            buttons=reply_markup,
+            caller=message,
+            top_msg_id=utils.get_topic(message),
+            uid=unit_id,
+            on_unload=on_unload,
+            future=Event(),
+            photo=photo,
+            video=video,
+            gif=gif,
+            file=file,
+            mime_type=mime_type,
+            location=location,
+            audio=audio,
+            perms_map=perms_map,
+            message=message if isinstance(message, Message) else None,
+            force_me=force_me,
+            disable_security=disable_security,
+            ttl=round(time.time()) + ttl if ttl else None,
+            always_allow=always_allow,
+        )
 
         async def answer(msg: str):
             nonlocal message
@@ -349,12 +350,16 @@ class Form(InlineUnit):
                 await self._client.send_message(message, msg)
 
         try:
-            m = await self._invoke_unit(unit_id, message)
+            await self._invoke_unit(unit_id, message)
         except ChatSendInlineForbiddenError:
+            self._forget_unit(unit_id)
+            del self._units[unit_id]
             await answer(self.translator.getkey("inline.inline403"))
+            return False
         except Exception:
             logger.exception("Can't send form")
 
+            self._forget_unit(unit_id)
             del self._units[unit_id]
             await answer(
                 self.translator.getkey("inline.invoke_failed_logs").format(
@@ -368,185 +373,238 @@ class Form(InlineUnit):
 
             return False
 
-        await self._units[unit_id]["future"].wait()
-        del self._units[unit_id]["future"]
-
-        self._units[unit_id]["chat"] = utils.get_chat_id(m)
-        self._units[unit_id]["message_id"] = m.id
-
         if isinstance(message, Message) and message.out:
             await message.delete()
 
         if status_message and not message.out:
             await status_message.delete()
 
-        inline_message_id = self._units[unit_id]["inline_message_id"]
-
-        msg = InlineMessage(inline_manager=self, unit_id=unit_id, inline_message_id=inline_message_id)
+        msg = InlineMessage(
+            inline_manager=self,
+            unit_id=unit_id,
+            inline_message_id=unit.inline_message_id,
+        )
 
         if not isinstance(base_reply_markup, Placeholder):
             await msg.edit(text, reply_markup=base_reply_markup)
 
         return msg
 
+    async def _send_form(self, form: FormUnit, **kwargs) -> AiogramMessage:
+        """
+        Send form by the bot itself
+        :param form: Form
+        :param kwargs: Chat, topic and reply of the message
+        :return: Sent message
+        """
+        kwargs["reply_markup"] = self.generate_markup(form.uid)
+        if form.photo:
+            return await self.bot.send_photo(
+                photo=form.photo,
+                caption=form.text,
+                **kwargs,
+            )
+
+        if form.gif:
+            return await self.bot.send_animation(
+                animation=form.gif,
+                caption=form.text,
+                **kwargs,
+            )
+
+        if form.video:
+            return await self.bot.send_video(
+                video=form.video,
+                caption=form.text,
+                **kwargs,
+            )
+
+        if form.file:
+            return await self.bot.send_document(
+                document=form.file,
+                caption=form.text,
+                **kwargs,
+            )
+
+        if form.location:
+            return await self.bot.send_location(
+                latitude=form.location[0],
+                longitude=form.location[1],
+                **kwargs,
+            )
+
+        if form.audio:
+            return await self.bot.send_audio(
+                audio=form.audio["url"],
+                caption=form.text,
+                title=form.audio.get("title", "Heroku"),
+                performer=form.audio.get("performer"),
+                duration=form.audio.get("duration"),
+                **kwargs,
+            )
+
+        return await self.bot.send_message(
+            text=form.text,
+            disable_web_page_preview=True,
+            **kwargs,
+        )
+
     async def _form_inline_handler(self, inline_query: InlineQuery):
         try:
             query = inline_query.query.split()[0]
         except IndexError:
             return
 
-        for unit in self._units.copy().values():
-            for button in utils.array_sum(unit.get("buttons", [])):
-                if (
-                    "_switch_query" in button
-                    and "input" in button
-                    and button["_switch_query"] == query
-                    and inline_query.from_user.id
-                    in [self._me]
-                    + self._client.dispatcher.security._owner
-                    + unit.get("always_allow", [])
-                ):
-                    await inline_query.answer(
-                        [
-                            InlineQueryResultArticle(
-                                id=utils.rand(20),
-                                title=button["input"],
-                                description=(
-                                    self.translator.getkey("inline.keep_id").format(
-                                        random.choice(VERIFICATION_EMOJIES)
-                                    )
-                                ),
-                                input_message_content=InputTextMessageContent(
-                                    message_text=(
-                                        "🔄 <b>Transferring value to"
-                                        " userbot...</b>\n<i>This message will be"
-                                        " deleted automatically</i>"
-                                        if inline_query.from_user.id == self._me
-                                        else "🔄 <b>Transferring value to userbot...</b>"
-                                    ),
-                                    parse_mode="HTML",
-                                    disable_web_page_preview=True,
-                                ),
+        if (
+            (found := self._find_button(self._query_index, query))
+            and "input" in found[1]
+            and inline_query.from_user.id
+            in [self._me]
+            + self._client.dispatcher.security._owner
+            + (self._units[found[0]].always_allow or [])
+        ):
+            button = found[1]
+            await inline_query.answer(
+                [
+                    InlineQueryResultArticle(
+                        id=utils.rand(20),
+                        title=button["input"],
+                        description=(
+                            self.translator.getkey("inline.keep_id").format(
+                                random.choice(VERIFICATION_EMOJIES)
                             )
-                        ],
-                        cache_time=60,
+                        ),
+                        input_message_content=InputTextMessageContent(
+                            message_text=(
+                                "🔄 <b>Transferring value to"
+                                " userbot...</b>\n<i>This message will be"
+                                " deleted automatically</i>"
+                                if inline_query.from_user.id == self._me
+                                else "🔄 <b>Transferring value to userbot...</b>"
+                            ),
+                            parse_mode="HTML",
+                            disable_web_page_preview=True,
+                        ),
                     )
-                    return
+                ],
+                cache_time=60,
+            )
+            return
 
         if (
             inline_query.query not in self._units
-            or self._units[inline_query.query]["type"] != "form"
+            or not isinstance(self._units[inline_query.query], FormUnit)
         ):
             return
 
         form = self._units[inline_query.query]
         try:
-            if "photo" in form:
+            if form.photo:
                 await inline_query.answer(
                     [
                         InlineQueryResultPhoto(
                             id=utils.rand(20),
                             title="Heroku",
                             description="Heroku",
-                            caption=form.get("text"),
+                            caption=form.text,
                             parse_mode="HTML",
-                            photo_url=form["photo"],
+                            photo_url=form.photo,
                             thumbnail_url=(
                                 "https://img.icons8.com/cotton/452/moon-satellite.png"
                             ),
                             reply_markup=self.generate_markup(
-                                form["uid"],
+                                form.uid,
                             ),
                         )
                     ],
                     cache_time=0,
                 )
-            elif "gif" in form:
+            elif form.gif:
                 await inline_query.answer(
                     [
                         InlineQueryResultGif(
                             id=utils.rand(20),
                             title="Heroku",
-                            caption=form.get("text"),
+                            caption=form.text,
                             parse_mode="HTML",
-                            gif_url=form["gif"],
+                            gif_url=form.gif,
                             thumbnail_url=(
                                 "https://img.icons8.com/cotton/452/moon-satellite.png"
                             ),
                             reply_markup=self.generate_markup(
-                                form["uid"],
+                                form.uid,
                             ),
                         )
                     ],
                     cache_time=0,
                 )
-            elif "video" in form:
+            elif form.video:
                 await inline_query.answer(
                     [
                         InlineQueryResultVideo(
                             id=utils.rand(20),
                             title="Heroku",
                             description="Heroku",
-                            caption=form.get("text"),
+                            caption=form.text,
                             parse_mode="HTML",
-                            video_url=form["video"],
+                            video_url=form.video,
                             thumbnail_url=(
                                 "https://img.icons8.com/cotton/452/moon-satellite.png"
                             ),
                             mime_type="video/mp4",
                             reply_markup=self.generate_markup(
-                                form["uid"],
+                                form.uid,
                             ),
                         )
                     ],
                     cache_time=0,
                 )
-            elif "file" in form:
+            elif form.file:
                 await inline_query.answer(
                     [
                         InlineQueryResultDocument(
                             id=utils.rand(20),
                             title="Heroku",
                             description="Heroku",
-                            caption=form.get("text"),
+                            caption=form.text,
                             parse_mode="HTML",
-                            document_url=form["file"],
-                            mime_type=form["mime_type"],
+                            document_url=form.file,
+                            mime_type=form.mime_type,
                             reply_markup=self.generate_markup(
-                                form["uid"],
+                                form.uid,
                             ),
                         )
                     ],
                     cache_time=0,
                 )
-            elif "location" in form:
+            elif form.location:
                 await inline_query.answer(
                     [
                         InlineQueryResultLocation(
                             id=utils.rand(20),
-                            latitude=form["location"][0],
-                            longitude=form["location"][1],
+                            latitude=form.location[0],
+                            longitude=form.location[1],
                             title="Heroku",
                             reply_markup=self.generate_markup(
-                                form["uid"],
+                                form.uid,
                             ),
                         )
                     ],
                     cache_time=0,
                 )
-            elif "audio" in form:
+            elif form.audio:
                 await inline_query.answer(
                     [
                         InlineQueryResultAudio(
                             id=utils.rand(20),
-                            audio_url=form["audio"]["url"],
-                            caption=form.get("text"),
+                            audio_url=form.audio["url"],
+                            caption=form.text,
                             parse_mode="HTML",
-                            title=form["audio"].get("title", "Heroku"),
-                            performer=form["audio"].get("performer"),
-                            audio_duration=form["audio"].get("duration"),
+                            title=form.audio.get("title", "Heroku"),
+                            performer=form.audio.get("performer"),
+                            audio_duration=form.audio.get("duration"),
                             reply_markup=self.generate_markup(
-                                form["uid"],
+                                form.uid,
                             ),
                         )
                     ],
@@ -559,7 +617,7 @@ class Form(InlineUnit):
                             id=utils.rand(20),
                             title="Heroku",
                             input_message_content=InputTextMessageContent(
-                                message_text=form["text"],
+                                message_text=form.text,
                                 parse_mode="HTML",
                                 disable_web_page_preview=True,
                             ),
@@ -569,6 +627,6 @@ class Form(InlineUnit):
                     cache_time=0,
                 )
         except Exception as e:
-            if form["uid"] in self._error_events:
-                self._error_events[form["uid"]].set()
-                self._error_events[form["uid"]] = e
+            if form.uid in self._error_events:
+                self._error_events[form.uid].set()
+                self._error_events[form.uid] = e
@@ -12,7 +12,6 @@
 
 import asyncio
 import contextlib
-import copy
 import functools
 import logging
 import os
@@ -30,14 +29,17 @@ from aiogram.types import (
     InputMediaAnimation,
     InputMediaPhoto,
 )
+from aiogram.types import Message as AiogramMessage
 from aiogram.exceptions import TelegramBadRequest, TelegramRetryAfter
 from herokutl.errors.rpcerrorlist import ChatSendInlineForbiddenError
 from herokutl.extensions.html import CUSTOM_EMOJIS
 from herokutl.tl.types import Message
 
 from .. import main, utils
+from .._invocation import bind_client
 from ..types import HerokuReplyMarkup
 from .types import InlineMessage, InlineUnit
+from .units import GalleryUnit
 
 logger = logging.getLogger(__name__)
 
@@ -100,7 +102,7 @@ class Gallery(InlineUnit):
         :return: If gallery is sent, returns :obj:`InlineMessage`, otherwise returns `False`
         """
         with contextlib.suppress(AttributeError):
-            _heroku_client_id_logging_tag = copy.copy(self._client.tg_id)  # noqa: F841
+            bind_client(self._client.tg_id)
 
         custom_buttons = self._validate_markup(custom_buttons)
 
@@ -214,42 +216,34 @@ class Gallery(InlineUnit):
 
         perms_map = None if manual_security else self._find_caller_sec_map()
 
-        self._units[unit_id] = {
-            "type": "gallery",
-            "caption": caption,
-            "caller": message,
-            "chat": None,
-            "message_id": None,
-            "top_msg_id": utils.get_topic(message),
-            "uid": unit_id,
-            "photo_url": photo_url if isinstance(photo_url, str) else photo_url[0],
-            "next_handler": next_handler,
-            "btn_call_data": btn_call_data,
-            "photos": [photo_url] if isinstance(photo_url, str) else photo_url,
-            "current_index": 0,
-            "future": asyncio.Event(),
-            **({"ttl": round(time.time()) + ttl} if ttl else {}),
-            **({"force_me": force_me} if force_me else {}),
-            **({"disable_security": disable_security} if disable_security else {}),
-            **({"on_unload": on_unload} if callable(on_unload) else {}),
-            **({"preload": preload} if preload else {}),
-            **({"gif": gif} if gif else {}),
-            **({"always_allow": always_allow} if always_allow else {}),
-            **({"perms_map": perms_map} if perms_map else {}),
-            **({"message": message} if isinstance(message, Message) else {}),
-            **({"custom_buttons": custom_buttons} if custom_buttons else {}),
-        }
+        unit = self._units[unit_id] = GalleryUnit(
+            caption=caption,
+            caller=message,
+            top_msg_id=utils.get_topic(message),
+            uid=unit_id,
+            photo_url=photo_url if isinstance(photo_url, str) else photo_url[0],
+            next_handler=next_handler,
+            btn_call_data=btn_call_data,
+            photos=[photo_url] if isinstance(photo_url, str) else photo_url,
+            future=asyncio.Event(),
+            ttl=round(time.time()) + ttl if ttl else None,
+            force_me=force_me,
+            disable_security=disable_security,
+            on_unload=on_unload if callable(on_unload) else None,
+            preload=preload,
+            gif=gif,
+            always_allow=always_allow,
+            perms_map=perms_map,
+            message=message if isinstance(message, Message) else None,
+            custom_buttons=custom_buttons,
+        )
 
         self._custom_map[btn_call_data] = {
             "handler": functools.partial(
                 self._gallery_page,
                 unit_id=unit_id,
             ),
-            **(
-                {"ttl": self._units[unit_id]["ttl"]}
-                if "ttl" in self._units[unit_id]
-                else {}
-            ),
+            **({"ttl": unit.ttl} if unit.ttl else {}),
             **({"always_allow": always_allow} if always_allow else {}),
             **({"force_me": force_me} if force_me else {}),
             **({"disable_security": disable_security} if disable_security else {}),
@@ -286,12 +280,16 @@ class Gallery(InlineUnit):
                 await self._client.send_message(message, msg)
 
         try:
-            m = await self._invoke_unit(unit_id, message)
+            await self._invoke_unit(unit_id, message)
         except ChatSendInlineForbiddenError:
+            self._forget_unit(unit_id)
+            del self._units[unit_id]
             await answer(self.translator.getkey("inline.inline403"))
+            return False
         except Exception:
             logger.exception("Error sending inline gallery")
 
+            self._forget_unit(unit_id)
             del self._units[unit_id]
 
             if _reattempt:
@@ -315,12 +313,6 @@ class Gallery(InlineUnit):
 
             return await self.gallery(**kwargs)
 
-        await self._units[unit_id]["future"].wait()
-        del self._units[unit_id]["future"]
-
-        self._units[unit_id]["chat"] = utils.get_chat_id(m)
-        self._units[unit_id]["message_id"] = m.id
-
         if isinstance(message, Message) and message.out:
             await message.delete()
 
@@ -330,7 +322,28 @@ class Gallery(InlineUnit):
         if not isinstance(next_handler, ListGalleryHelper):
             asyncio.ensure_future(self._load_gallery_photos(unit_id))
 
-        return InlineMessage(self, unit_id, self._units[unit_id]["inline_message_id"])
+        return InlineMessage(self, unit_id, unit.inline_message_id)
+
+    async def _send_gallery(self, unit: GalleryUnit, **kwargs) -> AiogramMessage:
+        """
+        Send gallery by the bot itself
+        :param unit: Gallery
+        :param kwargs: Chat, topic and reply of the message
+        :return: Sent message
+        """
+        try:
+            ext = os.path.splitext(urlparse(unit.photo_url).path)[1]
+        except Exception:
+            ext = None
+
+        kwargs.update(
+            caption=self._get_caption(unit.uid, index=0),
+            reply_markup=self._gallery_markup(unit.uid),
+        )
+        if unit.gif or ext in {".gif", ".mp4"}:
+            return await self.bot.send_animation(animation=unit.photo_url, **kwargs)
+
+        return await self.bot.send_photo(photo=unit.photo_url, **kwargs)
 
     async def _call_photo(
         self,
@@ -375,17 +388,11 @@ class Gallery(InlineUnit):
         """Preloads photo. Should be called via ensure_future"""
         unit = self._units[unit_id]
 
-        photo_url = await self._call_photo(unit["next_handler"])
+        photo_url = await self._call_photo(unit.next_handler)
 
-        self._units[unit_id]["photos"] += (
-            [photo_url] if isinstance(photo_url, str) else photo_url
-        )
+        unit.photos += [photo_url] if isinstance(photo_url, str) else photo_url
 
-        unit = self._units[unit_id]
-
-        if unit.get("preload", False) and len(unit["photos"]) - unit[
-            "current_index"
-        ] < unit.get("preload", False):
+        if unit.preload and len(unit.photos) - unit.current_index < unit.preload:
             asyncio.ensure_future(self._load_gallery_photos(unit_id))
 
     async def _gallery_slideshow_loop(
@@ -396,21 +403,21 @@ class Gallery(InlineUnit):
         while True:
             await asyncio.sleep(7)
 
-            unit = self._units[unit_id]
+            unit = self._units.get(unit_id)
 
-            if unit_id not in self._units or not unit.get("slideshow", False):
+            if not unit or not unit.slideshow:
                 return
 
-            if unit["current_index"] + 1 >= len(unit["photos"]) and isinstance(
-                unit["next_handler"],
+            if unit.current_index + 1 >= len(unit.photos) and isinstance(
+                unit.next_handler,
                 ListGalleryHelper,
             ):
-                del self._units[unit_id]["slideshow"]
-                self._units[unit_id]["current_index"] -= 1
+                unit.slideshow = False
+                unit.current_index -= 1
 
             await self._gallery_page(
                 call,
-                self._units[unit_id]["current_index"] + 1,
+                unit.current_index + 1,
                 unit_id=unit_id,
             )
 
@@ -419,17 +426,17 @@ class Gallery(InlineUnit):
         call: CallbackQuery,
         unit_id: typing.Optional[str] = None,
     ):
-        if not self._units[unit_id].get("slideshow", False):
-            self._units[unit_id]["slideshow"] = True
+        if not self._units[unit_id].slideshow:
+            self._units[unit_id].slideshow = True
             await self.bot.edit_message_reply_markup(
-                inline_message_id=call.inline_message_id,
+                **self._call_target(call),
                 reply_markup=self._gallery_markup(unit_id),
             )
             await call.answer("✅ Slideshow on")
         else:
-            del self._units[unit_id]["slideshow"]
+            self._units[unit_id].slideshow = False
             await self.bot.edit_message_reply_markup(
-                inline_message_id=call.inline_message_id,
+                **self._call_target(call),
                 reply_markup=self._gallery_markup(unit_id),
             )
             await call.answer("🚫 Slideshow off")
@@ -447,22 +454,22 @@ class Gallery(InlineUnit):
         call: CallbackQuery,
         unit_id: typing.Optional[str] = None,
     ):
-        queue = self._units[unit_id]["photos"]
+        queue = self._units[unit_id].photos
 
         if not queue:
             await call.answer("No way back", show_alert=True)
             return
 
-        self._units[unit_id]["current_index"] -= 1
+        self._units[unit_id].current_index -= 1
 
-        if self._units[unit_id]["current_index"] < 0:
-            self._units[unit_id]["current_index"] = 0
+        if self._units[unit_id].current_index < 0:
+            self._units[unit_id].current_index = 0
             await call.answer("No way back")
             return
 
         try:
             await self.bot.edit_message_media(
-                inline_message_id=call.inline_message_id,
+                **self._call_target(call),
                 media=self._get_current_media(unit_id),
                 reply_markup=self._gallery_markup(unit_id),
             )
@@ -488,12 +495,12 @@ class Gallery(InlineUnit):
         except Exception:
             ext = None
 
-        if self._units[unit_id].get("gif", False) or ext in {".gif", ".mp4"}:
+        if self._units[unit_id].gif or ext in {".gif", ".mp4"}:
             return InputMediaAnimation(
                 media=media,
                 caption=self._get_caption(
                     unit_id,
-                    index=self._units[unit_id]["current_index"],
+                    index=self._units[unit_id].current_index,
                 ),
                 parse_mode="HTML",
             )
@@ -502,7 +509,7 @@ class Gallery(InlineUnit):
             media=media,
             caption=self._get_caption(
                 unit_id,
-                index=self._units[unit_id]["current_index"],
+                index=self._units[unit_id].current_index,
             ),
             parse_mode="HTML",
         )
@@ -525,43 +532,43 @@ class Gallery(InlineUnit):
             await call.answer("No way back")
             return
 
-        if page > len(self._units[unit_id]["photos"]) - 1 and isinstance(
-            self._units[unit_id]["next_handler"], ListGalleryHelper
+        if page > len(self._units[unit_id].photos) - 1 and isinstance(
+            self._units[unit_id].next_handler, ListGalleryHelper
         ):
             await call.answer("No way forward")
             return
 
-        self._units[unit_id]["current_index"] = page
-        if not isinstance(self._units[unit_id]["next_handler"], ListGalleryHelper):
-            if self._units[unit_id]["current_index"] >= len(
-                self._units[unit_id]["photos"]
+        self._units[unit_id].current_index = page
+        if not isinstance(self._units[unit_id].next_handler, ListGalleryHelper):
+            if self._units[unit_id].current_index >= len(
+                self._units[unit_id].photos
             ):
                 await self._load_gallery_photos(unit_id)
 
-            if self._units[unit_id]["current_index"] >= len(
-                self._units[unit_id]["photos"]
+            if self._units[unit_id].current_index >= len(
+                self._units[unit_id].photos
             ):
                 await call.answer("Can't load next photo")
                 return
 
             if (
-                len(self._units[unit_id]["photos"])
-                - self._units[unit_id]["current_index"]
-                < self._units[unit_id].get("preload", 0) // 2
+                len(self._units[unit_id].photos)
+                - self._units[unit_id].current_index
+                < (self._units[unit_id].preload or 0) // 2
             ):
                 logger.debug("Started preload for gallery %s", unit_id)
                 asyncio.ensure_future(self._load_gallery_photos(unit_id))
 
         try:
             await self.bot.edit_message_media(
-                inline_message_id=call.inline_message_id,
+                **self._call_target(call),
                 media=self._get_current_media(unit_id),
                 reply_markup=self._gallery_markup(unit_id),
             )
         except TelegramBadRequest:
             logger.debug("Error fetching photo content, attempting load next one")
-            del self._units[unit_id]["photos"][self._units[unit_id]["current_index"]]
-            self._units[unit_id]["current_index"] -= 1
+            del self._units[unit_id].photos[self._units[unit_id].current_index]
+            self._units[unit_id].current_index -= 1
             return await self._gallery_page(call, page, unit_id)
         except TelegramRetryAfter as e:
             await call.answer(
@@ -577,18 +584,18 @@ class Gallery(InlineUnit):
     def _get_next_photo(self, unit_id: str) -> str:
         """Returns next photo"""
         try:
-            return self._units[unit_id]["photos"][self._units[unit_id]["current_index"]]
+            return self._units[unit_id].photos[self._units[unit_id].current_index]
         except IndexError:
             logger.error(
                 "Got IndexError in `_get_next_photo`. %s / %s",
-                self._units[unit_id]["current_index"],
-                len(self._units[unit_id]["photos"]),
+                self._units[unit_id].current_index,
+                len(self._units[unit_id].photos),
             )
-            return self._units[unit_id]["photos"][0]
+            return self._units[unit_id].photos[0]
 
     def _get_caption(self, unit_id: str, index: int = 0) -> str:
         """Calls and returnes caption for gallery"""
-        caption = self._units[unit_id].get("caption", "")
+        caption = self._units[unit_id].caption
         if isinstance(caption, ListGalleryHelper):
             return caption.by_index(index)
 
@@ -607,11 +614,11 @@ class Gallery(InlineUnit):
         return self.generate_markup(
             (
                 (
-                    unit.get("custom_buttons", [])
+                    (unit.custom_buttons or [])
                     + self.build_pagination(
                         unit_id=unit_id,
                         callback=callback,
-                        total_pages=len(unit["photos"]),
+                        total_pages=len(unit.photos),
                     )
                     + [
                         [
@@ -620,10 +627,10 @@ class Gallery(InlineUnit):
                                     {
                                         "text": "⏪",
                                         "callback": callback,
-                                        "args": (unit["current_index"] - 1,),
+                                        "args": (unit.current_index - 1,),
                                     }
                                 ]
-                                if unit["current_index"] > 0
+                                if unit.current_index > 0
                                 else []
                             ),
                             *(
@@ -631,16 +638,16 @@ class Gallery(InlineUnit):
                                     {
                                         "text": (
                                             "🛑"
-                                            if unit.get("slideshow", False)
+                                            if unit.slideshow
                                             else "⏱"
                                         ),
                                         "callback": callback,
                                         "args": ("slideshow",),
                                     }
                                 ]
-                                if unit["current_index"] < len(unit["photos"]) - 1
+                                if unit.current_index < len(unit.photos) - 1
                                 or not isinstance(
-                                    unit["next_handler"], ListGalleryHelper
+                                    unit.next_handler, ListGalleryHelper
                                 )
                                 else []
                             ),
@@ -649,12 +656,12 @@ class Gallery(InlineUnit):
                                     {
                                         "text": "⏩",
                                         "callback": callback,
-                                        "args": (unit["current_index"] + 1,),
+                                        "args": (unit.current_index + 1,),
                                     }
                                 ]
-                                if unit["current_index"] < len(unit["photos"]) - 1
+                                if unit.current_index < len(unit.photos) - 1
                                 or not isinstance(
-                                    unit["next_handler"], ListGalleryHelper
+                                    unit.next_handler, ListGalleryHelper
                                 )
                                 else []
                             ),
@@ -666,39 +673,37 @@ class Gallery(InlineUnit):
         )
 
     async def _gallery_inline_handler(self, inline_query: InlineQuery):
-        for unit in self._units.copy().values():
-            if (
-                inline_query.from_user.id == self._me
-                and inline_query.query == unit["uid"]
-                and unit["type"] == "gallery"
-            ):
-                try:
-                    try:
-                        path = urlparse(unit["photo_url"]).path
-                        ext = os.path.splitext(path)[1]
-                    except Exception:
-                        ext = None
-
-                    args = {
-                        "thumbnail_url": "https://img.icons8.com/fluency/344/loading.png",
-                        "caption": self._get_caption(unit["uid"], index=0),
-                        "parse_mode": "HTML",
-                        "reply_markup": self._gallery_markup(unit["uid"]),
-                        "id": utils.rand(20),
-                        "title": "Processing inline gallery",
-                    }
-
-                    if unit.get("gif", False) or ext in {".gif", ".mp4"}:
-                        await inline_query.answer(
-                            [InlineQueryResultGif(gif_url=unit["photo_url"], **args)]
-                        )
-                        return
+        unit = self._units.get(inline_query.query)
+        if inline_query.from_user.id != self._me or not isinstance(unit, GalleryUnit):
+            return
 
-                    await inline_query.answer(
-                        [InlineQueryResultPhoto(photo_url=unit["photo_url"], **args)],
-                        cache_time=0,
-                    )
-                except Exception as e:
-                    if unit["uid"] in self._error_events:
-                        self._error_events[unit["uid"]].set()
-                        self._error_events[unit["uid"]] = e
+        try:
+            try:
+                path = urlparse(unit.photo_url).path
+                ext = os.path.splitext(path)[1]
+            except Exception:
+                ext = None
+
+            args = {
+                "thumbnail_url": "https://img.icons8.com/fluency/344/loading.png",
+                "caption": self._get_caption(unit.uid, index=0),
+                "parse_mode": "HTML",
+                "reply_markup": self._gallery_markup(unit.uid),
+                "id": utils.rand(20),
+                "title": "Processing inline gallery",
+            }
+
+            if unit.gif or ext in {".gif", ".mp4"}:
+                await inline_query.answer(
+                    [InlineQueryResultGif(gif_url=unit.photo_url, **args)]
+                )
+                return
+
+            await inline_query.answer(
+                [InlineQueryResultPhoto(photo_url=unit.photo_url, **args)],
+                cache_time=0,
+            )
+        except Exception as e:
+            if unit.uid in self._error_events:
+                self._error_events[unit.uid].set()
+                self._error_events[unit.uid] = e
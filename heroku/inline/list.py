@@ -12,7 +12,6 @@
 
 import asyncio
 import contextlib
-import copy
 import functools
 import logging
 import time
@@ -26,14 +25,17 @@ from aiogram.types import (
     InlineQueryResultArticle,
     InputTextMessageContent,
 )
+from aiogram.types import Message as AiogramMessage
 from aiogram.exceptions import TelegramRetryAfter
 from herokutl.errors.rpcerrorlist import ChatSendInlineForbiddenError
 from herokutl.extensions.html import CUSTOM_EMOJIS
 from herokutl.tl.types import Message
 
 from .. import main, utils
+from .._invocation import bind_client
 from ..types import HerokuReplyMarkup
 from .types import InlineMessage, InlineUnit
+from .units import ListUnit
 
 logger = logging.getLogger(__name__)
 
@@ -73,7 +75,7 @@ class List(InlineUnit):
         :return: If list is sent, returns :obj:`InlineMessage`, otherwise returns `False`
         """
         with contextlib.suppress(AttributeError):
-            _heroku_client_id_logging_tag = copy.copy(self._client.tg_id)  # noqa: F841
+            bind_client(self._client.tg_id)
 
         custom_buttons = self._validate_markup(custom_buttons)
 
@@ -147,38 +149,31 @@ class List(InlineUnit):
 
         perms_map = None if manual_security else self._find_caller_sec_map()
 
-        self._units[unit_id] = {
-            "type": "list",
-            "caller": message,
-            "chat": None,
-            "message_id": None,
-            "top_msg_id": utils.get_topic(message),
-            "uid": unit_id,
-            "current_index": 0,
-            "strings": strings,
-            "future": asyncio.Event(),
-            **({"ttl": round(time.time()) + ttl} if ttl else {}),
-            **({"force_me": force_me} if force_me else {}),
-            **({"disable_security": disable_security} if disable_security else {}),
-            **({"on_unload": on_unload} if callable(on_unload) else {}),
-            **({"always_allow": always_allow} if always_allow else {}),
-            **({"perms_map": perms_map} if perms_map else {}),
-            **({"message": message} if isinstance(message, Message) else {}),
-            **({"custom_buttons": custom_buttons} if custom_buttons else {}),
-        }
-
         btn_call_data = utils.rand(10)
 
+        unit = self._units[unit_id] = ListUnit(
+            caller=message,
+            top_msg_id=utils.get_topic(message),
+            uid=unit_id,
+            strings=strings,
+            btn_call_data=btn_call_data,
+            future=asyncio.Event(),
+            ttl=round(time.time()) + ttl if ttl else None,
+            force_me=force_me,
+            disable_security=disable_security,
+            on_unload=on_unload if callable(on_unload) else None,
+            always_allow=always_allow,
+            perms_map=perms_map,
+            message=message if isinstance(message, Message) else None,
+            custom_buttons=custom_buttons,
+        )
+
         self._custom_map[btn_call_data] = {
             "handler": functools.partial(
                 self._list_page,
                 unit_id=unit_id,
             ),
-            **(
-                {"ttl": self._units[unit_id]["ttl"]}
-                if "ttl" in self._units[unit_id]
-                else {}
-            ),
+            **({"ttl": unit.ttl} if unit.ttl else {}),
             **({"always_allow": always_allow} if always_allow else {}),
             **({"force_me": force_me} if force_me else {}),
             **({"disable_security": disable_security} if disable_security else {}),
@@ -215,12 +210,16 @@ class List(InlineUnit):
                 await self._client.send_message(message, msg)
 
         try:
-            m = await self._invoke_unit(unit_id, message)
+            await self._invoke_unit(unit_id, message)
         except ChatSendInlineForbiddenError:
+            self._forget_unit(unit_id)
+            del self._units[unit_id]
             await answer(self.translator.getkey("inline.inline403"))
+            return False
         except Exception:
             logger.exception("Can't send list")
 
+            self._forget_unit(unit_id)
             del self._units[unit_id]
             await answer(
                 self.translator.getkey("inline.invoke_failed_logs").format(
@@ -234,19 +233,27 @@ class List(InlineUnit):
 
             return False
 
-        await self._units[unit_id]["future"].wait()
-        del self._units[unit_id]["future"]
-
-        self._units[unit_id]["chat"] = utils.get_chat_id(m)
-        self._units[unit_id]["message_id"] = m.id
-
         if isinstance(message, Message) and message.out:
             await message.delete()
 
         if status_message and not message.out:
             await status_message.delete()
 
-        return InlineMessage(self, unit_id, self._units[unit_id]["inline_message_id"])
+        return InlineMessage(self, unit_id, unit.inline_message_id)
+
+    async def _send_list(self, unit: ListUnit, **kwargs) -> AiogramMessage:
+        """
+        Send list by the bot itself
+        :param unit: List
+        :param kwargs: Chat, topic and reply of the message
+        :return: Sent message
+        """
+        return await self.bot.send_message(
+            text=self.sanitise_text(unit.strings[0]),
+            disable_web_page_preview=True,
+            reply_markup=self._list_markup(unit.uid),
+            **kwargs,
+        )
 
     async def _list_page(
         self,
@@ -258,22 +265,17 @@ class List(InlineUnit):
             await self._delete_unit_message(call, unit_id=unit_id)
             return
 
-        if self._units[unit_id]["current_index"] < 0 or page >= len(
-            self._units[unit_id]["strings"]
-        ):
+        unit = self._units[unit_id]
+        if unit.current_index < 0 or page >= len(unit.strings):
             await call.answer("Can't go to this page", show_alert=True)
             return
 
-        self._units[unit_id]["current_index"] = page
+        unit.current_index = page
 
         try:
             await self.bot.edit_message_text(
-                inline_message_id=call.inline_message_id,
-                text=self.sanitise_text(
-                    self._units[unit_id]["strings"][
-                        self._units[unit_id]["current_index"]
-                    ]
-                ),
+                **self._call_target(call),
+                text=self.sanitise_text(unit.strings[unit.current_index]),
                 reply_markup=self._list_markup(unit_id),
             )
             await call.answer()
@@ -290,40 +292,39 @@ class List(InlineUnit):
     def _list_markup(self, unit_id: str) -> InlineKeyboardMarkup:
         """Generates aiogram markup for `list`"""
         callback = functools.partial(self._list_page, unit_id=unit_id)
+        unit = self._units[unit_id]
         return self.generate_markup(
-            self._units[unit_id].get("custom_buttons", [])
+            (unit.custom_buttons or [])
             + self.build_pagination(
                 callback=callback,
-                total_pages=len(self._units[unit_id]["strings"]),
+                total_pages=len(unit.strings),
                 unit_id=unit_id,
             )
             + [[{"text": "🔻 Close", "callback": callback, "args": ("close",)}]],
         )
 
     async def _list_inline_handler(self, inline_query: InlineQuery):
-        for unit in self._units.copy().values():
-            if (
-                inline_query.from_user.id == self._me
-                and inline_query.query == unit["uid"]
-                and unit["type"] == "list"
-            ):
-                try:
-                    await inline_query.answer(
-                        [
-                            InlineQueryResultArticle(
-                                id=utils.rand(20),
-                                title="Heroku",
-                                input_message_content=InputTextMessageContent(
-                                    message_text=self.sanitise_text(unit["strings"][0]),
-                                    parse_mode="HTML",
-                                    disable_web_page_preview=True,
-                                ),
-                                reply_markup=self._list_markup(inline_query.query),
-                            )
-                        ],
-                        cache_time=60,
+        unit = self._units.get(inline_query.query)
+        if inline_query.from_user.id != self._me or not isinstance(unit, ListUnit):
+            return
+
+        try:
+            await inline_query.answer(
+                [
+                    InlineQueryResultArticle(
+                        id=utils.rand(20),
+                        title="Heroku",
+                        input_message_content=InputTextMessageContent(
+                            message_text=self.sanitise_text(unit.strings[0]),
+                            parse_mode="HTML",
+                            disable_web_page_preview=True,
+                        ),
+                        reply_markup=self._list_markup(inline_query.query),
                     )
-                except Exception as e:
-                    if unit["uid"] in self._error_events:
-                        self._error_events[unit["uid"]].set()
-                        self._error_events[unit["uid"]] = e
+                ],
+                cache_time=60,
+            )
+        except Exception as e:
+            if unit.uid in self._error_events:
+                self._error_events[unit.uid].set()
+                self._error_events[unit.uid] = e
@@ -37,7 +37,9 @@ class InlineMessage:
         self.inline_manager = inline_manager
         self._units = inline_manager._units
         self.form = (
-            {"id": unit_id, **self._units[unit_id]} if unit_id in self._units else {}
+            {"id": unit_id, **self._units[unit_id].as_dict()}
+            if unit_id in self._units
+            else {}
         )
 
     async def edit(self, *args, **kwargs) -> "InlineMessage":
@@ -59,10 +61,7 @@ class InlineMessage:
         if not entity:
             return await self.original_call.answer("msg not found", show_alert=True)
 
-        msgid = entity.get("message_id")
-        cid = entity.get("chat")
-
-        await self.inline_manager._client.delete_messages(cid, msgid)
+        await self.inline_manager._delete_unit(entity)
         return await self.original_call.answer("")
 
     async def unload(self) -> bool:
@@ -85,7 +84,9 @@ class BotInlineMessage:
         self.message_id = message_id
         self._units = inline_manager._units
         self.form = (
-            {"id": unit_id, **self._units[unit_id]} if unit_id in self._units else {}
+            {"id": unit_id, **self._units[unit_id].as_dict()}
+            if unit_id in self._units
+            else {}
         )
 
     async def edit(self, *args, **kwargs) -> "BotMessage":
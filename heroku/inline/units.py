@@ -0,0 +1,284 @@
+# ©️ Codrago, 2024-2025
+# This file is a part of Heroku Userbot
+# 🌐 https://github.com/coddrago/Heroku
+# You can redistribute it and/or modify it under the terms of the GNU AGPLv3
+# 🔑 https://www.gnu.org/licenses/agpl-3.0.html
+
+import collections
+import heapq
+import itertools
+import logging
+import time
+import typing
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of live forms, lists and galleries. The oldest ones are
+# unloaded, when it's exceeded
+MAX_UNITS = 10000
+
+
+class Unit:
+    """
+    Base of inline units. Fields are stored in slots, so units take less memory
+    than dicts and typos in field names are caught. Mapping-style access
+    (`unit["chat"]`, `unit.get("ttl")`, `"photo" in unit`) is kept for
+    external modules, missing fields being the ones, which are `None`
+    """
+
+    __slots__ = (
+        "uid",
+        "caller",
+        "chat",
+        "message_id",
+        "top_msg_id",
+        "message",
+        "inline_message_id",
+        # Set, when the unit is sent by the bot itself. `message_id` is then
+        # the id of the message in this Bot API chat
+        "bot_chat_id",
+        "future",
+        "ttl",
+        "buttons",
+        "btn_call_data",
+        "on_unload",
+        "perms_map",
+        "force_me",
+        "disable_security",
+        "always_allow",
+    )
+
+    type = "unknown"
+    # Fields, which are present in mapping view even if they are `None`
+    _always = frozenset({"uid", "caller", "chat", "message_id", "top_msg_id"})
+    _defaults: typing.Dict[str, typing.Any] = {}
+    _fields: typing.Tuple[str, ...] = __slots__
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._fields = tuple(
+            field
+            for klass in reversed(cls.__mro__)
+            for field in klass.__dict__.get("__slots__", ())
+        )
+
+    def __init__(self, **fields):
+        for field in self._fields:
+            setattr(self, field, fields.pop(field, self._defaults.get(field)))
+
+        if fields:
+            raise TypeError(
+                f"Unknown fields of {type(self).__name__}: {', '.join(fields)}"
+            )
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} {self.uid}>"
+
+    def keys(self) -> typing.List[str]:
+        return ["type"] + [field for field in self._fields if field in self]
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._always or getattr(self, key, None) is not None
+
+    def __getitem__(self, key: str) -> typing.Any:
+        if key not in self:
+            raise KeyError(key)
+
+        return getattr(self, key)
+
+    def __setitem__(self, key: str, value: typing.Any):
+        if key not in self._fields:
+            raise KeyError(key)
+
+        setattr(self, key, value)
+
+    def __delitem__(self, key: str):
+        if key not in self:
+            raise KeyError(key)
+
+        setattr(self, key, self._defaults.get(key))
+
+    def get(self, key: str, default: typing.Any = None) -> typing.Any:
+        return getattr(self, key) if key in self else default
+
+    def as_dict(self) -> typing.Dict[str, typing.Any]:
+        """Mapping view of the unit, as it's exposed in `InlineMessage.form`"""
+        return {key: self[key] for key in self.keys()}
+
+
+class FormUnit(Unit):
+    """Form with text or media and buttons"""
+
+    __slots__ = (
+        "text",
+        "photo",
+        "video",
+        "gif",
+        "file",
+        "mime_type",
+        "location",
+        "audio",
+    )
+
+    type = "form"
+
+
+class ListUnit(Unit):
+    """List of pages of text"""
+
+    __slots__ = ("strings", "current_index", "custom_buttons")
+
+    type = "list"
+    _defaults = {"current_index": 0}
+
+
+class GalleryUnit(Unit):
+    """Gallery of photos or animations"""
+
+    __slots__ = (
+        "caption",
+        "photo_url",
+        "next_handler",
+        "photos",
+        "current_index",
+        "preload",
+        "gif",
+        "slideshow",
+        "custom_buttons",
+    )
+
+    type = "gallery"
+    _defaults = {"current_index": 0, "slideshow": False}
+
+
+def _unit_type(unit: typing.Any) -> str:
+    return getattr(unit, "type", "unknown")
+
+
+class UnitStore(dict):
+    """
+    Live inline units by their ids. Expiration times are kept in a min-heap,
+    so expired units are found without scanning all of them, and number
+    of units is limited
+    """
+
+    def __init__(
+        self,
+        default_ttl: float,
+        on_drop: typing.Callable[[str, typing.Any], None],
+        max_units: int = MAX_UNITS,
+    ):
+        """
+        :param default_ttl: Lifetime in seconds of units without own `ttl`
+        :param on_drop: Called with id and unit right before the unit is
+            removed because of expiration or eviction
+        :param max_units: Maximum number of live units
+        """
+        super().__init__()
+        self.default_ttl = default_ttl
+        self.max_units = max_units
+        self._on_drop = on_drop
+        # (expiration time, sequence number, unit id)
+        self._heap: typing.List[typing.Tuple[float, int, str]] = []
+        self._expires: typing.Dict[str, float] = {}
+        self._sequence = itertools.count()
+        self._live: typing.Counter[str] = collections.Counter()
+        self._created: typing.Counter[str] = collections.Counter()
+        self._expired: typing.Counter[str] = collections.Counter()
+        self._evicted: typing.Counter[str] = collections.Counter()
+
+    def __setitem__(self, unit_id: str, unit: typing.Any):
+        if unit_id in self:
+            self._live[_unit_type(self[unit_id])] -= 1
+            if unit.ttl and unit.ttl != self._expires[unit_id]:
+                # Previous entry is left in heap and skipped by `expire`
+                self._schedule(unit_id, unit.ttl)
+        else:
+            self._schedule(unit_id, unit.ttl or time.time() + self.default_ttl)
+            self._created[_unit_type(unit)] += 1
+
+        super().__setitem__(unit_id, unit)
+        self._live[_unit_type(unit)] += 1
+
+        while len(self) > self.max_units:
+            oldest = next(iter(self))
+            self._evicted[_unit_type(self[oldest])] += 1
+            self._drop(oldest)
+
+    def __delitem__(self, unit_id: str):
+        self._live[_unit_type(self[unit_id])] -= 1
+        self._expires.pop(unit_id, None)
+        super().__delitem__(unit_id)
+
+        # Entries of removed units are compacted, when they dominate the heap
+        if len(self._heap) > 2 * len(self._expires) + 64:
+            self._heap = [
+                entry for entry in self._heap if self._expires.get(entry[2]) == entry[0]
+            ]
+            heapq.heapify(self._heap)
+
+    def pop(self, unit_id: str, *default) -> typing.Any:
+        if unit_id not in self:
+            return super().pop(unit_id, *default)
+
+        unit = self[unit_id]
+        del self[unit_id]
+        return unit
+
+    def clear(self):
+        super().clear()
+        self._heap.clear()
+        self._expires.clear()
+        self._live.clear()
+
+    def expire(self, now: typing.Optional[float] = None) -> int:
+        """
+        Remove expired units
+        :param now: Current time
+        :return: Number of removed units
+        """
+        now = now or time.time()
+        count = 0
+        while self._heap and self._heap[0][0] < now:
+            expires, _, unit_id = heapq.heappop(self._heap)
+            # Entries of removed or rescheduled units are left in heap and
+            # skipped here
+            if self._expires.get(unit_id) != expires:
+                continue
+
+            if (ttl := self[unit_id].ttl) and ttl > now:
+                # Lifetime was extended in place, after the unit was stored
+                self._schedule(unit_id, ttl)
+                continue
+
+            self._expired[_unit_type(self[unit_id])] += 1
+            self._drop(unit_id)
+            count += 1
+
+        return count
+
+    def _schedule(self, unit_id: str, expires: float):
+        self._expires[unit_id] = expires
+        heapq.heappush(self._heap, (expires, next(self._sequence), unit_id))
+
+    def _drop(self, unit_id: str):
+        try:
+            self._on_drop(unit_id, self[unit_id])
+        except Exception:
+            logger.exception("Error while unloading unit %s", unit_id)
+
+        if unit_id in self:
+            del self[unit_id]
+
+    @property
+    def stats(self) -> typing.Dict[str, typing.Dict[str, int]]:
+        """Live, created, expired and evicted units by unit type"""
+        return {
+            unit_type: {
+                "live": self._live[unit_type],
+                "created": self._created[unit_type],
+                "expired": self._expired[unit_type],
+                "evicted": self._evicted[unit_type],
+            }
+            for unit_type in self._created
+        }
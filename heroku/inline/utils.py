@@ -44,6 +44,7 @@ from aiogram.exceptions import (
 from .. import utils
 from ..types import HerokuReplyMarkup
 from .types import InlineCall, InlineUnit
+from .units import Unit
 
 logger = logging.getLogger(__name__)
 
@@ -63,52 +64,18 @@ class Utils(InlineUnit):
         markup = InlineKeyboardMarkup(inline_keyboard=[])
 
         map_ = (
-            self._units[markup_obj]["buttons"]
+            self._units[markup_obj].buttons
             if isinstance(markup_obj, str)
             else markup_obj
         )
 
         map_ = self._normalize_markup(map_)
 
-        setup_callbacks = False
-
-        for row in map_:
-            for button in row:
-                if not isinstance(button, dict):
-                    logger.error(
-                        "Button %s is not a `dict`, but `%s` in %s",
-                        button,
-                        type(button),
-                        map_,
-                    )
-                    return None
-
-                if "callback" not in button:
-                    if button.get("action") == "close":
-                        button["callback"] = self._close_unit_handler
-
-                    if button.get("action") == "unload":
-                        button["callback"] = self._unload_unit_handler
-
-                    if button.get("action") == "answer":
-                        if not button.get("message"):
-                            logger.error(
-                                "Button %s has no `message` to answer with", button
-                            )
-                            return None
-
-                        button["callback"] = functools.partial(
-                            self._answer_unit_handler,
-                            show_alert=button.get("show_alert", False),
-                            text=button["message"],
-                        )
-
-                if "callback" in button and "_callback_data" not in button:
-                    button["_callback_data"] = utils.rand(30)
-                    setup_callbacks = True
+        if not self._setup_buttons(map_):
+            return None
 
-                if "input" in button and "_switch_query" not in button:
-                    button["_switch_query"] = utils.rand(10)
+        if isinstance(markup_obj, str):
+            self._index_unit(markup_obj)
 
         for row in map_:
             line = []
@@ -135,35 +102,6 @@ class Utils(InlineUnit):
                                 callback_data=button["_callback_data"],
                             )
                         ]
-                        if setup_callbacks:
-                            self._custom_map[button["_callback_data"]] = {
-                                "handler": button["callback"],
-                                **(
-                                    {"always_allow": button["always_allow"]}
-                                    if button.get("always_allow", False)
-                                    else {}
-                                ),
-                                **(
-                                    {"args": button["args"]}
-                                    if button.get("args", False)
-                                    else {}
-                                ),
-                                **(
-                                    {"kwargs": button["kwargs"]}
-                                    if button.get("kwargs", False)
-                                    else {}
-                                ),
-                                **(
-                                    {"force_me": True}
-                                    if button.get("force_me", False)
-                                    else {}
-                                ),
-                                **(
-                                    {"disable_security": True}
-                                    if button.get("disable_security", False)
-                                    else {}
-                                ),
-                            }
                     elif "input" in button:
                         line += [
                             InlineKeyboardButton(
@@ -238,8 +176,175 @@ class Utils(InlineUnit):
 
     generate_markup = _generate_markup
 
+    def _setup_buttons(
+        self,
+        map_: typing.List[typing.List[typing.Dict[str, typing.Any]]],
+    ) -> bool:
+        """
+        Assigns callbacks of actions and random callback data and switch queries
+        to buttons, which don't have them yet
+        :return: `False` if some button is invalid
+        """
+        for row in map_:
+            for button in row:
+                if not isinstance(button, dict):
+                    logger.error(
+                        "Button %s is not a `dict`, but `%s` in %s",
+                        button,
+                        type(button),
+                        map_,
+                    )
+                    return False
+
+                if "callback" not in button:
+                    if button.get("action") == "close":
+                        button["callback"] = self._close_unit_handler
+
+                    if button.get("action") == "unload":
+                        button["callback"] = self._unload_unit_handler
+
+                    if button.get("action") == "answer":
+                        if not button.get("message"):
+                            logger.error(
+                                "Button %s has no `message` to answer with", button
+                            )
+                            return False
+
+                        button["callback"] = functools.partial(
+                            self._answer_unit_handler,
+                            show_alert=button.get("show_alert", False),
+                            text=button["message"],
+                        )
+
+                if "callback" in button and "_callback_data" not in button:
+                    button["_callback_data"] = utils.rand(30)
+                    if "url" not in button:
+                        self._custom_map[button["_callback_data"]] = {
+                            "handler": button["callback"],
+                            **(
+                                {"always_allow": button["always_allow"]}
+                                if button.get("always_allow", False)
+                                else {}
+                            ),
+                            **(
+                                {"args": button["args"]}
+                                if button.get("args", False)
+                                else {}
+                            ),
+                            **(
+                                {"kwargs": button["kwargs"]}
+                                if button.get("kwargs", False)
+                                else {}
+                            ),
+                            **(
+                                {"force_me": True}
+                                if button.get("force_me", False)
+                                else {}
+                            ),
+                            **(
+                                {"disable_security": True}
+                                if button.get("disable_security", False)
+                                else {}
+                            ),
+                        }
+
+                if "input" in button and "_switch_query" not in button:
+                    button["_switch_query"] = utils.rand(10)
+
+        return True
+
+    def _unit_buttons(self, unit_id: str) -> typing.List[typing.Dict[str, typing.Any]]:
+        return [
+            button
+            for row in self._normalize_markup(self._units[unit_id].buttons or [])
+            for button in row
+            if isinstance(button, dict)
+        ]
+
+    def _index_unit(self, unit_id: str):
+        """Adds buttons of the unit to callback data and switch query indexes"""
+        if unit_id not in self._units:
+            return
+
+        self._setup_buttons(self._normalize_markup(self._units[unit_id].buttons or []))
+
+        for button in self._unit_buttons(unit_id):
+            if "_callback_data" in button:
+                self._button_index[button["_callback_data"]] = (unit_id, button)
+
+            if "_switch_query" in button:
+                self._query_index[button["_switch_query"]] = (unit_id, button)
+
+    def _unindex_unit(self, unit_id: str):
+        """Removes buttons of the unit from callback data and switch query indexes"""
+        if unit_id not in self._units:
+            return
+
+        for button in self._unit_buttons(unit_id):
+            for index, key in (
+                (self._button_index, button.get("_callback_data")),
+                (self._query_index, button.get("_switch_query")),
+            ):
+                if key and index.get(key, (None,))[0] == unit_id:
+                    del index[key]
+
+    def _forget_unit(self, unit_id: str):
+        """Removes indexes and callbacks of the unit, which is being removed"""
+        if unit_id not in self._units:
+            return
+
+        self._unindex_unit(unit_id)
+        for key in [
+            self._units[unit_id].btn_call_data,
+            *(button.get("_callback_data") for button in self._unit_buttons(unit_id)),
+        ]:
+            if key:
+                self._custom_map.pop(key, None)
+
+    def _find_button(
+        self,
+        index: typing.Dict[str, typing.Tuple[str, typing.Dict[str, typing.Any]]],
+        key: str,
+    ) -> typing.Optional[typing.Tuple[str, typing.Dict[str, typing.Any]]]:
+        """
+        Finds unit and its button by callback data or switch query
+        :param index: `_button_index` or `_query_index`
+        :param key: Callback data or switch query
+        :return: Tuple of unit id and button or `None`
+        """
+        if not (found := index.get(key)):
+            return None
+
+        if found[0] not in self._units:
+            # Unit was removed without unindexing
+            del index[key]
+            return None
+
+        return found
+
+    def _call_target(self, call: CallbackQuery) -> typing.Dict[str, typing.Any]:
+        """
+        Get arguments of Bot API methods, which identify message of the callback
+        :param call: Callback query
+        :return: `inline_message_id` or `chat_id` and `message_id`
+        """
+        if call.inline_message_id:
+            return {"inline_message_id": call.inline_message_id}
+
+        return {"chat_id": call.message.chat.id, "message_id": call.message.message_id}
+
+    async def _delete_unit(self, unit: Unit):
+        """Deletes message of the unit on behalf of the one, who has sent it"""
+        if unit.bot_chat_id:
+            await self.bot.delete_message(
+                chat_id=unit.bot_chat_id,
+                message_id=unit.message_id,
+            )
+        else:
+            await self._client.delete_messages(unit.chat, unit.message_id)
+
     async def _close_unit_handler(self, call: InlineCall):
-        return await self._client.delete_messages(call._units.get(call.unit_id).get('chat'), call._units.get(call.unit_id).get('message_id'))
+        return await self._delete_unit(call._units[call.unit_id])
 
     async def _unload_unit_handler(self, call: InlineCall):
         await call.unload()
@@ -375,26 +480,32 @@ class Utils(InlineUnit):
         if unit_id is not None and unit_id in self._units:
             unit = self._units[unit_id]
 
-            unit["buttons"] = reply_markup
+            self._unindex_unit(unit_id)
+            unit.buttons = reply_markup
+            self._index_unit(unit_id)
 
             if isinstance(force_me, bool):
-                unit["force_me"] = force_me
+                unit.force_me = force_me
 
             if isinstance(disable_security, bool):
-                unit["disable_security"] = disable_security
+                unit.disable_security = disable_security
 
             if isinstance(always_allow, list):
-                unit["always_allow"] = always_allow
+                unit.always_allow = always_allow
         else:
-            unit = {}
+            unit = None
 
         if not chat_id or not message_id:
             inline_message_id = (
                 inline_message_id
-                or unit.get("inline_message_id", False)
+                or getattr(unit, "inline_message_id", None)
                 or getattr(query, "inline_message_id", None)
             )
 
+        if not chat_id and not inline_message_id and unit and unit.bot_chat_id:
+            # Unit was sent by the bot itself, so it has no inline message
+            chat_id, message_id = unit.bot_chat_id, unit.message_id
+
         if not chat_id and not message_id and not inline_message_id:
             logger.warning(
                 "Attempted to edit message with no `inline_message_id`. "
@@ -483,7 +594,7 @@ class Utils(InlineUnit):
                     reply_markup=self.generate_markup(
                         reply_markup
                         if isinstance(reply_markup, list)
-                        else unit.get("buttons", [])
+                        else getattr(unit, "buttons", None) or []
                     ),
                 )
             except TelegramBadRequest as e:
@@ -501,7 +612,7 @@ class Utils(InlineUnit):
                         reply_markup=self.generate_markup(
                             reply_markup
                             if isinstance(reply_markup, list)
-                            else unit.get("buttons", [])
+                            else getattr(unit, "buttons", None) or []
                         ),
                     )
                 except Exception:
@@ -541,7 +652,7 @@ class Utils(InlineUnit):
                 reply_markup=self.generate_markup(
                     reply_markup
                     if isinstance(reply_markup, list)
-                    else unit.get("buttons", [])
+                    else getattr(unit, "buttons", None) or []
                 ),
             )
         except TelegramRetryAfter as e:
@@ -589,7 +700,7 @@ class Utils(InlineUnit):
             unit_id = call.unit_id
 
         try:
-            await self._client.delete_messages(call._units.get(unit_id).get('chat'), call._units.get(unit_id).get('message_id'))
+            await self._delete_unit(call._units[unit_id])
         except Exception:
             return False
 
@@ -598,12 +709,11 @@ class Utils(InlineUnit):
     async def _unload_unit(self, unit_id: str) -> bool:
         """Params `self`, `unit_id` are for internal use only, do not try to pass them"""
         try:
-            if "on_unload" in self._units[unit_id] and callable(
-                self._units[unit_id]["on_unload"]
-            ):
-                self._units[unit_id]["on_unload"]()
+            if callable(self._units[unit_id].on_unload):
+                self._units[unit_id].on_unload()
 
             if unit_id in self._units:
+                self._forget_unit(unit_id)
                 del self._units[unit_id]
             else:
                 return False
@@ -621,7 +731,7 @@ class Utils(InlineUnit):
     ) -> typing.List[typing.List[typing.Dict[str, typing.Any]]]:
         # Based on https://github.com/pystorage/pykeyboard/blob/master/pykeyboard/inline_pagination_keyboard.py#L4
         if current_page is None:
-            current_page = self._units[unit_id]["current_index"] + 1
+            current_page = self._units[unit_id].current_index + 1
 
         if total_pages <= 5:
             return [
@@ -15,7 +15,6 @@
 import asyncio
 import builtins
 import contextlib
-import copy
 import importlib
 import importlib.machinery
 import importlib.util
@@ -33,6 +32,7 @@ from uuid import uuid4
 from herokutl.tl.tlobject import TLObject
 
 from . import security, utils, validators
+from ._invocation import bind_client, invocation
 from .database import Database
 from .inline.core import InlineManager
 from .translations import Strings, Translator
@@ -182,7 +182,7 @@ class InfiniteLoop:
 
     def stop(self, *args, **kwargs):
         with contextlib.suppress(AttributeError):
-            _heroku_client_id_logging_tag = copy.copy(  # noqa: F841
+            bind_client(
                 self.module_instance.allmodules.client.tg_id
             )
 
@@ -199,7 +199,7 @@ class InfiniteLoop:
 
     def start(self, *args, **kwargs):
         with contextlib.suppress(AttributeError):
-            _heroku_client_id_logging_tag = copy.copy(  # noqa: F841
+            bind_client(
                 self.module_instance.allmodules.client.tg_id
             )
 
@@ -231,7 +231,12 @@ class InfiniteLoop:
                 break
 
             try:
-                await self.func(self.module_instance, *args, **kwargs)
+                with invocation(
+                    client_id=getattr(self.module_instance, "tg_id", None),
+                    module=self.module_instance,
+                    command=self.func,
+                ):
+                    await self.func(self.module_instance, *args, **kwargs)
             except StopLoop:
                 break
             except Exception:
@@ -470,6 +475,10 @@ def watcher(*args, **kwargs):
 def callback_handler(*args, **kwargs):
     """
     Decorator that marks function as callback handler
+    :param prefix: Prefix or tuple of prefixes of callback data. If passed, handler
+        is called only for queries, which data starts with one of them
+    :param pattern: Regex, which callback data must match. If neither `prefix`
+        nor `pattern` is passed, handler is called for every query
     """
     return _mark_method("is_callback_handler", *args, **kwargs)
 
@@ -512,6 +521,9 @@ class Modules:
         self.watchers = []
         self._log_handlers = []
         self._core_commands = []
+        self._routing_version = 0
+        self._alias_index: typing.Dict[str, str] = {}
+        self._alias_index_version = -1
         self.__approve = []
         self.allclients = allclients
         self.client = client
@@ -541,6 +553,7 @@ class Modules:
                 watchers.extend(module.heroku_watchers.values())
 
             self.commands = commands
+            self.invalidate_routing()
             self.inline_handlers = inline_handlers
             self.callback_handlers = callback_handlers
             self.watchers = watchers
@@ -606,7 +619,7 @@ class Modules:
         origin: str = "<core>",
     ) -> typing.List[Module]:
         with contextlib.suppress(AttributeError):
-            _heroku_client_id_logging_tag = copy.copy(self.client.tg_id)  # noqa: F841
+            bind_client(self.client.tg_id)
 
         loaded = []
 
@@ -641,7 +654,7 @@ class Modules:
     ) -> Module:
         """Register single module from importlib spec"""
         with contextlib.suppress(AttributeError):
-            _heroku_client_id_logging_tag = copy.copy(self.client.tg_id)  # noqa: F841
+            bind_client(self.client.tg_id)
 
         module = importlib.util.module_from_spec(spec)
         sys.modules[module_name] = module
@@ -684,6 +697,41 @@ class Modules:
 
         return ret
 
+    @property
+    def routing_version(self) -> int:
+        """
+        Counter, which is bumped every time commands, callback handlers
+        or aliases change
+        """
+        return self._routing_version
+
+    def invalidate_routing(self):
+        """
+        Mark commands, callback handlers and aliases as changed, so routing
+        indexes are rebuilt
+        """
+        self._routing_version += 1
+
+    def _rebuild_alias_index(self):
+        """Build `alias -> command` mapping from `alias`/`aliases` tags of commands"""
+        index = {}
+        core_commands = set(self._core_commands)
+
+        for command_name, _command in self.commands.items():
+            aliases = []
+            if getattr(_command, "alias", None) and not (
+                aliases := getattr(_command, "aliases", None)
+            ):
+                aliases = [_command.alias]
+
+            for _alias in aliases or []:
+                _alias = _alias.lower()
+                if _alias not in core_commands:
+                    index.setdefault(_alias, command_name)
+
+        self._alias_index = index
+        self._alias_index_version = self._routing_version
+
     def add_aliases(self, aliases: dict):
         """Saves aliases and applies them to <core>/<file> modules"""
         self.aliases.update(aliases)
@@ -694,7 +742,7 @@ class Modules:
         """Register event handlers for a module"""
         for name, handler in utils.iter_attrs(instance):
             if getattr(handler, "is_raw_handler", False):
-                self.client.dispatcher.raw_handlers.append(handler)
+                self.client.dispatcher.raw_handlers.add(handler)
                 logger.debug(
                     "Registered raw handler %s for %s. ID: %s",
                     name,
@@ -711,7 +759,7 @@ class Modules:
     def register_commands(self, instance: Module):
         """Register commands from instance"""
         with contextlib.suppress(AttributeError):
-            _heroku_client_id_logging_tag = copy.copy(self.client.tg_id)  # noqa: F841
+            bind_client(self.client.tg_id)
 
         if instance.__origin__.startswith("<core"):
             self._core_commands += list(
@@ -732,6 +780,8 @@ class Modules:
 
             self.commands.update({_command.lower(): cmd})
 
+        self.invalidate_routing()
+
         for alias, cmd in self.aliases.copy().items():
             _cmd = cmd.split(maxsplit=1)
             if _cmd[0] in instance.heroku_commands:
@@ -779,6 +829,8 @@ class Modules:
 
             self.callback_handlers.update({name.lower(): func})
 
+        self.invalidate_routing()
+
     def unregister_inline_stuff(self, instance: Module, purpose: str):
         for name, func in instance.heroku_inline_handlers.copy().items():
             if name.lower() in self.inline_handlers and (
@@ -810,17 +862,22 @@ class Modules:
                     purpose,
                 )
 
+        self.invalidate_routing()
+
     def register_watchers(self, instance: Module):
         """Register watcher from instance"""
         with contextlib.suppress(AttributeError):
-            _heroku_client_id_logging_tag = copy.copy(self.client.tg_id)  # noqa: F841
+            bind_client(self.client.tg_id)
 
         for _watcher in self.watchers:
             if _watcher.__self__.__class__.__name__ == instance.__class__.__name__:
                 logger.debug("Removing watcher %s for update", _watcher)
                 self.watchers.remove(_watcher)
 
+        from .dispatcher import compile_tags
+
         for _watcher in instance.heroku_watchers.values():
+            compile_tags(_watcher)
             self.watchers += [_watcher]
 
     def lookup(
@@ -874,7 +931,7 @@ class Modules:
     async def complete_registration(self, instance: Module):
         """Complete registration of instance"""
         with contextlib.suppress(AttributeError):
-            _heroku_client_id_logging_tag = copy.copy(self.client.tg_id)  # noqa: F841
+            bind_client(self.client.tg_id)
 
         instance.allmodules = self
         instance.internal_init()
@@ -915,22 +972,11 @@ class Modules:
         if not alias:
             return None
 
-        for command_name, _command in self.commands.items():
-            aliases = []
-            if getattr(_command, "alias", None) and not (
-                aliases := getattr(_command, "aliases", None)
-            ):
-                aliases = [_command.alias]
-
-            if not aliases:
-                continue
+        if self._alias_index_version != self._routing_version:
+            self._rebuild_alias_index()
 
-            if any(
-                alias.lower() == _alias.lower()
-                and alias.lower() not in self._core_commands
-                for _alias in aliases
-            ):
-                return command_name
+        if command_name := self._alias_index.get(alias.lower()):
+            return command_name
 
         if alias in self.aliases and include_legacy:
             return self.aliases[alias]
@@ -961,7 +1007,7 @@ class Modules:
     def send_config_one(self, mod: Module, skip_hook: bool = False):
         """Send config to single instance"""
         with contextlib.suppress(AttributeError):
-            _heroku_client_id_logging_tag = copy.copy(self.client.tg_id)  # noqa: F841
+            bind_client(self.client.tg_id)
 
         if hasattr(mod, "config"):
             modcfg = self._db.get(
@@ -1026,9 +1072,16 @@ class Modules:
         no_self_unload: bool = False,
         from_dlmod: bool = False,
     ):
-        with contextlib.suppress(AttributeError):
-            _heroku_client_id_logging_tag = copy.copy(self.client.tg_id)  # noqa: F841
+        # Tasks, which are started by module in its hooks, are attributed to it
+        with invocation(client_id=self.client.tg_id, module=mod):
+            await self._send_ready_one(mod, no_self_unload, from_dlmod)
 
+    async def _send_ready_one(
+        self,
+        mod: Module,
+        no_self_unload: bool,
+        from_dlmod: bool,
+    ):
         if from_dlmod:
             try:
                 if len(inspect.signature(mod.on_dlmod).parameters) == 2:
@@ -1098,7 +1151,7 @@ class Modules:
         worked = []
 
         with contextlib.suppress(AttributeError):
-            _heroku_client_id_logging_tag = copy.copy(self.client.tg_id)  # noqa: F841
+            bind_client(self.client.tg_id)
 
         for module in self.modules:
             if classname.lower() in (
@@ -1161,6 +1214,8 @@ class Modules:
                     if _command == name:
                         del self.aliases[alias]
 
+                self.invalidate_routing()
+
     def unregister_watchers(self, instance: Module, purpose: str):
         for _watcher in self.watchers.copy():
             if _watcher.__self__.__class__.__name__ == instance.__class__.__name__:
@@ -1190,11 +1245,15 @@ class Modules:
             return False
 
         self.aliases[alias.lower().strip()] = f"{cmd} {args}" if args else cmd
+        self.invalidate_routing()
         return True
 
     def remove_alias(self, alias: str) -> bool:
         """Remove an alias"""
-        return bool(self.aliases.pop(alias.lower().strip(), None))
+        if removed := bool(self.aliases.pop(alias.lower().strip(), None)):
+            self.invalidate_routing()
+
+        return removed
 
     async def log(self, *args, **kwargs):
         """Unnecessary placeholder for logging"""
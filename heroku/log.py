@@ -33,6 +33,7 @@ from herokutl.errors.rpcbaseerrors import (
 )
 
 from . import utils
+from ._invocation import get_invocation
 from .tl_cache import CustomTelegramClient
 from .types import BotInlineCall, Module, CoreOverwriteError
 from .web.debugger import WebDebugger
@@ -185,7 +186,7 @@ class HerokuException:
             ]
         )
 
-        caller = utils.find_caller(stack or inspect.stack())
+        caller = utils.find_caller(stack)
 
         return cls(
             message=override_text(exc_value)
@@ -459,27 +460,7 @@ class TelegramLogsHandler(logging.Handler):
             await self.avoid_floodwait(exc)
 
     def emit(self, record: logging.LogRecord):
-        try:
-            caller = next(
-                (
-                    frame_info.frame.f_locals["_heroku_client_id_logging_tag"]
-                    for frame_info in inspect.stack()
-                    if isinstance(
-                        getattr(getattr(frame_info, "frame", None), "f_locals", {}).get(
-                            "_heroku_client_id_logging_tag"
-                        ),
-                        int,
-                    )
-                ),
-                False,
-            )
-
-            if not isinstance(caller, int):
-                caller = None
-        except Exception:
-            caller = None
-
-        record.heroku_caller = caller
+        record.heroku_caller = get_invocation().client_id
 
         if record.levelno >= self.tg_level:
             if record.exc_info:
@@ -504,12 +485,12 @@ class TelegramLogsHandler(logging.Handler):
                         "https://docs.telethon.dev/en/stable/concepts/entities.html",
                     ]
                 ):
-                    self.tg_buff += [(exc, caller)]
+                    self.tg_buff += [(exc, record.heroku_caller)]
             else:
                 self.tg_buff += [
                     (
                         _tg_formatter.format(record),
-                        caller,
+                        record.heroku_caller,
                     )
                 ]
 
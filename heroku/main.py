@@ -978,6 +978,13 @@ class Heroku:
         client.heroku_db = db
         await db.init()
 
+        if os.environ.get("PERSISTENT_ENTITY_CACHE") or get_config_key(
+            "persistent_entity_cache"
+        ):
+            await client.enable_persistent_cache(
+                BASE_PATH / f"entities-{client.tg_id}.db"
+            )
+
         logging.debug("Got DB")
         logging.debug("Loading logging config...")
 
@@ -1045,6 +1052,13 @@ class Heroku:
                     await inline._dp.stop_polling()
                     await inline.bot.session.close()
                 except: pass
+            db = getattr(client, "heroku_db", None)
+            if db:
+                await db.flush()
+            try:
+                await client.persist_cache()
+            except Exception:
+                logging.exception("Can't write cache to disk")
         for c in self.clients:
             await c.disconnect()
         for task in asyncio.all_tasks():
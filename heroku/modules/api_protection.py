@@ -155,7 +155,10 @@ class APIRatelimiterMod(loader.Module):
                         self._lock = True
                         report = io.BytesIO(
                             json.dumps(
-                                self._ratelimiter,
+                                {
+                                    "requests": self._ratelimiter,
+                                    "blocked": self._blocked_requests(),
+                                },
                                 indent=4,
                             ).encode()
                         )
@@ -183,6 +186,14 @@ class APIRatelimiterMod(loader.Module):
         self._client._call._heroku_overwritten = True
         logger.debug("Successfully installed ratelimiter")
 
+    def _blocked_requests(self) -> typing.Dict[str, int]:
+        """Number of requests, which were blocked as forbidden, by request name"""
+        return {
+            name: count
+            for (name, decision), count in self._client.call_decisions.items()
+            if decision == "blocked"
+        }
+
     async def on_unload(self):
         if hasattr(self._client, "_old_call_rewritten"):
             self._client._call = self._client._old_call_rewritten
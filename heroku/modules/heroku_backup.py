@@ -130,7 +130,7 @@ class HerokuBackupMod(loader.Module):
                 self.get("last_backup") + self.get("period") - time.time()
             )
 
-            db = io.BytesIO(json.dumps(self._db).encode())
+            db = io.BytesIO(json.dumps(self._db.copy()).encode())
             db.name = "db.json"
 
             mods = io.BytesIO()
@@ -175,7 +175,7 @@ class HerokuBackupMod(loader.Module):
             logger.exception("HerokuBackup failed")
             await asyncio.sleep(60)
 
-    @loader.callback_handler()
+    @loader.callback_handler(prefix="heroku/backupall/restore")
     async def restore(self, call: BotInlineCall):
         if not call.data.startswith("heroku/backupall/restore"):
             return
@@ -270,7 +270,7 @@ class HerokuBackupMod(loader.Module):
 
     @loader.command()
     async def backupdb(self, message: Message):
-        txt = io.BytesIO(json.dumps(self._db).encode())
+        txt = io.BytesIO(json.dumps(self._db.copy()).encode())
         txt.name = f"db-backup-{datetime.datetime.now():%d-%m-%Y-%H-%M}.json"
         await self._client.send_file(
             "me",
@@ -412,7 +412,7 @@ class HerokuBackupMod(loader.Module):
 
     @loader.command()
     async def backupall(self, message: Message):
-        db = io.BytesIO(json.dumps(self._db).encode())
+        db = io.BytesIO(json.dumps(self._db.copy()).encode())
         db.name = "db.json"
 
         mods = io.BytesIO()
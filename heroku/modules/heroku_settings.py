@@ -32,6 +32,7 @@ ALL_INVOKES = [
     "flush_fulluser_cache",
     "flush_fullchannel_cache",
     "flush_perms_cache",
+    "flush_disk_cache",
     "flush_loader_cache",
     "flush_cache",
     "reload_core",
@@ -636,6 +637,25 @@ class HerokuSettingsMod(loader.Module):
                         ),
                     }
                 ),
+                (
+                    {
+                        "text": "✅ BotForms",
+                        "callback": self.inline__setting,
+                        "args": (
+                            "direct_units",
+                            False,
+                        ),
+                    }
+                    if self._db.get(main.__name__, "direct_units", True)
+                    else {
+                        "text": "🚫 BotForms",
+                        "callback": self.inline__setting,
+                        "args": (
+                            "direct_units",
+                            True,
+                        ),
+                    }
+                ),
             ],
             [
                 (
@@ -800,21 +820,26 @@ class HerokuSettingsMod(loader.Module):
                 result = (
                     f"Dropped {len(self._client._heroku_entity_cache)} cache records"
                 )
-                self._client._heroku_entity_cache = {}
+                self._client._heroku_entity_cache.clear()
             elif method == "flush_fulluser_cache":
                 result = (
                     f"Dropped {len(self._client._heroku_fulluser_cache)} cache records"
                 )
-                self._client._heroku_fulluser_cache = {}
+                self._client._heroku_fulluser_cache.clear()
             elif method == "flush_fullchannel_cache":
                 result = (
                     f"Dropped {len(self._client._heroku_fullchannel_cache)} cache"
                     " records"
                 )
-                self._client._heroku_fullchannel_cache = {}
+                self._client._heroku_fullchannel_cache.clear()
             elif method == "flush_perms_cache":
                 result = f"Dropped {len(self._client._heroku_perms_cache)} cache records"
-                self._client._heroku_perms_cache = {}
+                self._client._heroku_perms_cache.clear()
+            elif method == "flush_disk_cache":
+                result = (
+                    f"Dropped {await self._client.flush_persistent_cache()} disk"
+                    " cache records"
+                )
             elif method == "flush_loader_cache":
                 result = (
                     f"Dropped {await self.lookup('loader').flush_cache()} cache records"
@@ -828,11 +853,13 @@ class HerokuSettingsMod(loader.Module):
                     " records\nDropped"
                     f" {len(self._client._heroku_fullchannel_cache)} fullchannel cache"
                     " records\nDropped"
-                    f" {count} loader links cache records"
+                    f" {count} loader links cache records\nDropped"
+                    f" {await self._client.flush_persistent_cache()} disk cache"
+                    " records"
                 )
-                self._client._heroku_entity_cache = {}
-                self._client._heroku_fulluser_cache = {}
-                self._client._heroku_fullchannel_cache = {}
+                self._client._heroku_entity_cache.clear()
+                self._client._heroku_fulluser_cache.clear()
+                self._client._heroku_fullchannel_cache.clear()
                 self._client.heroku_me = await self._client.get_me()
             elif method == "reload_core":
                 core_quantity = await self.lookup("loader").reload_core()
@@ -845,6 +872,14 @@ class HerokuSettingsMod(loader.Module):
                     " cache:"
                     f" {len(self._client._heroku_fullchannel_cache)} records\nLoader"
                     f" links cache: {self.lookup('loader').inspect_cache()} records"
+                ) + "".join(
+                    f"\n{name}: {stats['hits']} hits, {stats['misses']} misses,"
+                    f" {stats['evictions']} evictions, {stats['expirations']} expired"
+                    for name, stats in self._client.cache_stats.items()
+                ) + "".join(
+                    f"\nInline {unit_type}s: {stats['live']} live, {stats['expired']}"
+                    f" expired, {stats['evicted']} evicted"
+                    for unit_type, stats in self.inline.units_stats.items()
                 )
             elif method == "inspect_modules":
                 result = (
@@ -83,7 +83,7 @@ class Quickstart(loader.Module):
 
         self.set("no_msg", True)
 
-    @loader.callback_handler()
+    @loader.callback_handler(prefix="heroku/lang/")
     async def lang(self, call: BotInlineCall):
         if not call.data.startswith("heroku/lang/"):
             return
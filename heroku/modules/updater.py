@@ -197,7 +197,7 @@ class UpdaterMod(loader.Module):
                     client.loader.db.get("Updater", "upd_msg"),
                 )
 
-    @loader.callback_handler()
+    @loader.callback_handler(prefix=("heroku/update", "heroku/ignore_upd"))
     async def update_call(self, call: InlineCall):
         """Process update buttons clicks"""
         if call.data not in {"heroku/update", "heroku/ignore_upd"}:
@@ -256,10 +256,14 @@ class UpdaterMod(loader.Module):
         await self.restart_common(call, secure_boot=secure_boot)
 
     async def process_restart_message(self, msg_obj: typing.Union[InlineCall, Message]):
+        unit = self.inline._units.get(getattr(msg_obj, "unit_id", None))
         self.set(
             "selfupdatemsg",
             (
-                msg_obj.inline_message_id
+                # Form, sent by the bot itself, is edited by the bot
+                [unit.bot_chat_id, unit.message_id]
+                if unit and unit.bot_chat_id
+                else msg_obj.inline_message_id
                 if hasattr(msg_obj, "inline_message_id")
                 else f"{utils.get_chat_id(msg_obj)}:{msg_obj.id}"
             ),
@@ -275,9 +279,9 @@ class UpdaterMod(loader.Module):
             and isinstance(msg_obj.form, dict)
             and "uid" in msg_obj.form
             and msg_obj.form["uid"] in self.inline._units
-            and "message" in self.inline._units[msg_obj.form["uid"]]
+            and self.inline._units[msg_obj.form["uid"]].message is not None
         ):
-            message = self.inline._units[msg_obj.form["uid"]]["message"]
+            message = self.inline._units[msg_obj.form["uid"]].message
         else:
             message = msg_obj
 
@@ -622,7 +626,11 @@ class UpdaterMod(loader.Module):
             return
 
         await self.inline.bot.edit_message_text(
-            inline_message_id=ms,
+            **(
+                {"chat_id": ms[0], "message_id": ms[1]}
+                if isinstance(ms, list)
+                else {"inline_message_id": ms}
+            ),
             text=self.inline.sanitise_text(msg),
         )
 
@@ -655,7 +663,11 @@ class UpdaterMod(loader.Module):
             return
 
         await self.inline.bot.edit_message_text(
-            inline_message_id=ms,
+            **(
+                {"chat_id": ms[0], "message_id": ms[1]}
+                if isinstance(ms, list)
+                else {"inline_message_id": ms}
+            ),
             text=self.inline.sanitise_text(msg),
         )
 
@@ -28,6 +28,9 @@
 # You can redistribute it and/or modify it under the terms of the GNU AGPLv3
 # 🔑 https://www.gnu.org/licenses/agpl-3.0.html
 
+import asyncio
+import collections
+import heapq
 import logging
 import time
 import typing
@@ -89,6 +92,19 @@ PUBLIC_PERMISSIONS = GROUP_OWNER | GROUP_ADMIN_ANY | GROUP_MEMBER | PM
 
 ALL = (1 << 13) - 1
 
+# Admin rights, which are checked for each flag: flag -> attribute of participant
+ADMIN_RIGHTS = {
+    GROUP_ADMIN_ADD_ADMINS: "add_admins",
+    GROUP_ADMIN_CHANGE_INFO: "change_info",
+    GROUP_ADMIN_BAN_USERS: "ban_users",
+    GROUP_ADMIN_DELETE_MESSAGES: "delete_messages",
+    GROUP_ADMIN_PIN_MESSAGES: "pin_messages",
+    GROUP_ADMIN_INVITE_USERS: "invite_users",
+}
+
+# Maximum number of memoized `(user, chat, flags, command)` decisions
+DECISIONS_CACHE_SIZE = 10000
+
 
 class SecurityGroup(typing.NamedTuple):
     """Represents a security group"""
@@ -98,6 +114,133 @@ class SecurityGroup(typing.NamedTuple):
     permissions: typing.List[dict]
 
 
+class SecurityPlan(typing.NamedTuple):
+    """
+    Security flags, compiled into the list of facts, which are needed to make
+    a decision. Facts, which can't change the decision, are not fetched at all
+    """
+
+    # Permitted by chat type only
+    group_member: bool
+    pm: bool
+    # Any admin of the chat is permitted
+    admin: bool
+    # Admins with any of these rights are permitted
+    rights: typing.Tuple[str, ...]
+    # Whether participant of the group must be fetched
+    participant: bool
+    # Whether admins of legacy groups are permitted
+    legacy_admin: bool
+
+
+def compile_plan(config: int, any_admin: bool = False) -> SecurityPlan:
+    """
+    Compiles security flags into the plan of their evaluation
+
+    :param config: security flags
+    :param any_admin: whether any admin right permits any admin command
+    :return: :obj:`SecurityPlan`
+    """
+
+    admin_any = bool(config & GROUP_ADMIN_ANY)
+    admin = bool(config & GROUP_ADMIN or any_admin and admin_any)
+    return SecurityPlan(
+        group_member=bool(config & GROUP_MEMBER),
+        pm=bool(config & PM),
+        admin=admin,
+        rights=(
+            ()
+            if admin
+            else tuple(right for flag, right in ADMIN_RIGHTS.items() if config & flag)
+        ),
+        participant=admin_any or bool(config & GROUP_OWNER),
+        legacy_admin=admin_any,
+    )
+
+
+class RuleIndex:
+    """
+    Index of targeted security rules and security groups' permissions by
+    `(target, rule_type, rule)` with heap of rules' expiration times
+    """
+
+    def __init__(self):
+        self._user: typing.Set[typing.Tuple[int, str, str]] = set()
+        self._chat: typing.Set[typing.Tuple[int, str, str]] = set()
+        self._sgroup: typing.Set[typing.Tuple[int, str, str]] = set()
+        # (expires, sequence number, target type, rule)
+        self._expiry: typing.List[typing.Tuple[int, int, str, dict]] = []
+
+    def build(
+        self,
+        tsec_user: typing.List[dict],
+        tsec_chat: typing.List[dict],
+        sgroups: typing.Dict[str, SecurityGroup],
+    ):
+        """
+        Rebuild index from scratch
+
+        :param tsec_user: targeted rules for users
+        :param tsec_chat: targeted rules for chats
+        :param sgroups: security groups
+        :return: None
+        """
+
+        self._user = {
+            (rule["target"], rule["rule_type"], rule["rule"]) for rule in tsec_user
+        }
+        self._chat = {
+            (rule["target"], rule["rule_type"], rule["rule"]) for rule in tsec_chat
+        }
+        self._sgroup = {
+            (user, permission["rule_type"], permission["rule"])
+            for group in sgroups.values()
+            for user in group.users
+            for permission in group.permissions
+        }
+        self._expiry = [
+            (rule["expires"], i, target_type, rule)
+            for i, (target_type, rule) in enumerate(
+                [
+                    *(("user", rule) for rule in tsec_user),
+                    *(("chat", rule) for rule in tsec_chat),
+                ]
+            )
+            if rule["expires"]
+        ]
+        heapq.heapify(self._expiry)
+
+    @property
+    def next_expiry(self) -> int:
+        """Expiration time of the nearest expiring rule or 0 if there are none"""
+        return self._expiry[0][0] if self._expiry else 0
+
+    def pop_expired(self, now: float) -> typing.List[typing.Tuple[str, dict]]:
+        """
+        Remove expired rules from the heap. Rules themselves are left in index,
+        so the caller must remove them from storage, which causes rebuild
+
+        :param now: current time
+        :return: list of (target type, rule)
+        """
+
+        expired = []
+        while self._expiry and self._expiry[0][0] < now:
+            _, _, target_type, rule = heapq.heappop(self._expiry)
+            expired += [(target_type, rule)]
+
+        return expired
+
+    def user(self, user_id: int, rule_type: str, rule: typing.Optional[str]) -> bool:
+        return (user_id, rule_type, rule) in self._user
+
+    def chat(self, chat_id: int, rule_type: str, rule: typing.Optional[str]) -> bool:
+        return (chat_id, rule_type, rule) in self._chat
+
+    def sgroup(self, user_id: int, rule_type: str, rule: typing.Optional[str]) -> bool:
+        return (user_id, rule_type, rule) in self._sgroup
+
+
 def owner(func: Command) -> Command:
     return _sec(func, OWNER)
 
@@ -177,6 +320,7 @@ class SecurityManager:
         self._cache: typing.Dict[int, dict] = {}
         self._last_warning: int = 0
         self._sgroups: typing.Dict[str, SecurityGroup] = {}
+        self._sgroups_version = 0
 
         self._any_admin = self.any_admin = db.get(__name__, "any_admin", False)
         self._default = self.default = db.get(__name__, "default", DEFAULT_PERMISSIONS)
@@ -184,48 +328,125 @@ class SecurityManager:
         self._tsec_user = self.tsec_user = db.pointer(__name__, "tsec_user", [])
         self._owner = self.owner = db.pointer(__name__, "owner", [])
 
+        # Versions of database owners and security groups, rights were built from
+        self._rights_version: typing.Optional[tuple] = None
+        self._rules = RuleIndex()
+        self._rules_version: typing.Optional[tuple] = None
+        self._expiry_timer: typing.Optional[asyncio.TimerHandle] = None
+        self._owners: typing.FrozenSet[int] = frozenset()
+        self._blacklist: typing.FrozenSet[int] = frozenset()
+        self._flags_version: typing.Optional[tuple] = None
+        # (module, function name) -> flags. Functions themselves are not used as
+        # keys, so the cache doesn't keep unloaded modules alive
+        self._flags: typing.Dict[typing.Tuple[str, str], int] = {}
+        self._plans: typing.Dict[int, SecurityPlan] = {}
+        self._decisions: "collections.OrderedDict[tuple, typing.Optional[bool]]" = (
+            collections.OrderedDict()
+        )
+
         self._reload_rights()
 
     def apply_sgroups(self, sgroups: typing.Dict[str, SecurityGroup]):
         """Apply security groups"""
         self._sgroups = sgroups
+        self._sgroups_version += 1
+
+    def _get_rights_version(self) -> tuple:
+        return (
+            self._db.get_version(__name__),
+            self._db.get_version(main.__name__),
+            self._sgroups_version,
+        )
 
     def _reload_rights(self):
         """
         Internal method to ensure that account owner is always in the owner list,
         to clear out outdated tsec rules and to remove prefixes of users, that is
-        not in any security group
+        not in any security group. Does nothing, unless owners, tsec rules,
+        security groups or prefixes have changed or some rule has expired
         """
 
+        if self._rights_version == self._get_rights_version() and not (
+            self._rules.next_expiry and self._rules.next_expiry < time.time()
+        ):
+            return
+
         if self._client.tg_id not in self._owner:
             self._owner.append(self._client.tg_id)
 
-        for info in self._tsec_user.copy():
-            if info["expires"] and info["expires"] < time.time():
-                self._tsec_user.remove(info)
-
-        for info in self._tsec_chat.copy():
-            if info["expires"] and info["expires"] < time.time():
-                self._tsec_chat.remove(info)
-        
-        sgroup_users = []
-        for g in self._sgroups.values():
-            for u in g.users:
-                sgroup_users.append(u)
+        self._expire_rules()
 
-        tsec_users = [rule['target'] for rule in self._tsec_user]
-        ub_owners = self.owner.copy()
-
-        all_users = sgroup_users + tsec_users + ub_owners
+        all_users = {
+            *(u for g in self._sgroups.values() for u in g.users),
+            *(rule["target"] for rule in self._tsec_user),
+            *self._owner,
+        }
 
         prefixes = self._db.get(main.__name__, "command_prefixes", {})
 
-        for id in prefixes.copy():
-            if int(id) not in all_users:
+        if stale := [id for id in prefixes if int(id) not in all_users]:
+            for id in stale:
                 del prefixes[id]
 
-        self._db.set(main.__name__, "command_prefixes", prefixes)
+            self._db.set(main.__name__, "command_prefixes", prefixes)
+
+        self._owners = frozenset(self._owner)
+        self._blacklist = frozenset(
+            self._db.get(main.__name__, "blacklist_users", [])
+        )
+        self._decisions.clear()
+        self._rights_version = self._get_rights_version()
+
+    def _expire_rules(self):
+        """
+        Internal method to remove expired tsec rules and keep the index in sync
+        with tsec lists and security groups
+        """
+
+        self._sync_rules()
+
+        if expired := self._rules.pop_expired(time.time()):
+            for target_type, tsec in (
+                ("user", self._tsec_user),
+                ("chat", self._tsec_chat),
+            ):
+                removed = {id(rule) for type_, rule in expired if type_ == target_type}
+                if removed:
+                    tsec[:] = [rule for rule in tsec if id(rule) not in removed]
 
+            self._sync_rules()
+
+    def _sync_rules(self):
+        version = (self._db.get_version(__name__), self._sgroups_version)
+        if version != self._rules_version:
+            self._rules.build(self._tsec_user, self._tsec_chat, self._sgroups)
+            self._rules_version = version
+            self._schedule_expiry()
+
+    def _schedule_expiry(self):
+        if self._expiry_timer:
+            self._expiry_timer.cancel()
+            self._expiry_timer = None
+
+        if not self._rules.next_expiry:
+            return
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Expired rules will be removed on next check
+            return
+
+        self._expiry_timer = loop.call_later(
+            max(self._rules.next_expiry - time.time(), 0) + 1,
+            self._on_expiry,
+        )
+
+    def _on_expiry(self):
+        self._expiry_timer = None
+        self._reload_rights()
+        if not self._expiry_timer:
+            self._schedule_expiry()
 
     def add_rule(
         self,
@@ -327,15 +548,37 @@ class SecurityManager:
         if isinstance(func, int):
             config = func
         else:
-            # Return masks there so user don't need to reboot
-            # every time he changes permissions. It doesn't
-            # decrease security at all, bc user anyway can
-            # access this attribute
-            config = self._db.get(__name__, "masks", {}).get(
+            # Masks are read from database, so user doesn't need to reboot
+            # every time he changes permissions. Resolved flags are cached
+            # until any key of security owner changes or modules are reloaded
+            version = (
+                self._db.get_version(__name__),
+                getattr(getattr(self._client, "loader", None), "routing_version", 0),
+            )
+            if version != self._flags_version:
+                self._flags.clear()
+                self._flags_version = version
+
+            key = (func.__module__, func.__name__)
+            try:
+                return self._flags[key]
+            except KeyError:
+                pass
+
+            config = self._flags[key] = self._resolve_flags(func)
+            return config
+
+        return self._apply_bounding_mask(config)
+
+    def _resolve_flags(self, func: Command) -> int:
+        return self._apply_bounding_mask(
+            self._db.get(__name__, "masks", {}).get(
                 f"{func.__module__}.{func.__name__}",
                 getattr(func, "security", self._default),
             )
+        )
 
+    def _apply_bounding_mask(self, config: int) -> int:
         if config & ~ALL and not config & EVERYONE:
             logger.error("Security config contains unknown bits")
             return False
@@ -351,39 +594,88 @@ class SecurityManager:
         :return: True if permitted, False otherwise
         """
 
-        return command and any(
-            (
-                rule["target"] == user_id
-                and rule["rule_type"] == "inline"
-                and rule["rule"] == command
-            )
-            for rule in self._tsec_user
-        )
+        return bool(command) and self._rules.user(user_id, "inline", command)
 
     def check_tsec(self, user_id: int, command: str) -> bool:
-        for info in self._sgroups.copy().values():
-            if user_id in info.users:
-                for permission in info.permissions:
-                    if (
-                        permission["rule_type"] == "command"
-                        and permission["rule"] == command
-                        or permission["rule_type"] == "module"
-                        and permission["rule"] == command
-                    ):
-                        return True
-
-        for info in self._tsec_user.copy():
-            if info["target"] == user_id and (
-                info["rule_type"] == "command"
-                and info["rule"] == command
-                or info["rule_type"] == "module"
-                and command in self._client.loader.commands
-                and info["rule"]
-                == self._client.loader.commands[command].__qualname__.split(".")[0]
-            ):
-                return True
+        self._reload_rights()
+
+        if self._rules.sgroup(user_id, "command", command) or self._rules.sgroup(
+            user_id, "module", command
+        ):
+            return True
+
+        if self._rules.user(user_id, "command", command):
+            return True
+
+        return command in self._client.loader.commands and self._rules.user(
+            user_id,
+            "module",
+            self._client.loader.commands[command].__qualname__.split(".")[0],
+        )
+
+    def _decide(
+        self,
+        user_id: int,
+        chat: typing.Optional[int],
+        config: int,
+        command: typing.Optional[str],
+        module: typing.Optional[str],
+        inline_cmd: typing.Optional[str],
+        inline: bool,
+    ) -> typing.Optional[bool]:
+        """
+        Makes the part of decision, which depends only on security rules and
+        not on the state of chat. The result is memoized until rules change
+
+        :param user_id: user ID
+        :param chat: chat ID
+        :param config: security flags
+        :param command: command name or None if func is not a command
+        :param module: module class name or None if func is not a command
+        :param inline_cmd: Inline command name if it's inline query
+        :param inline: whether it's inline query security map check
+        :return: True if permitted, False if not, None if chat must be checked
+        """
+
+        if user_id in self._owners:
+            return True
+
+        if user_id in self._blacklist:
+            return False
+
+        if inline:
+            return bool(self._check_tsec_inline(user_id, inline_cmd)) or bool(
+                config & EVERYONE
+            )
+
+        if command is None and module is None:
+            return None
+
+        if self._rules.sgroup(user_id, "command", command):
+            logger.debug("sgroup match for %s", command)
+            return True
+
+        if self._rules.sgroup(user_id, "module", module):
+            logger.debug("sgroup match for %s", module)
+            return True
+
+        if self._rules.user(user_id, "command", command):
+            logger.debug("tsec match for user %s", command)
+            return True
 
-        return False
+        if self._rules.user(user_id, "module", module):
+            logger.debug("tsec match for user %s", module)
+            return True
+
+        if chat and self._rules.chat(chat, "command", command):
+            logger.debug("tsec match for %s", command)
+            return True
+
+        if chat and self._rules.chat(chat, "module", module):
+            logger.debug("tsec match for %s", module)
+            return True
+
+        return None
 
     async def check(
         self,
@@ -423,14 +715,14 @@ class SecurityManager:
             and not message.is_group
             and message.edit_date
         ):
-            async for event in self._client.iter_admin_log(
-                utils.get_chat_id(message),
-                limit=10,
-                edit=True,
-            ):
-                if event.action.prev_message.id == message.id:
-                    user_id = event.user_id
-                    is_channel = True
+            if (
+                editor := await self._client.get_edit_author(
+                    utils.get_chat_id(message),
+                    message,
+                )
+            ) is not None:
+                user_id = editor
+                is_channel = True
 
         if (
             user_id == self._client.tg_id
@@ -454,208 +746,139 @@ class SecurityManager:
                 )
                 self._last_warning = time.time()
 
-        f_group_owner = config & GROUP_OWNER
-        f_group_admin_add_admins = config & GROUP_ADMIN_ADD_ADMINS
-        f_group_admin_change_info = config & GROUP_ADMIN_CHANGE_INFO
-        f_group_admin_ban_users = config & GROUP_ADMIN_BAN_USERS
-        f_group_admin_delete_messages = config & GROUP_ADMIN_DELETE_MESSAGES
-        f_group_admin_pin_messages = config & GROUP_ADMIN_PIN_MESSAGES
-        f_group_admin_invite_users = config & GROUP_ADMIN_INVITE_USERS
-        f_group_admin = config & GROUP_ADMIN
-        f_group_member = config & GROUP_MEMBER
-        f_pm = config & PM
-
-        f_group_admin_any = (
-            f_group_admin_add_admins
-            or f_group_admin_change_info
-            or f_group_admin_ban_users
-            or f_group_admin_delete_messages
-            or f_group_admin_pin_messages
-            or f_group_admin_invite_users
-            or f_group_admin
+        if message is None:  # In case of checking inline query security map
+            chat = command = module = None
+        else:
+            try:
+                chat = utils.get_chat_id(message)
+            except Exception:
+                chat = None
+
+            try:
+                cmd = message.raw_text[1:].split()[0].strip()
+                if usernames:
+                    for username in usernames:
+                        cmd = cmd.replace(f"@{username}", "")
+            except Exception:
+                cmd = None
+
+            if callable(func):
+                command = (
+                    self._client.loader.find_alias(cmd, include_legacy=True) or cmd
+                )
+                module = (
+                    func.__self__.__class__.__name__
+                    if hasattr(func, "__self__")
+                    else None
+                )
+            else:
+                command = module = None
+
+        key = (
+            user_id,
+            chat,
+            config,
+            command,
+            module,
+            inline_cmd if message is None else None,
+            message is None,
         )
 
-        if user_id in self._owner:
+        try:
+            decision = self._decisions[key]
+        except KeyError:
+            decision = self._decisions[key] = self._decide(
+                user_id,
+                chat,
+                config,
+                command,
+                module,
+                inline_cmd,
+                message is None,
+            )
+            if len(self._decisions) > DECISIONS_CACHE_SIZE:
+                self._decisions.popitem(last=False)
+
+        if decision is not None:
+            return decision
+
+        if (plan := self._plans.get(config)) is None:
+            plan = self._plans[config] = compile_plan(config, self._any_admin)
+
+        if plan.group_member and message.is_group or plan.pm and message.is_private:
             return True
 
-        if user_id in self._db.get(main.__name__, "blacklist_users", []):
-            return False
+        if message.is_channel and not message.is_group:
+            if not plan.admin:
+                return False
 
-        if message is None:  # In case of checking inline query security map
-            return self._check_tsec_inline(user_id, inline_cmd) or bool(
-                config & EVERYONE
+            chat = await self._get_chat(message)
+            return bool(
+                chat.creator or chat.admin_rights and chat.admin_rights.post_messages
             )
 
-        try:
-            chat = utils.get_chat_id(message)
-        except Exception:
-            chat = None
+        if not message.is_group or not plan.participant:
+            return False
 
-        try:
-            cmd = message.raw_text[1:].split()[0].strip()
-            if usernames:
-                for username in usernames:
-                    cmd = cmd.replace(f"@{username}", "")
-        except Exception:
-            cmd = None
-
-        if callable(func):
-            command = self._client.loader.find_alias(cmd, include_legacy=True) or cmd
-
-            for info in self._sgroups.copy().values():
-                if user_id in info.users:
-                    for permission in info.permissions:
-                        if (
-                            permission["rule_type"] == "command"
-                            and permission["rule"] == command
-                        ):
-                            logger.debug("sgroup match for %s", command)
-                            return True
-
-                        if (
-                            permission["rule_type"] == "module"
-                            and permission["rule"] == func.__self__.__class__.__name__
-                        ):
-                            logger.debug(
-                                "sgroup match for %s", func.__self__.__class__.__name__
-                            )
-                            return True
-
-            for info in self._tsec_user.copy():
-                if info["target"] == user_id:
-                    if info["rule_type"] == "command" and info["rule"] == command:
-                        logger.debug("tsec match for user %s", command)
-                        return True
-
-                    if (
-                        info["rule_type"] == "module"
-                        and info["rule"] == func.__self__.__class__.__name__
-                    ):
-                        logger.debug(
-                            "tsec match for user %s",
-                            func.__self__.__class__.__name__,
-                        )
-                        return True
-
-            if chat:
-                for info in self._tsec_chat.copy():
-                    if info["target"] == chat:
-                        if info["rule_type"] == "command" and info["rule"] == command:
-                            logger.debug("tsec match for %s", command)
-                            return True
-
-                        if (
-                            info["rule_type"] == "module"
-                            and info["rule"] == func.__self__.__class__.__name__
-                        ):
-                            logger.debug(
-                                "tsec match for %s",
-                                func.__self__.__class__.__name__,
-                            )
-                            return True
-
-        if f_group_member and message.is_group or f_pm and message.is_private:
-            return True
+        participant = await self._get_participant(message, user_id)
 
         if message.is_channel:
-            if not message.is_group:
-                chat_id = utils.get_chat_id(message)
-                if (
-                    chat_id in self._cache
-                    and self._cache[chat_id]["exp"] >= time.time()
-                ):
-                    chat = self._cache[chat_id]["chat"]
-                else:
-                    chat = await message.get_chat()
-                    self._cache[chat_id] = {"chat": chat, "exp": time.time() + 5 * 60}
-
-                if (
-                    not chat.creator
-                    and not chat.admin_rights
-                    or not chat.creator
-                    and not chat.admin_rights.post_messages
-                ):
-                    return False
-
-                if self._any_admin and f_group_admin_any or f_group_admin:
-                    return True
-            elif f_group_admin_any or f_group_owner:
-                chat_id = utils.get_chat_id(message)
-                cache_obj = f"{chat_id}/{user_id}"
-                if (
-                    cache_obj in self._cache
-                    and self._cache[cache_obj]["exp"] >= time.time()
-                ):
-                    participant = self._cache[cache_obj]["user"]
-                else:
-                    participant = await message.client.get_permissions(
-                        message.peer_id,
-                        user_id,
-                    )
-                    self._cache[cache_obj] = {
-                        "user": participant,
-                        "exp": time.time() + 5 * 60,
-                    }
-
-                if (
-                    participant.is_creator
-                    or participant.is_admin
-                    and (
-                        self._any_admin
-                        and f_group_admin_any
-                        or f_group_admin
-                        or f_group_admin_add_admins
-                        and participant.add_admins
-                        or f_group_admin_change_info
-                        and participant.change_info
-                        or f_group_admin_ban_users
-                        and participant.ban_users
-                        or f_group_admin_delete_messages
-                        and participant.delete_messages
-                        or f_group_admin_pin_messages
-                        and participant.pin_messages
-                        or f_group_admin_invite_users
-                        and participant.invite_users
-                    )
-                ):
-                    return True
-            return False
+            return bool(
+                participant.is_creator
+                or participant.is_admin
+                and (
+                    plan.admin
+                    or any(getattr(participant, right) for right in plan.rights)
+                )
+            )
 
-        if message.is_group and (f_group_admin_any or f_group_owner):
-            chat_id = utils.get_chat_id(message)
-            cache_obj = f"{chat_id}/{user_id}"
+        return isinstance(participant, ChatParticipantCreator) or (
+            isinstance(participant, ChatParticipantAdmin) and plan.legacy_admin
+        )
 
-            if (
-                cache_obj in self._cache
-                and self._cache[cache_obj]["exp"] >= time.time()
-            ):
-                participant = self._cache[cache_obj]["user"]
-            else:
-                full_chat = await message.client(GetFullChatRequest(message.chat_id))
-                participants = full_chat.full_chat.participants.participants
-                participant = next(
-                    (
-                        possible_participant
-                        for possible_participant in participants
-                        if possible_participant.user_id == message.sender_id
-                    ),
-                    None,
-                )
-                self._cache[cache_obj] = {
-                    "user": participant,
-                    "exp": time.time() + 5 * 60,
-                }
+    async def _get_chat(self, message: Message) -> typing.Any:
+        chat_id = utils.get_chat_id(message)
+        if chat_id in self._cache and self._cache[chat_id]["exp"] >= time.time():
+            return self._cache[chat_id]["chat"]
 
-            if not participant:
-                return
+        chat = await message.get_chat()
+        self._cache[chat_id] = {"chat": chat, "exp": time.time() + 5 * 60}
+        return chat
 
-            if (
-                isinstance(participant, ChatParticipantCreator)
-                or isinstance(participant, ChatParticipantAdmin)
-                and f_group_admin_any
-            ):
-                return True
+    async def _get_participant(self, message: Message, user_id: int) -> typing.Any:
+        """
+        Fetches all permissions of the user in the group with a single request
+
+        :param message: message in the group
+        :param user_id: user ID
+        :return: participant permissions in supergroups and participant in
+            legacy groups (None if user is not a participant)
+        """
+
+        chat_id = utils.get_chat_id(message)
+        cache_obj = f"{chat_id}/{user_id}"
+        if cache_obj in self._cache and self._cache[cache_obj]["exp"] >= time.time():
+            return self._cache[cache_obj]["user"]
+
+        if message.is_channel:
+            participant = await message.client.get_permissions(
+                message.peer_id,
+                user_id,
+            )
+        else:
+            full_chat = await message.client(GetFullChatRequest(message.chat_id))
+            participant = next(
+                (
+                    possible_participant
+                    for possible_participant in (
+                        full_chat.full_chat.participants.participants
+                    )
+                    if possible_participant.user_id == message.sender_id
+                ),
+                None,
+            )
 
-        return False
+        self._cache[cache_obj] = {"user": participant, "exp": time.time() + 5 * 60}
+        return participant
 
     _check = check  # Legacy
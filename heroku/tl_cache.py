@@ -10,28 +10,36 @@
 # You can redistribute it and/or modify it under the terms of the GNU AGPLv3
 # 🔑 https://www.gnu.org/licenses/agpl-3.0.html
 
+import asyncio
+import collections
 import copy
 import inspect
 import logging
 import time
 import typing
+from pathlib import Path
 
 from herokutl import TelegramClient
 from herokutl import __name__ as __base_name__
 from herokutl import helpers
 from herokutl._updates import ChannelState, Entity, EntityType, SessionState
-from herokutl.errors import RPCError
+from herokutl.errors import FloodWaitError, RPCError
 from herokutl.errors.rpcerrorlist import TopicDeletedError
 from herokutl.hints import EntityLike
 from herokutl.network import MTProtoSender
 from herokutl.tl import functions
 from herokutl.tl.alltlobjects import LAYER
-from herokutl.tl.functions.channels import GetFullChannelRequest
-from herokutl.tl.functions.users import GetFullUserRequest
+from herokutl.tl.functions.channels import GetChannelsRequest, GetFullChannelRequest
+from herokutl.tl.functions.users import GetFullUserRequest, GetUsersRequest
 from herokutl.tl.tlobject import TLRequest
 from herokutl.tl.types import (
     ChannelFull,
+    InputChannel,
+    InputPeerChannel,
+    InputPeerUser,
+    InputUser,
     Message,
+    UpdateNewChannelMessage,
     Updates,
     UpdatesCombined,
     UpdateShort,
@@ -39,6 +47,9 @@ from herokutl.tl.types import (
 )
 from herokutl.utils import is_list_like
 
+from ._entity_store import EntityStore, StoredRecord
+from ._invocation import bind_client, get_invocation, get_topic
+from ._record_cache import RecordCache
 from .types import (
     CacheRecordEntity,
     CacheRecordFullChannel,
@@ -49,6 +60,44 @@ from .types import (
 
 logger = logging.getLogger(__name__)
 
+# Maximum number of records in each cache of the client
+ENTITY_CACHE_SIZE = 10000
+PERMS_CACHE_SIZE = 10000
+FULL_CACHE_SIZE = 2000
+# Maximum number of forum chats, which last topic is remembered for
+TOPICS_INDEX_SIZE = 1000
+# Users and channels, requested within this amount of seconds, are fetched
+# with a single request
+BATCH_WINDOW = 0.01
+BATCH_SIZE = 100
+# Admin log of channel is requested at most once per this amount of seconds
+# to find out, who edited its posts
+ADMIN_LOG_EXP = 30
+# Maximum number of channels, which admin log is cached for
+ADMIN_LOG_CACHE_SIZE = 1000
+# Interval in seconds between writes of new cache records to disk, if
+# persistent cache is enabled
+PERSIST_INTERVAL = 60
+
+# Caches, which can be persisted: name -> (record class, attribute with TL object)
+PERSISTENT_CACHES = {
+    "entity": (CacheRecordEntity, "entity"),
+    "fullchannel": (CacheRecordFullChannel, "full_channel"),
+    "fulluser": (CacheRecordFullUser, "full_user"),
+}
+
+
+def detach(obj: typing.Any, deep: bool = False) -> typing.Any:
+    """
+    Make a copy of cached object, which can be handed out to the caller.
+    Shallow copy is enough to protect cache from attribute assignments,
+    while being much cheaper than deep copy of TL object with photos etc.
+    :param obj: Cached object
+    :param deep: Whether to make a deep copy, so nested objects are not shared too
+    :return: Copy of the object
+    """
+    return copy.deepcopy(obj) if deep else copy.copy(obj)
+
 
 def hashable(value: typing.Any) -> bool:
     """
@@ -65,31 +114,177 @@ def hashable(value: typing.Any) -> bool:
     return True
 
 
+class EntityBatcher:
+    """
+    Collects users and channels, which are requested at the same moment, and
+    fetches them with a single `users.getUsers` / `channels.getChannels`
+    """
+
+    def __init__(self, client: "CustomTelegramClient"):
+        self._client = client
+        self._pending: typing.List[
+            typing.Tuple[typing.Union[InputPeerUser, InputPeerChannel], asyncio.Future]
+        ] = []
+        self._flush_handle: typing.Optional[asyncio.TimerHandle] = None
+
+    def resolve(
+        self,
+        peer: typing.Union[InputPeerUser, InputPeerChannel],
+    ) -> asyncio.Future:
+        """
+        Schedule fetching of the entity
+        :param peer: Input peer of user or channel
+        :return: Future with the entity
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending += [(peer, future)]
+
+        if len(self._pending) >= BATCH_SIZE:
+            self._flush()
+        elif not self._flush_handle:
+            self._flush_handle = loop.call_later(BATCH_WINDOW, self._flush)
+
+        return future
+
+    def _flush(self):
+        if self._flush_handle:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        pending, self._pending = self._pending, []
+        users = [item for item in pending if isinstance(item[0], InputPeerUser)]
+        channels = [item for item in pending if isinstance(item[0], InputPeerChannel)]
+
+        if users:
+            asyncio.ensure_future(
+                self._fetch(
+                    GetUsersRequest(
+                        [InputUser(peer.user_id, peer.access_hash) for peer, _ in users]
+                    ),
+                    users,
+                )
+            )
+
+        if channels:
+            asyncio.ensure_future(
+                self._fetch(
+                    GetChannelsRequest(
+                        [
+                            InputChannel(peer.channel_id, peer.access_hash)
+                            for peer, _ in channels
+                        ]
+                    ),
+                    channels,
+                )
+            )
+
+    async def _fetch(
+        self,
+        request: TLRequest,
+        pending: typing.List[typing.Tuple[typing.Any, asyncio.Future]],
+    ):
+        try:
+            result = await self._client(request)
+        except RPCError as e:
+            if isinstance(e, FloodWaitError) or len(pending) == 1:
+                self._fail(pending, e)
+                return
+
+            # One invalid peer fails the whole batch, so peers are retried
+            # one by one and only the invalid one gets the error
+            await asyncio.gather(
+                *(self._fetch_one(peer, future) for peer, future in pending)
+            )
+            return
+        except Exception as e:
+            self._fail(pending, e)
+            return
+
+        entities = {
+            entity.id: entity
+            for entity in (result if isinstance(result, list) else result.chats)
+        }
+
+        for peer, future in pending:
+            if future.done():
+                continue
+
+            peer_id = getattr(peer, "user_id", None) or peer.channel_id
+            if peer_id in entities:
+                future.set_result(entities[peer_id])
+            else:
+                future.set_exception(ValueError(f"Could not find the entity {peer_id}"))
+
+    async def _fetch_one(
+        self,
+        peer: typing.Union[InputPeerUser, InputPeerChannel],
+        future: asyncio.Future,
+    ):
+        try:
+            entity = await TelegramClient.get_entity(self._client, peer)
+        except Exception as e:
+            self._fail([(peer, future)], e)
+        else:
+            if not future.done():
+                future.set_result(entity)
+
+    @staticmethod
+    def _fail(
+        pending: typing.List[typing.Tuple[typing.Any, asyncio.Future]],
+        e: Exception,
+    ):
+        for _, future in pending:
+            if not future.done():
+                future.set_exception(e)
+
+
 class CustomTelegramClient(TelegramClient):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
-        self._heroku_entity_cache: typing.Dict[
-            typing.Union[str, int],
-            CacheRecordEntity,
-        ] = {}
+        self._heroku_entity_cache: RecordCache[CacheRecordEntity] = RecordCache(
+            ENTITY_CACHE_SIZE
+        )
 
-        self._heroku_perms_cache: typing.Dict[
-            typing.Union[str, int],
-            CacheRecordPerms,
-        ] = {}
+        # Keyed by `(entity, user)` pairs
+        self._heroku_perms_cache: RecordCache[CacheRecordPerms] = RecordCache(
+            PERMS_CACHE_SIZE
+        )
 
-        self._heroku_fullchannel_cache: typing.Dict[
-            typing.Union[str, int],
-            CacheRecordFullChannel,
-        ] = {}
+        self._heroku_fullchannel_cache: RecordCache[CacheRecordFullChannel] = (
+            RecordCache(FULL_CACHE_SIZE)
+        )
 
-        self._heroku_fulluser_cache: typing.Dict[
-            typing.Union[str, int],
-            CacheRecordFullUser,
-        ] = {}
+        self._heroku_fulluser_cache: RecordCache[CacheRecordFullUser] = RecordCache(
+            FULL_CACHE_SIZE
+        )
 
-        self._forbidden_constructors: typing.List[int] = []
+        # Forum chat id -> topic of the last message in it
+        self._last_topics: "collections.OrderedDict[int, int]" = (
+            collections.OrderedDict()
+        )
+
+        # Lookups, which are being made right now, so concurrent misses
+        # of the same key share a single request
+        self._inflight: typing.Dict[typing.Hashable, asyncio.Future] = {}
+        self._entity_batcher = EntityBatcher(self)
+
+        # Channel id -> (time of request, edited message id -> editor id)
+        self._admin_log_cache: (
+            "collections.OrderedDict[int, typing.Tuple[float, typing.Dict[int, int]]]"
+        ) = collections.OrderedDict()
+
+        self._entity_store: typing.Optional[EntityStore] = None
+        # id(record) -> record, which is already written to disk
+        self._persisted: typing.Dict[int, typing.Any] = {}
+        self._persist_task: typing.Optional[asyncio.Task] = None
+
+        self._forbidden_constructors: typing.FrozenSet[int] = frozenset()
+        # (request name, "allowed" | "blocked") -> number of requests
+        self._call_decisions: typing.Counter[typing.Tuple[str, str]] = (
+            collections.Counter()
+        )
 
         self._raw_updates_processor: typing.Optional[
             typing.Callable[
@@ -200,25 +395,199 @@ class CustomTelegramClient(TelegramClient):
         self._raw_updates_processor = value
 
     @property
-    def heroku_entity_cache(self) -> typing.Dict[int, CacheRecordEntity]:
+    def heroku_entity_cache(self) -> RecordCache[CacheRecordEntity]:
         return self._heroku_entity_cache
 
     @property
-    def heroku_perms_cache(self) -> typing.Dict[int, CacheRecordPerms]:
+    def heroku_perms_cache(self) -> RecordCache[CacheRecordPerms]:
         return self._heroku_perms_cache
 
     @property
-    def heroku_fullchannel_cache(self) -> typing.Dict[int, CacheRecordFullChannel]:
+    def heroku_fullchannel_cache(self) -> RecordCache[CacheRecordFullChannel]:
         return self._heroku_fullchannel_cache
 
     @property
-    def heroku_fulluser_cache(self) -> typing.Dict[int, CacheRecordFullUser]:
+    def heroku_fulluser_cache(self) -> RecordCache[CacheRecordFullUser]:
         return self._heroku_fulluser_cache
 
     @property
-    def forbidden_constructors(self) -> typing.List[str]:
+    def cache_stats(self) -> typing.Dict[str, typing.Dict[str, int]]:
+        """Size and hit, miss and eviction counters of each cache"""
+        return {
+            "entity": self._heroku_entity_cache.stats,
+            "perms": self._heroku_perms_cache.stats,
+            "fullchannel": self._heroku_fullchannel_cache.stats,
+            "fulluser": self._heroku_fulluser_cache.stats,
+        }
+
+    @property
+    def forbidden_constructors(self) -> typing.FrozenSet[int]:
         return self._forbidden_constructors
 
+    @property
+    def call_decisions(self) -> typing.Counter[typing.Tuple[str, str]]:
+        """
+        Number of outgoing requests by `(request name, decision)`, where
+        decision is either `allowed` or `blocked`
+        """
+        return self._call_decisions
+
+    async def enable_persistent_cache(self, path: Path) -> int:
+        """
+        Keep entity, fulluser and fullchannel caches on disk, so they survive
+        restarts. Memory cache is warmed up with stored records, and new ones
+        are written in background
+        :param path: Path to the cache file
+        :return: Number of loaded records
+        """
+        if self._entity_store:
+            return 0
+
+        loop = asyncio.get_running_loop()
+        self._entity_store = await loop.run_in_executor(None, EntityStore, path)
+
+        loaded = 0
+        for stored in await loop.run_in_executor(None, self._entity_store.load):
+            if stored.cache not in PERSISTENT_CACHES:
+                continue
+
+            cache = getattr(self, f"_heroku_{stored.cache}_cache")
+            if any(key in cache for key in stored.keys):
+                # Record, which is already in memory, is fresher
+                continue
+
+            record = PERSISTENT_CACHES[stored.cache][0](stored.keys[0], stored.obj, 0)
+            record.ts, record._exp = stored.ts, stored.exp
+            cache.set(record, *stored.keys)
+            self._persisted[id(record)] = record
+            loaded += 1
+
+        logger.debug("Loaded %s cache records from %s", loaded, path)
+        self._persist_task = asyncio.ensure_future(self._persist_loop())
+        return loaded
+
+    async def persist_cache(self) -> int:
+        """
+        Write cache records, which were added since the last write, to disk
+        :return: Number of written records
+        """
+        if not self._entity_store:
+            return 0
+
+        new, persisted = [], {}
+        for name, (_, attr) in PERSISTENT_CACHES.items():
+            for record, keys in getattr(self, f"_heroku_{name}_cache").records():
+                persisted[id(record)] = record
+                keys = [key for key in keys if isinstance(key, (str, int))]
+                if id(record) not in self._persisted and keys and not record.expired:
+                    new += [
+                        StoredRecord(
+                            name,
+                            keys,
+                            getattr(record, attr),
+                            record.ts,
+                            record._exp,
+                        )
+                    ]
+
+        self._persisted = persisted
+        if not new:
+            return 0
+
+        # Serialization happens in thread too, so loop is not blocked
+        return await asyncio.get_running_loop().run_in_executor(
+            None,
+            self._entity_store.save,
+            new,
+        )
+
+    async def flush_persistent_cache(self) -> int:
+        """
+        Remove all records from disk cache
+        :return: Number of removed records
+        """
+        if not self._entity_store:
+            return 0
+
+        self._persisted = {}
+        return await asyncio.get_running_loop().run_in_executor(
+            None,
+            self._entity_store.clear,
+        )
+
+    async def _persist_loop(self):
+        while True:
+            await asyncio.sleep(PERSIST_INTERVAL)
+            try:
+                await self.persist_cache()
+            except Exception:
+                logger.exception("Can't write cache to disk")
+
+    @staticmethod
+    def _entity_keys(
+        hashable_entity: typing.Optional[typing.Hashable],
+        entity: typing.Any,
+    ) -> typing.List[typing.Hashable]:
+        """
+        Keys, which the entity can be found in cache by
+        :param hashable_entity: Key, the entity was requested with
+        :param entity: Resolved entity
+        :return: List of keys
+        """
+        keys = [hashable_entity] if hashable_entity else []
+        if getattr(entity, "id", None):
+            keys += [entity.id]
+
+        if getattr(entity, "username", None):
+            keys += [f"@{entity.username}", entity.username]
+
+        return keys
+
+    async def _singleflight(
+        self,
+        key: typing.Hashable,
+        factory: typing.Callable[[], typing.Awaitable[typing.Any]],
+    ) -> typing.Any:
+        """
+        Run the lookup, unless the same lookup is already running, in which
+        case wait for its result instead
+        :param key: Key of the lookup
+        :param factory: Function, which starts the lookup
+        :return: Result of the lookup
+        """
+        if (future := self._inflight.get(key)) is None:
+            future = asyncio.ensure_future(factory())
+            self._inflight[key] = future
+
+            def _done(future: asyncio.Future):
+                if self._inflight.get(key) is future:
+                    del self._inflight[key]
+
+                # Mark exception as retrieved in case all waiters were cancelled
+                if not future.cancelled():
+                    future.exception()
+
+            future.add_done_callback(_done)
+
+        # Cancellation of one waiter must not cancel the lookup for others
+        return await asyncio.shield(future)
+
+    async def _resolve_entity(self, entity: EntityLike):
+        """
+        Resolve entity with batching, if it is user or channel, which
+        is already known to the session
+        """
+        if not isinstance(entity, str):
+            try:
+                peer = await self.get_input_entity(entity)
+            except Exception:
+                peer = None
+
+            if isinstance(peer, (InputPeerUser, InputPeerChannel)):
+                return await self._entity_batcher.resolve(peer)
+
+        return await super().get_entity(entity)
+
     async def force_get_entity(self, *args, **kwargs):
         """Forcefully makes a request to Telegram to get the entity."""
 
@@ -229,6 +598,7 @@ class CustomTelegramClient(TelegramClient):
         entity: EntityLike,
         exp: int = 5 * 60,
         force: bool = False,
+        deep: bool = False,
     ):
         """
         Gets the entity and cache it
@@ -236,12 +606,12 @@ class CustomTelegramClient(TelegramClient):
         :param entity: Entity to fetch
         :param exp: Expiration time of the cache record and maximum time of already cached record
         :param force: Whether to force refresh the cache (make API request)
+        :param deep: Whether to return a deep copy of the entity. By default, shallow
+            copy is returned, so nested objects must not be modified in place
         :return: :obj:`Entity`
         """
 
-        # Will be used to determine, which client caused logging messages
-        # parsed via inspect.stack()
-        _heroku_client_id_logging_tag = copy.copy(self.tg_id)  # noqa: F841
+        bind_client(self.tg_id)
 
         if not hashable(entity):
             try:
@@ -265,39 +635,31 @@ class CustomTelegramClient(TelegramClient):
         if (
             not force
             and hashable_entity
-            and hashable_entity in self._heroku_entity_cache
-            and (
-                not exp
-                or self._heroku_entity_cache[hashable_entity].ts + exp > time.time()
-            )
+            and (record := self._heroku_entity_cache.fresh(hashable_entity, exp))
         ):
             logger.debug(
                 "Using cached entity %s (%s)",
                 entity,
-                type(self._heroku_entity_cache[hashable_entity].entity).__name__,
+                type(record.entity).__name__,
             )
-            return copy.deepcopy(self._heroku_entity_cache[hashable_entity].entity)
-
-        resolved_entity = await super().get_entity(entity)
-
-        if resolved_entity:
-            cache_record = CacheRecordEntity(hashable_entity, resolved_entity, exp)
-            self._heroku_entity_cache[hashable_entity] = cache_record
-            logger.debug("Saved hashable_entity %s to cache", hashable_entity)
+            return detach(record.entity, deep)
 
-            if getattr(resolved_entity, "id", None):
-                logger.debug("Saved resolved_entity id %s to cache", resolved_entity.id)
-                self._heroku_entity_cache[resolved_entity.id] = cache_record
+        async def resolve():
+            resolved_entity = await self._resolve_entity(entity)
 
-            if getattr(resolved_entity, "username", None):
-                logger.debug(
-                    "Saved resolved_entity username @%s to cache",
-                    resolved_entity.username,
+            if resolved_entity:
+                self._heroku_entity_cache.set(
+                    CacheRecordEntity(hashable_entity, resolved_entity, exp),
+                    *self._entity_keys(hashable_entity, resolved_entity),
                 )
-                self._heroku_entity_cache[f"@{resolved_entity.username}"] = cache_record
-                self._heroku_entity_cache[resolved_entity.username] = cache_record
+                logger.debug("Saved hashable_entity %s to cache", hashable_entity)
+
+            return resolved_entity
 
-        return copy.deepcopy(resolved_entity)
+        return detach(
+            await self._singleflight(("entity", hashable_entity), resolve),
+            deep,
+        )
 
     async def get_perms_cached(
         self,
@@ -305,6 +667,7 @@ class CustomTelegramClient(TelegramClient):
         user: typing.Optional[EntityLike] = None,
         exp: int = 5 * 60,
         force: bool = False,
+        deep: bool = False,
     ):
         """
         Gets the permissions of the user in the entity and cache it
@@ -313,12 +676,11 @@ class CustomTelegramClient(TelegramClient):
         :param user: User to fetch
         :param exp: Expiration time of the cache record and maximum time of already cached record
         :param force: Whether to force refresh the cache (make API request)
+        :param deep: Whether to return a deep copy of the permissions
         :return: :obj:`ChatPermissions`
         """
 
-        # Will be used to determine, which client caused logging messages
-        # parsed via inspect.stack()
-        _heroku_client_id_logging_tag = copy.copy(self.tg_id)  # noqa: F841
+        bind_client(self.tg_id)
 
         entity = await self.get_entity(entity)
         user = await self.get_entity(user) if user else None
@@ -363,64 +725,56 @@ class CustomTelegramClient(TelegramClient):
             not force
             and hashable_entity
             and hashable_user
-            and hashable_user in self._heroku_perms_cache.get(hashable_entity, {})
             and (
-                not exp
-                or self._heroku_perms_cache[hashable_entity][hashable_user].ts + exp
-                > time.time()
+                record := self._heroku_perms_cache.fresh(
+                    (hashable_entity, hashable_user),
+                    exp,
+                )
             )
         ):
             logger.debug("Using cached perms %s (%s)", hashable_entity, hashable_user)
-            return copy.deepcopy(
-                self._heroku_perms_cache[hashable_entity][hashable_user].perms
-            )
-
-        resolved_perms = await self.get_permissions(entity, user)
-
-        if resolved_perms:
-            cache_record = CacheRecordPerms(
-                hashable_entity,
-                hashable_user,
-                resolved_perms,
-                exp,
-            )
-            self._heroku_perms_cache.setdefault(hashable_entity, {})[hashable_user] = (
-                cache_record
-            )
-            logger.debug("Saved hashable_entity %s perms to cache", hashable_entity)
-
-            def save_user(key: typing.Union[str, int]):
-                nonlocal self, cache_record, user, hashable_user
-                if getattr(user, "id", None):
-                    self._heroku_perms_cache.setdefault(key, {})[user.id] = cache_record
-
-                if getattr(user, "username", None):
-                    self._heroku_perms_cache.setdefault(key, {})[f"@{user.username}"] = (
-                        cache_record
-                    )
-                    self._heroku_perms_cache.setdefault(key, {})[user.username] = (
-                        cache_record
-                    )
+            return detach(record.perms, deep)
 
-            if getattr(entity, "id", None):
-                logger.debug("Saved resolved_entity id %s perms to cache", entity.id)
-                save_user(entity.id)
+        async def resolve():
+            resolved_perms = await self.get_permissions(entity, user)
 
-            if getattr(entity, "username", None):
+            if resolved_perms:
+                cache_record = CacheRecordPerms(
+                    hashable_entity,
+                    hashable_user,
+                    resolved_perms,
+                    exp,
+                )
+                self._heroku_perms_cache.set(
+                    cache_record,
+                    (hashable_entity, hashable_user),
+                    *(
+                        (entity_key, user_key)
+                        for entity_key in self._entity_keys(None, entity)
+                        for user_key in self._entity_keys(None, user)
+                    ),
+                )
                 logger.debug(
-                    "Saved resolved_entity username @%s perms to cache",
-                    entity.username,
+                    "Saved hashable_entity %s perms to cache",
+                    hashable_entity,
                 )
-                save_user(f"@{entity.username}")
-                save_user(entity.username)
 
-        return copy.deepcopy(resolved_perms)
+            return resolved_perms
+
+        return detach(
+            await self._singleflight(
+                ("perms", hashable_entity, hashable_user),
+                resolve,
+            ),
+            deep,
+        )
 
     async def get_fullchannel(
         self,
         entity: EntityLike,
         exp: int = 300,
         force: bool = False,
+        deep: bool = False,
     ) -> ChannelFull:
         """
         Gets the FullChannelRequest and cache it
@@ -428,6 +782,8 @@ class CustomTelegramClient(TelegramClient):
         :param entity: Channel to fetch ChannelFull of
         :param exp: Expiration time of the cache record and maximum time of already cached record
         :param force: Whether to force refresh the cache (make API request)
+        :param deep: Whether to return a deep copy. By default, shallow copy is
+            returned, so nested objects must not be modified in place
         :return: :obj:`ChannelFull`
         """
         if not hashable(entity):
@@ -452,27 +808,28 @@ class CustomTelegramClient(TelegramClient):
         if str(hashable_entity).isdigit() and int(hashable_entity) < 0:
             hashable_entity = int(str(hashable_entity)[4:])
 
-        if (
-            not force
-            and self._heroku_fullchannel_cache.get(hashable_entity)
-            and not self._heroku_fullchannel_cache[hashable_entity].expired
-            and self._heroku_fullchannel_cache[hashable_entity].ts + exp > time.time()
+        if not force and (
+            record := self._heroku_fullchannel_cache.fresh(hashable_entity, exp, strict=True)
         ):
-            return self._heroku_fullchannel_cache[hashable_entity].full_channel
+            return detach(record.full_channel, deep)
 
-        result = await self(GetFullChannelRequest(channel=entity))
-        self._heroku_fullchannel_cache[hashable_entity] = CacheRecordFullChannel(
-            hashable_entity,
-            result,
-            exp,
-        )
-        return result
+        async def resolve():
+            result = await self(GetFullChannelRequest(channel=entity))
+            self._heroku_fullchannel_cache.set(
+                CacheRecordFullChannel(hashable_entity, result, exp),
+                hashable_entity,
+            )
+            return result
+
+        result = await self._singleflight(("fullchannel", hashable_entity), resolve)
+        return detach(result, deep)
 
     async def get_fulluser(
         self,
         entity: EntityLike,
         exp: int = 300,
         force: bool = False,
+        deep: bool = False,
     ) -> UserFull:
         """
         Gets the FullUserRequest and cache it
@@ -480,6 +837,8 @@ class CustomTelegramClient(TelegramClient):
         :param entity: User to fetch UserFull of
         :param exp: Expiration time of the cache record and maximum time of already cached record
         :param force: Whether to force refresh the cache (make API request)
+        :param deep: Whether to return a deep copy. By default, shallow copy is
+            returned, so nested objects must not be modified in place
         :return: :obj:`UserFull`
         """
         if not hashable(entity):
@@ -504,80 +863,98 @@ class CustomTelegramClient(TelegramClient):
         if str(hashable_entity).isdigit() and int(hashable_entity) < 0:
             hashable_entity = int(str(hashable_entity)[4:])
 
-        if (
-            not force
-            and self._heroku_fulluser_cache.get(hashable_entity)
-            and not self._heroku_fulluser_cache[hashable_entity].expired
-            and self._heroku_fulluser_cache[hashable_entity].ts + exp > time.time()
+        if not force and (
+            record := self._heroku_fulluser_cache.fresh(hashable_entity, exp, strict=True)
         ):
-            return self._heroku_fulluser_cache[hashable_entity].full_user
+            return detach(record.full_user, deep)
 
-        result = await self(GetFullUserRequest(entity))
-        self._heroku_fulluser_cache[hashable_entity] = CacheRecordFullUser(
-            hashable_entity,
-            result,
-            exp,
-        )
-        return result
+        async def resolve():
+            result = await self(GetFullUserRequest(entity))
+            self._heroku_fulluser_cache.set(
+                CacheRecordFullUser(hashable_entity, result, exp),
+                hashable_entity,
+            )
+            return result
 
-    @staticmethod
-    def _find_message_obj_in_frame(
-        chat_id: int,
-        frame: inspect.FrameInfo,
-    ) -> typing.Optional[Message]:
-        """
-        Finds the message object from the frame
-        """
-        logger.debug("Finding message object in frame %s", frame)
-        return next(
-            (
-                obj
-                for obj in frame.frame.f_locals.values()
-                if isinstance(obj, Message)
-                and getattr(obj.reply_to, "forum_topic", False)
-                and chat_id == getattr(obj.peer_id, "channel_id", None)
-            ),
-            None,
-        )
+        result = await self._singleflight(("fulluser", hashable_entity), resolve)
+        return detach(result, deep)
 
-    async def _find_message_obj_in_stack(
+    async def get_edit_author(
         self,
-        chat: EntityLike,
-        stack: typing.List[inspect.FrameInfo],
-    ) -> typing.Optional[Message]:
+        chat_id: int,
+        message: Message,
+        exp: int = ADMIN_LOG_EXP,
+    ) -> typing.Optional[int]:
         """
-        Finds the message object from the stack
+        Finds out, who edited the channel post, using the admin log. Log is
+        requested once per channel for the whole burst of edits and requested
+        again if it's older than `exp` or if it was requested not later than
+        within the second of the edit, so it may not contain the edit yet
+
+        :param chat_id: Channel ID
+        :param message: Edited message
+        :param exp: Maximum age of the cached admin log
+        :return: ID of the editor or `None`, if the edit is not in the log
         """
-        chat_id = (await self.get_entity(chat, exp=0)).id
-        logger.debug("Finding message object in stack for chat %s", chat_id)
-        return next(
-            (
-                self._find_message_obj_in_frame(chat_id, frame_info)
-                for frame_info in stack
-                if self._find_message_obj_in_frame(chat_id, frame_info)
-            ),
-            None,
-        )
+        now = time.time()
+        edited = message.edit_date.timestamp() if message.edit_date else now
+
+        # Edit date has one second resolution, so the log must be requested
+        # after the second of the edit. Entry of the message in older log might
+        # belong to its previous edit
+        if (cached := self._admin_log_cache.get(chat_id)) and (
+            cached[0] + exp > now and cached[0] >= edited + 1
+        ):
+            return cached[1].get(message.id)
 
-    async def _find_topic_in_stack(
-        self,
-        chat: EntityLike,
-        stack: typing.List[inspect.FrameInfo],
-    ) -> typing.Optional[Message]:
+        async def resolve():
+            requested = time.time()
+            editors = {}
+            async for event in self.iter_admin_log(chat_id, limit=10, edit=True):
+                # Log goes from the newest events to the oldest ones
+                editors.setdefault(event.action.prev_message.id, event.user_id)
+
+            self._admin_log_cache[chat_id] = (requested, editors)
+            self._admin_log_cache.move_to_end(chat_id)
+            if len(self._admin_log_cache) > ADMIN_LOG_CACHE_SIZE:
+                self._admin_log_cache.popitem(last=False)
+
+            return editors
+
+        editors = await self._singleflight(("admin_log", chat_id), resolve)
+        return editors.get(message.id)
+
+    async def _find_topic(self, chat: EntityLike) -> typing.Optional[int]:
         """
-        Finds the message object from the stack
+        Finds the topic of the message, which caused current invocation,
+        if the message was sent to the same chat. Otherwise, the topic of
+        the last message in the chat is used
         """
-        message = await self._find_message_obj_in_stack(chat, stack)
-        return (
-            (message.reply_to.reply_to_top_id or message.reply_to.reply_to_msg_id)
-            if message
-            else None
-        )
+        chat_id = (await self.get_entity(chat, exp=0)).id
+        logger.debug("Finding topic for chat %s", chat_id)
+
+        invocation = get_invocation()
+        if invocation.topic and chat_id == getattr(
+            invocation.message.peer_id, "channel_id", None
+        ):
+            return invocation.topic
+
+        return self._last_topics.get(chat_id)
+
+    def _remember_topic(self, message: typing.Any):
+        """Update the last known topic of the chat with the incoming message"""
+        if not (topic := get_topic(message)):
+            return
+
+        if chat_id := getattr(message.peer_id, "channel_id", None):
+            self._last_topics[chat_id] = topic
+            self._last_topics.move_to_end(chat_id)
+            if len(self._last_topics) > TOPICS_INDEX_SIZE:
+                self._last_topics.popitem(last=False)
 
     async def _topic_guesser(
         self,
         native_method: typing.Callable[..., typing.Awaitable[Message]],
-        stack: typing.List[inspect.FrameInfo],
         *args,
         **kwargs,
     ):
@@ -590,7 +967,7 @@ class CustomTelegramClient(TelegramClient):
 
             logger.debug("Topic deleted, trying to guess topic id")
 
-            topic = await self._find_topic_in_stack(args[0], stack)
+            topic = await self._find_topic(args[0])
 
             logger.debug("Guessed topic id: %s", topic)
 
@@ -599,23 +976,13 @@ class CustomTelegramClient(TelegramClient):
 
             kwargs["reply_to"] = topic
             kwargs["_topic_no_retry"] = True
-            return await self._topic_guesser(native_method, stack, *args, **kwargs)
+            return await self._topic_guesser(native_method, *args, **kwargs)
 
     async def send_file(self, *args, **kwargs) -> Message:
-        return await self._topic_guesser(
-            super().send_file,
-            inspect.stack(),
-            *args,
-            **kwargs,
-        )
+        return await self._topic_guesser(super().send_file, *args, **kwargs)
 
     async def send_message(self, *args, **kwargs) -> Message:
-        return await self._topic_guesser(
-            super().send_message,
-            inspect.stack(),
-            *args,
-            **kwargs,
-        )
+        return await self._topic_guesser(super().send_message, *args, **kwargs)
 
     async def _call(
         self,
@@ -642,51 +1009,91 @@ class CustomTelegramClient(TelegramClient):
         # I hope, you understood me.
         # Thank you
 
-        not_tuple = False
+        # Caller is looked up only when there is something to forbid
+        forbidden = (
+            self._forbidden_constructors
+            if self._forbidden_constructors and self._is_external_caller()
+            else frozenset()
+        )
+
         if not is_list_like(request):
-            not_tuple = True
-            request = (request,)
-
-        new_request = []
-
-        for item in request:
-            if item.CONSTRUCTOR_ID in self._forbidden_constructors and next(
-                (
-                    frame_info.frame.f_locals["self"]
-                    for frame_info in inspect.stack()
-                    if hasattr(frame_info, "frame")
-                    and hasattr(frame_info.frame, "f_locals")
-                    and isinstance(frame_info.frame.f_locals, dict)
-                    and "self" in frame_info.frame.f_locals
-                    and isinstance(frame_info.frame.f_locals["self"], Module)
-                    and not getattr(
-                        frame_info.frame.f_locals["self"], "__origin__", ""
-                    ).startswith("<core")
-                ),
-                None,
-            ):
-                logger.debug(
-                    "🎉 I protected you from unintented %s (%s)!",
-                    item.__class__.__name__,
-                    item,
-                )
-                continue
+            if not self._is_call_allowed(request, forbidden):
+                return
+
+            return await super()._call(
+                sender,
+                request,
+                ordered,
+                flood_sleep_threshold,
+            )
 
-            new_request += [item]
+        new_request = tuple(
+            item
+            for item in request
+            if self._is_call_allowed(item, forbidden)
+        )
 
         if not new_request:
             return
 
         return await super()._call(
             sender,
-            new_request[0] if not_tuple else tuple(new_request),
+            new_request,
             ordered,
             flood_sleep_threshold,
         )
 
+    @staticmethod
+    def _is_external_caller() -> bool:
+        """
+        Check, whether the request is sent by non-core module. Invocation is used,
+        when it's set, otherwise the stack is scanned for frames of modules, so
+        code, started without invocation (e.g. own event handlers), is caught too
+        :return: True if caller is non-core module
+        """
+        invocation = get_invocation()
+        if invocation.module is not None:
+            return invocation.is_external
+
+        frame = inspect.currentframe()
+        while frame is not None:
+            caller = frame.f_locals.get("self")
+            if isinstance(caller, Module) and not getattr(
+                caller, "__origin__", ""
+            ).startswith("<core"):
+                return True
+
+            frame = frame.f_back
+
+        return False
+
+    def _is_call_allowed(
+        self,
+        request: TLRequest,
+        forbidden: typing.FrozenSet[int],
+    ) -> bool:
+        """
+        Decide whether request can be sent and count the decision
+        :param request: Request to check
+        :param forbidden: Constructors, which are forbidden for the caller
+        :return: True if request can be sent
+        """
+        if request.CONSTRUCTOR_ID in forbidden:
+            logger.debug(
+                "🎉 I protected you from unintented %s (%s)!",
+                request.__class__.__name__,
+                request,
+            )
+            self._call_decisions[(request.__class__.__name__, "blocked")] += 1
+            return False
+
+        self._call_decisions[(request.__class__.__name__, "allowed")] += 1
+        return True
+
     def _internal_forbid_ctor(self, constructors: list):
-        self._forbidden_constructors.extend(constructors)
-        self._forbidden_constructors = list(set(self._forbidden_constructors))
+        self._forbidden_constructors = self._forbidden_constructors | frozenset(
+            constructors
+        )
 
     def forbid_constructor(self, constructor: int):
         """
@@ -711,4 +1118,12 @@ class CustomTelegramClient(TelegramClient):
         if self._raw_updates_processor is not None:
             self._raw_updates_processor(update)
 
+        for item in (
+            update.updates
+            if isinstance(update, (Updates, UpdatesCombined))
+            else (getattr(update, "update", None),)
+        ):
+            if isinstance(item, UpdateNewChannelMessage):
+                self._remember_topic(item.message)
+
         super()._handle_update(update)
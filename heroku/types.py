@@ -41,6 +41,7 @@ from herokutl.tl.types import (
 )
 
 from . import version
+from ._invocation import bind_client
 from ._reference_finder import replace_all_refs
 from .inline.types import (
     BotInlineCall,
@@ -274,7 +275,7 @@ class Module:
         from . import utils
 
         with contextlib.suppress(AttributeError):
-            _heroku_client_id_logging_tag = copy.copy(self.client.tg_id)  # noqa: F841
+            bind_client(self.client.tg_id)
 
         if interval < 0.1:
             logger.warning(
@@ -985,7 +986,8 @@ class CacheRecordEntity:
         resolved_entity: EntityLike,
         exp: int,
     ):
-        self.entity = copy.deepcopy(resolved_entity)
+        # Cached objects are never handed out directly, see `CustomTelegramClient`
+        self.entity = resolved_entity
         self._hashable_entity = copy.deepcopy(hashable_entity)
         self._exp = round(time.time() + exp)
         self.ts = time.time()
@@ -1018,7 +1020,7 @@ class CacheRecordPerms:
         resolved_perms: EntityLike,
         exp: int,
     ):
-        self.perms = copy.deepcopy(resolved_perms)
+        self.perms = resolved_perms
         self._hashable_entity = copy.deepcopy(hashable_entity)
         self._hashable_user = copy.deepcopy(hashable_user)
         self._exp = round(time.time() + exp)
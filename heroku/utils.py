@@ -105,6 +105,7 @@ from herokutl.tl.types import (
 )
 
 from ._internal import fw_protect
+from ._invocation import get_invocation
 from .inline.types import BotInlineCall, InlineCall, InlineMessage
 from .tl_cache import CustomTelegramClient
 from .types import HerokuReplyMarkup, ListLike, Module
@@ -1438,10 +1439,15 @@ def find_caller(
     stack: typing.Optional[typing.List[inspect.FrameInfo]] = None,
 ) -> typing.Any:
     """
-    Attempts to find command in stack
+    Attempts to find command, which is being executed. If `stack` is not passed,
+    the command is taken from the invocation context, and stack is inspected
+    only if there is no invocation
     :param stack: Stack to search in
     :return: Command-caller or None
     """
+    if stack is None and (command := get_invocation().command):
+        return getattr(command, "__func__", command)
+
     caller = next(
         (
             frame_info